@@ -0,0 +1,492 @@
+"""
+Nearest-neighbour indexes for L2-normalised embeddings (inner product = cosine).
+
+    exact    brute-force matrix product, the reference for recall
+    ivf      inverted file: k-means cells, only the nprobe closest cells are scanned
+    faiss    faiss IndexIVFFlat, if faiss is installed
+    hnswlib  hnswlib HNSW graph, if hnswlib is installed
+
+Every index numbers vectors 0..n-1 in insertion order, supports incremental
+add(), and saves to a directory whose arrays are memory-mapped on load.
+"""
+import abc
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from api.retrieval import top_ranked
+from api.snapshot import save_array
+
+ANN_VERSION = 1
+MANIFEST_NAME = "ann.json"
+DEFAULT_NPROBE = 8
+KMEANS_ITERATIONS = 10
+# Cap on the k-means training sample per cell
+TRAINING_POINTS_PER_LIST = 256
+# Extra results fetched from backends that cannot filter, before dropping disallowed ones
+FILTER_OVERFETCH = 4
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+
+def fingerprint(vectors: np.ndarray) -> str:
+    """
+    SHA-256 of the vectors, used to tell whether a saved index still matches its embeddings.
+    """
+    return hashlib.sha256(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()).hexdigest()
+
+
+def _pad_results(rows: List[Tuple[np.ndarray, np.ndarray]], k: int) -> SearchResult:
+    ids = np.full((len(rows), k), -1, dtype=np.int64)
+    scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    for row, (row_ids, row_scores) in enumerate(rows):
+        ids[row, :len(row_ids)] = row_ids
+        scores[row, :len(row_scores)] = row_scores
+    return ids, scores
+
+
+class VectorIndex(abc.ABC):
+    """
+    Base class of the nearest-neighbour indexes.
+
+    Args:
+        dim: Vector length
+    """
+
+    backend = ""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._count]
+
+    def _append(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Store vectors in a growable buffer and return their ids.
+
+        A memory-mapped buffer from load() is copied to memory on the first insert.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = self._count + len(vectors)
+        if needed > self._vectors.shape[0] or not self._vectors.flags.writeable:
+            capacity = max(needed, 2 * self._vectors.shape[0], 1024)
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        self._vectors[self._count:needed] = vectors
+        ids = np.arange(self._count, needed, dtype=np.int64)
+        self._count = needed
+        return ids
+
+    def train(self, vectors: np.ndarray) -> None:
+        """Learn the index structure from sample vectors; a no-op for indexes that need none."""
+
+    @abc.abstractmethod
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Insert vectors; returns their ids.
+        """
+
+    @abc.abstractmethod
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> SearchResult:
+        """
+        Find the k best vectors for each query by inner product.
+
+        Args:
+            queries: (n_queries, dim) query vectors
+            k: Results per query
+            allowed: Optional (n_queries, len(index)) mask of eligible ids
+
+        Returns:
+            (ids, scores) arrays of shape (n_queries, k), best first, padded with -1 and -inf
+        """
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {}
+
+    def _save_arrays(self, directory: Path) -> None:
+        pass
+
+    def save(self, directory: Union[str, Path], source_fingerprint: Optional[str] = None) -> Path:
+        """
+        Save the index; the manifest is written last so a partial save is never loaded.
+
+        Args:
+            directory: Output directory, created if missing
+            source_fingerprint: Fingerprint of the embeddings the index was built from
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        save_array(directory / "vectors.npy", self.vectors)
+        self._save_arrays(directory)
+        manifest = {"version": ANN_VERSION, "backend": self.backend, "dim": self.dim, "count": self._count,
+                    "fingerprint": source_fingerprint, **self._manifest()}
+        tmp_path = directory / f"{MANIFEST_NAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, directory / MANIFEST_NAME)
+        return directory
+
+    @classmethod
+    @abc.abstractmethod
+    def _load(cls, directory: Path, manifest: Dict[str, Any], vectors: np.ndarray) -> "VectorIndex":
+        """Rebuild the index from a saved directory, given its manifest and memory-mapped vectors."""
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force search: one matrix product over all vectors."""
+
+    backend = "exact"
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        return self._append(vectors)
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> SearchResult:
+        scores = np.asarray(queries, dtype=np.float32) @ self.vectors.T
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+        rows = []
+        for row_scores in scores:
+            top = top_ranked(row_scores, k)
+            rows.append((top, row_scores[top]))
+        return _pad_results(rows, k)
+
+    @classmethod
+    def _load(cls, directory: Path, manifest: Dict[str, Any], vectors: np.ndarray) -> "ExactIndex":
+        index = cls(manifest["dim"])
+        index._vectors, index._count = vectors, manifest["count"]
+        return index
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index in NumPy.
+
+    Vectors are assigned to the closest of n_lists k-means centroids (spherical
+    k-means, since vectors are normalised). A query scores the centroids, then
+    only the vectors in its nprobe closest cells, so search cost is about
+    nprobe / n_lists of a brute-force scan. Inserts after training are
+    assigned to the existing cells. A filtered query whose probed cells hold
+    too few allowed vectors scans the allowed vectors exactly instead.
+
+    Args:
+        dim: Vector length
+        n_lists: Number of cells, defaults to about sqrt(n) when trained
+        nprobe: Cells scanned per query; higher is slower and more accurate
+        seed: Seed of the k-means initialisation
+    """
+
+    backend = "ivf"
+
+    def __init__(self, dim: int, n_lists: Optional[int] = None, nprobe: int = DEFAULT_NPROBE, seed: int = 0):
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # Vector ids of every cell
+        self._lists: List[np.ndarray] = []
+
+    def train(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), n_lists * TRAINING_POINTS_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty cells keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1.0), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.n_lists = n_lists
+        self._lists = [np.zeros(0, dtype=np.int64) for _ in range(n_lists)]
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[start:start + chunk_size] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), chunk_size)
+        ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            raise ValueError("IVF index must be trained before vectors are added")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        ids = self._append(vectors)
+        assignments = self._assign(vectors)
+        order = np.argsort(assignments, kind="stable")
+        cells, starts = np.unique(assignments[order], return_index=True)
+        for cell, members in zip(cells, np.split(ids[order], starts[1:])):
+            self._lists[cell] = np.concatenate([self._lists[cell], members])
+        return ids
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> SearchResult:
+        queries = np.asarray(queries, dtype=np.float32)
+        nprobe = min(self.nprobe, len(self._lists))
+        rows = []
+        for row, query in enumerate(queries):
+            cells = top_ranked(self.centroids @ query, nprobe)
+            candidates = np.concatenate([self._lists[cell] for cell in cells]) if len(cells) else np.zeros(0, np.int64)
+            if allowed is not None:
+                candidates = candidates[allowed[row, candidates]]
+            scores = self._vectors[candidates] @ query
+            top = top_ranked(scores, k)
+            row_ids, row_scores = candidates[top], scores[top]
+            if allowed is not None and len(row_ids) < min(k, int(allowed[row].sum())):
+                # The probed cells hold too few eligible vectors: scan the eligible vectors exactly
+                eligible = np.flatnonzero(allowed[row])
+                exact = self.vectors[eligible] @ query
+                top = top_ranked(exact, k)
+                row_ids, row_scores = eligible[top], exact[top]
+            rows.append((row_ids, row_scores))
+        return _pad_results(rows, k)
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {"n_lists": self.n_lists, "nprobe": self.nprobe}
+
+    def _save_arrays(self, directory: Path) -> None:
+        save_array(directory / "centroids.npy", self.centroids)
+        save_array(directory / "list_offsets.npy", np.cumsum([0] + [len(ids) for ids in self._lists]))
+        save_array(directory / "list_ids.npy", np.concatenate(self._lists) if self._lists else np.zeros(0, np.int64))
+
+    @classmethod
+    def _load(cls, directory: Path, manifest: Dict[str, Any], vectors: np.ndarray) -> "IVFIndex":
+        index = cls(manifest["dim"], manifest["n_lists"], manifest["nprobe"])
+        index._vectors, index._count = vectors, manifest["count"]
+        index.centroids = np.load(directory / "centroids.npy")
+        offsets = np.load(directory / "list_offsets.npy")
+        list_ids = np.load(directory / "list_ids.npy", mmap_mode="r")
+        # Cells are views into the mapped file until an insert touches them
+        index._lists = [list_ids[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return index
+
+
+class _PostFilterIndex(VectorIndex):
+    """Base for library backends that cannot filter: over-fetch, then drop disallowed ids."""
+
+    @abc.abstractmethod
+    def _search(self, queries: np.ndarray, k: int) -> SearchResult:
+        """Unfiltered top-k search of the library index."""
+
+    def search(self, queries: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> SearchResult:
+        queries = np.asarray(queries, dtype=np.float32)
+        if allowed is None:
+            return self._search(queries, min(k, self._count))
+        fetch = min(self._count, k * FILTER_OVERFETCH)
+        ids, scores = self._search(queries, fetch)
+        rows = []
+        for row in range(len(queries)):
+            keep = (ids[row] >= 0) & allowed[row, np.clip(ids[row], 0, None)]
+            row_ids, row_scores = ids[row][keep][:k], scores[row][keep][:k]
+            if len(row_ids) < min(k, int(allowed[row].sum())):
+                # Too few eligible hits among the over-fetched ones: scan the eligible vectors exactly
+                eligible = np.flatnonzero(allowed[row])
+                exact = self.vectors[eligible] @ queries[row]
+                top = top_ranked(exact, k)
+                row_ids, row_scores = eligible[top], exact[top]
+            rows.append((row_ids, row_scores))
+        return _pad_results(rows, k)
+
+
+class FaissIndex(_PostFilterIndex):
+    """faiss IndexIVFFlat with inner-product metric (requires the faiss package)."""
+
+    backend = "faiss"
+
+    def __init__(self, dim: int, n_lists: Optional[int] = None, nprobe: int = DEFAULT_NPROBE):
+        import faiss
+
+        super().__init__(dim)
+        self._faiss = faiss
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.index = None
+
+    def train(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.n_lists = max(1, min(self.n_lists or int(np.sqrt(len(vectors))), len(vectors)))
+        quantizer = self._faiss.IndexFlatIP(self.dim)
+        self.index = self._faiss.IndexIVFFlat(quantizer, self.dim, self.n_lists, self._faiss.METRIC_INNER_PRODUCT)
+        self.index.train(vectors)
+        self.index.nprobe = self.nprobe
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        ids = self._append(vectors)
+        self.index.add(self._vectors[ids[0]:ids[-1] + 1] if len(ids) else self._vectors[:0])
+        return ids
+
+    def _search(self, queries: np.ndarray, k: int) -> SearchResult:
+        self.index.nprobe = self.nprobe
+        scores, ids = self.index.search(queries, k)
+        return ids.astype(np.int64), np.where(ids >= 0, scores, -np.inf).astype(np.float32)
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {"n_lists": self.n_lists, "nprobe": self.nprobe}
+
+    def _save_arrays(self, directory: Path) -> None:
+        tmp_path = directory / "index.faiss.tmp"
+        self._faiss.write_index(self.index, str(tmp_path))
+        os.replace(tmp_path, directory / "index.faiss")
+
+    @classmethod
+    def _load(cls, directory: Path, manifest: Dict[str, Any], vectors: np.ndarray) -> "FaissIndex":
+        index = cls(manifest["dim"], manifest["n_lists"], manifest["nprobe"])
+        index._vectors, index._count = vectors, manifest["count"]
+        index.index = index._faiss.read_index(str(directory / "index.faiss"), index._faiss.IO_FLAG_MMAP)
+        index.index.nprobe = index.nprobe
+        return index
+
+
+class HnswlibIndex(_PostFilterIndex):
+    """hnswlib HNSW graph with inner-product space (requires the hnswlib package)."""
+
+    backend = "hnswlib"
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        import hnswlib
+
+        super().__init__(dim)
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(max_elements=1024, M=m, ef_construction=ef_construction)
+        self.index.set_ef(ef_search)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        ids = self._append(vectors)
+        if self._count > self.index.get_max_elements():
+            self.index.resize_index(max(self._count, 2 * self.index.get_max_elements()))
+        self.index.add_items(self._vectors[ids[0]:ids[-1] + 1] if len(ids) else self._vectors[:0], ids)
+        return ids
+
+    def _search(self, queries: np.ndarray, k: int) -> SearchResult:
+        if k == 0:
+            return np.zeros((len(queries), 0), np.int64), np.zeros((len(queries), 0), np.float32)
+        self.index.set_ef(max(self.ef_search, k))
+        ids, distances = self.index.knn_query(queries, k=k)
+        # hnswlib reports inner-product distance as 1 - dot
+        return ids.astype(np.int64), (1.0 - distances).astype(np.float32)
+
+    def _manifest(self) -> Dict[str, Any]:
+        return {"m": self.m, "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+
+    def _save_arrays(self, directory: Path) -> None:
+        tmp_path = directory / "index.hnsw.tmp"
+        self.index.save_index(str(tmp_path))
+        os.replace(tmp_path, directory / "index.hnsw")
+
+    @classmethod
+    def _load(cls, directory: Path, manifest: Dict[str, Any], vectors: np.ndarray) -> "HnswlibIndex":
+        index = cls(manifest["dim"], manifest["m"], manifest["ef_construction"], manifest["ef_search"])
+        index._vectors, index._count = vectors, manifest["count"]
+        index.index.load_index(str(directory / "index.hnsw"), max_elements=max(manifest["count"], 1024))
+        index.index.set_ef(index.ef_search)
+        return index
+
+
+BACKENDS: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.backend: ExactIndex,
+    IVFIndex.backend: IVFIndex,
+    FaissIndex.backend: FaissIndex,
+    HnswlibIndex.backend: HnswlibIndex
+}
+
+
+def create_index(backend: str, dim: int, **options: Any) -> VectorIndex:
+    """
+    Create an empty index.
+
+    Raises:
+        ValueError: If the backend is unknown
+        ImportError: If the backend's library is not installed
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ANN backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](dim, **options)
+
+
+def build_index(backend: str, vectors: np.ndarray, **options: Any) -> VectorIndex:
+    """
+    Create, train and fill an index with vectors, whose ids are their row numbers.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    index = create_index(backend, vectors.shape[1], **options)
+    if len(vectors):
+        index.train(vectors)
+        index.add(vectors)
+    return index
+
+
+def read_manifest(directory: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_index(directory: Union[str, Path]) -> VectorIndex:
+    """
+    Load a saved index; its vectors and cell lists are memory-mapped.
+
+    Raises:
+        FileNotFoundError: If the directory holds no saved index
+        ValueError: If the index was saved by an incompatible version
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No ANN index in {directory}")
+    if manifest.get("version") != ANN_VERSION:
+        raise ValueError(f"Unsupported ANN index version {manifest.get('version')} in {directory}")
+    vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+    return BACKENDS[manifest["backend"]]._load(directory, manifest, vectors)
+
+
+def load_or_build_index(backend: str, vectors: np.ndarray, path: Optional[Union[str, Path]] = None,
+                        **options: Any) -> VectorIndex:
+    """
+    Load the index saved at path if it was built from the same vectors, otherwise build and save it.
+
+    Args:
+        backend: Backend name, see BACKENDS
+        vectors: Embeddings to index
+        path: Optional index directory
+        options: Backend options such as n_lists or nprobe; nprobe also applies to a loaded index
+
+    Returns:
+        The index
+    """
+    source = fingerprint(vectors)
+    if path:
+        manifest = read_manifest(path)
+        if manifest is not None and manifest.get("backend") == backend and manifest.get("fingerprint") == source:
+            logging.info(f"Loaded {backend} ANN index with {manifest['count']} vectors from {path}")
+            index = load_index(path)
+            if "nprobe" in options and hasattr(index, "nprobe"):
+                index.nprobe = options["nprobe"]
+            return index
+    index = build_index(backend, vectors, **options)
+    if path:
+        index.save(path, source)
+        logging.info(f"Built {backend} ANN index with {len(index)} vectors and saved it to {path}")
+    return index
@@ -0,0 +1,312 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.catalog import tokenize
+from api.embeddings import normalize_text
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 3600.0
+DEFAULT_SIMILARITY = 0.95
+EMBEDDING_DIM = 2048
+# Seconds a write waits for another process holding the SQLite lock
+DEFAULT_BUSY_TIMEOUT = 5.0
+
+
+def hashed_embedding(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Embed text as an L2-normalised signed hashing vector of words and word bigrams.
+
+    Unlike the catalog TF-IDF vector this keeps words that do not occur in the
+    catalog, so two queries only look alike when their full wording does.
+
+    Args:
+        text: Text to embed
+        dim: Vector length
+
+    Returns:
+        float32 vector of length dim
+    """
+    tokens = tokenize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def filters_signature(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Canonical JSON for request filters, None when no filter is set.
+    """
+    if not filters:
+        return None
+    return json.dumps(filters, sort_keys=True)
+
+
+def cache_key(query: str, min_duration: Optional[int], max_duration: Optional[int],
+              filters: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build a stable cache key from the normalised request fields.
+
+    Args:
+        query: Job description or natural language query
+        min_duration: Minimum assessment duration in minutes
+        max_duration: Maximum assessment duration in minutes
+        filters: Other request constraints (test types, remote testing, adaptive/IRT)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    fields = [normalize_text(query), min_duration, max_duration]
+    signature = filters_signature(filters)
+    if signature is not None:
+        fields.append(signature)
+    payload = json.dumps(fields)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _SqliteTier:
+    """
+    Persistent cache tier that survives restarts.
+
+    The database runs in WAL mode, so several worker processes can share one
+    file: readers do not block the writer, and concurrent writers wait up to
+    busy_timeout seconds for the lock instead of failing.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = DEFAULT_BUSY_TIMEOUT):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A crash can lose the last commits but never corrupts the file; fine for a cache
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, query TEXT NOT NULL, min_duration INTEGER, max_duration INTEGER, "
+            "value TEXT NOT NULL, expires_at REAL NOT NULL, filters TEXT)"
+        )
+        # Cache files written before request filters existed lack the column
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "filters" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN filters TEXT")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[int], Optional[int], Optional[Dict[str, Any]],
+                                              Dict[str, Any], float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT query, min_duration, max_duration, filters, value, expires_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None or row[5] <= time.time():
+            return None
+        return row[0], row[1], row[2], json.loads(row[3]) if row[3] else None, json.loads(row[4]), row[5]
+
+    def put(self, key: str, query: str, min_duration: Optional[int], max_duration: Optional[int],
+            filters: Optional[Dict[str, Any]], value: Dict[str, Any], expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, query, min_duration, max_duration, filters, value, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, min_duration, max_duration, filters_signature(filters), json.dumps(value), expires_at)
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for recommendation responses.
+
+    The memory tier is an LRU with a per-entry TTL. Every memory entry also owns
+    a row in a preallocated embedding matrix, so a near-duplicate query is found
+    with one matrix-vector product over the live entries. An optional SQLite
+    tier keeps exact-match entries across restarts and shares them between
+    worker processes that use the same file.
+    """
+
+    def __init__(self, embed: Callable[[str], np.ndarray] = hashed_embedding, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: float = DEFAULT_TTL, similarity_threshold: float = DEFAULT_SIMILARITY,
+                 path: Optional[str] = None):
+        self.embed = embed
+        # A miss embeds the query for the lookup and again for the store; recent queries are embedded once
+        self._embed_query = functools.lru_cache(maxsize=max(1, max_entries))(self._readonly_embedding)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # key -> (slot, expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys = [None] * max_entries
+        # Duration constraints per slot, -1 stands for "no constraint"
+        self._slot_bounds = np.full((max_entries, 2), -1, dtype=np.int64)
+        # Canonical filters per slot, None for unfiltered requests
+        self._slot_filters: List[Optional[str]] = [None] * max_entries
+        self._slot_expires = np.zeros(max_entries, dtype=np.float64)
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._disk = _SqliteTier(path) if path else None
+        self.hits = {"memory": 0, "semantic": 0, "disk": 0}
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, embed: Callable[[str], np.ndarray] = hashed_embedding) -> "ResponseCache":
+        """
+        Build a cache from RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL,
+        RESPONSE_CACHE_SIMILARITY and RESPONSE_CACHE_PATH.
+        """
+        return cls(
+            embed,
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", DEFAULT_TTL)),
+            similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", DEFAULT_SIMILARITY)),
+            path=os.getenv("RESPONSE_CACHE_PATH") or None
+        )
+
+    def _readonly_embedding(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed(text), dtype=np.float32)
+        # Shared between calls through the LRU, so it must not be modified in place
+        vector.setflags(write=False)
+        return vector
+
+    @staticmethod
+    def _bounds(min_duration: Optional[int], max_duration: Optional[int]) -> Tuple[int, int]:
+        return (-1 if min_duration is None else min_duration, -1 if max_duration is None else max_duration)
+
+    def get(self, query: str, min_duration: Optional[int] = None,
+            max_duration: Optional[int] = None,
+            filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response for a request.
+
+        Exact matches are tried in memory, then by embedding similarity among
+        requests with the same duration constraints and filters, then on disk.
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        key = cache_key(query, min_duration, max_duration, filters)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return entry[2]
+                self._evict(key)
+
+        if self.similarity_threshold <= 1.0:
+            vector = self._embed_query(normalize_text(query))
+            with self._lock:
+                match = self._nearest(vector, self._bounds(min_duration, max_duration),
+                                      filters_signature(filters), now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.hits["semantic"] += 1
+                    return self._entries[match][2]
+
+        if self._disk is not None:
+            row = self._disk.get(key)
+            if row is not None:
+                stored_query, stored_min, stored_max, stored_filters, value, expires_at = row
+                self._put_memory(key, stored_query, stored_min, stored_max, stored_filters, value, expires_at)
+                with self._lock:
+                    self.hits["disk"] += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, query: str, min_duration: Optional[int], max_duration: Optional[int],
+            value: Dict[str, Any], filters: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Store a response in every tier.
+        """
+        key = cache_key(query, min_duration, max_duration, filters)
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, query, min_duration, max_duration, filters, value, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.put(key, normalize_text(query), min_duration, max_duration, filters, value, expires_at)
+            except sqlite3.Error as e:
+                logging.warning(f"Failed to persist cached response: {e}")
+
+    def _put_memory(self, key: str, query: str, min_duration: Optional[int], max_duration: Optional[int],
+                    filters: Optional[Dict[str, Any]], value: Dict[str, Any], expires_at: float) -> None:
+        vector = self._embed_query(normalize_text(query))
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            while not self._free_slots:
+                self._evict(next(iter(self._entries)))
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._slot_bounds[slot] = self._bounds(min_duration, max_duration)
+            self._slot_filters[slot] = filters_signature(filters)
+            self._slot_expires[slot] = expires_at
+            self._entries[key] = (slot, expires_at, value)
+
+    def _evict(self, key: str) -> None:
+        slot, _, _ = self._entries.pop(key)
+        self._slot_keys[slot] = None
+        self._slot_expires[slot] = 0.0
+        self._free_slots.append(slot)
+
+    def _nearest(self, vector: np.ndarray, bounds: Tuple[int, int], filters: Optional[str],
+                 now: float) -> Optional[str]:
+        if self._vectors is None or not self._entries:
+            return None
+        live = (self._slot_expires > now) & np.all(self._slot_bounds == bounds, axis=1)
+        slots = np.flatnonzero(live)
+        slots = slots[[self._slot_filters[slot] == filters for slot in slots]] if slots.size else slots
+        if slots.size == 0:
+            return None
+        scores = self._vectors[slots] @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return self._slot_keys[slots[best]]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit and miss counters for health checks.
+        """
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            lookups = total_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": round(total_hits / lookups, 4) if lookups else 0.0,
+                "persistent": self._disk is not None
+            }
+
+    def close(self) -> None:
+        """
+        Close the persistent tier.
+        """
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,609 @@
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from api.ann import VectorIndex
+from api.embeddings import EmbeddingStore
+from api.retrieval import (
+    DEFAULT_DENSE_DIM,
+    RRF_K,
+    BM25Index,
+    CsrMatrix,
+    DenseIndex,
+    lsa_embeddings,
+    reciprocal_rank_fusion,
+    sparse_tfidf,
+    top_ranked
+)
+from api.snapshot import MISSING_INT, SnapshotRecords, save_array, write_snapshot
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "data" / "catalog.json"
+
+ASSESSMENT_FIELDS = ("assessment_name", "url", "remote_testing", "adaptive_irt", "duration", "test_type")
+
+# Test type keys used by the SHL catalog, and the names they stand for
+TEST_TYPES = {
+    "A": "Ability & Aptitude",
+    "B": "Biodata & Situational Judgement",
+    "C": "Competencies",
+    "D": "Development & 360",
+    "E": "Assessment Exercises",
+    "K": "Knowledge & Skills",
+    "P": "Personality & Behaviour",
+    "S": "Simulations"
+}
+FLAG_FIELDS = ("remote_testing", "adaptive_irt")
+# How many results of each retriever take part in rank fusion
+FUSION_DEPTH = 100
+
+INDEX_VERSION = 1
+INDEX_MANIFEST_NAME = "index.json"
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have i in is it looking need of on or our "
+    "should that the their this to we who will with within".split()
+)
+
+
+def split_test_types(test_type: str) -> List[str]:
+    """
+    Split a record's test_type, which lists several types separated by commas.
+    """
+    return [name.strip() for name in test_type.split(",") if name.strip()]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search tokens.
+
+    Args:
+        text: Free text such as a job description or an assessment name
+
+    Returns:
+        List of tokens with stopwords removed
+    """
+    return [tok for tok in _TOKEN_RE.findall(text.lower()) if tok not in _STOPWORDS]
+
+
+
+def _bits_at(bits: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Read the bits of a packed (big-endian) bitset at the given rows."""
+    return ((bits[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+class AssessmentCatalog:
+    """
+    In-memory SHL assessment catalog with hybrid lexical and dense retrieval.
+
+    Queries are scored by BM25 over an inverted index, which rewards exact
+    skill keywords ("Java", "SQL"), and by cosine similarity of LSA embeddings,
+    which also matches related wording ("collaborate", "teamwork"). The two
+    rankings are combined with reciprocal-rank fusion. Term statistics are
+    kept in sparse CSR matrices, so memory and scoring cost follow the number
+    of non-zero entries rather than assessments x vocabulary.
+
+    Request constraints are answered from precomputed indexes before scoring:
+    durations are kept sorted, so a duration range is two binary searches
+    that yield the candidate rows directly (unknown durations, stored as
+    MISSING_INT, sort first and never match a bound). Every test type and
+    flag value has a packed bitset; with a duration bound only the bits of
+    the candidate rows are read, and without one the bitsets are ANDed over
+    n/8 bytes and unpacked into rows.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], durations: Optional[np.ndarray] = None,
+                 dense_dim: int = DEFAULT_DENSE_DIM, embedding_dir: Optional[Union[str, Path]] = None):
+        self._init_records(records)
+        documents: List[List[str]] = []
+        type_rows: Dict[str, List[int]] = {}
+        flag_rows: Dict[Tuple[str, bool], List[int]] = {}
+        for i, rec in enumerate(records):
+            documents.append(self._document_tokens(rec))
+            for name in split_test_types(rec.get("test_type", "")):
+                type_rows.setdefault(name, []).append(i)
+            for field in FLAG_FIELDS:
+                flag_rows.setdefault((field, bool(rec[field])), []).append(i)
+        if durations is None:
+            durations = np.array([MISSING_INT if rec.get("duration") is None else int(rec["duration"])
+                                  for rec in records], dtype=np.int32)
+        self.durations = durations
+
+        # Filter indexes
+        self._duration_order = np.argsort(self.durations, kind="stable")
+        self._sorted_durations = self.durations[self._duration_order]
+        self._set_type_bits({name: self._bitset(rows) for name, rows in type_rows.items()})
+        self._flag_bits = {key: self._bitset(rows) for key, rows in flag_rows.items()}
+        self._empty_bits = self._bitset([])
+
+        # Retrieval indexes
+        vocabulary: Dict[str, int] = {}
+        term_ids = [[vocabulary.setdefault(tok, len(vocabulary)) for tok in tokens] for tokens in documents]
+        self.vocabulary = vocabulary
+        self.tfidf, self.idf = sparse_tfidf(term_ids, len(vocabulary))
+        self.bm25 = BM25Index(term_ids, len(vocabulary))
+        if embedding_dir is None:
+            self.dense = DenseIndex(self.tfidf, dense_dim)
+        else:
+            self.dense = self._stored_dense_index(documents, dense_dim, embedding_dir)
+        # Optional nearest-neighbour index over the dense embeddings, see attach_ann
+        self.ann: Optional[VectorIndex] = None
+
+    def _init_records(self, records: Sequence[Dict[str, Any]]) -> None:
+        self.records = records
+        # Built on the first lookup, so workers that load a saved index do not decode every record
+        self._by_name: Optional[Dict[str, int]] = None
+        # One-line description of each assessment, rendered once for prompt building
+        self._summaries: Dict[int, str] = {}
+
+    def _set_type_bits(self, type_bits: Dict[str, np.ndarray]) -> None:
+        self._type_bits = type_bits
+        self._type_names = {name.lower(): name for name in type_bits}
+        self._type_names.update({key.lower(): name for key, name in TEST_TYPES.items()})
+
+    def _stored_dense_index(self, documents: List[List[str]], dense_dim: int,
+                            embedding_dir: Union[str, Path]) -> DenseIndex:
+        """
+        Dense index whose components and document embeddings come from an embedding store.
+
+        The SVD only runs when the store has no components for this model
+        version (i.e. the catalog text or settings changed); then components
+        and embeddings are saved for the next start.
+        """
+        store = EmbeddingStore(embedding_dir, DenseIndex.model_version(self.tfidf, dense_dim))
+        texts = [" ".join(tokens) for tokens in documents]
+        components = store.load_array("components")
+        if components is None:
+            dense = DenseIndex(self.tfidf, dense_dim)
+            store.save_array("components", dense.components)
+            store.put_many(texts, dense.embeddings)
+            logging.info(f"Computed {dense.version} embeddings for {len(texts)} assessments into {store.directory}")
+            return dense
+
+        rows_by_text = {text: row for row, text in enumerate(texts)}
+        embeddings = store.embed(
+            texts, lambda batch: lsa_embeddings(self.tfidf.take_rows([rows_by_text[text] for text in batch]), components)
+        )
+        return DenseIndex(self.tfidf, dense_dim, components=components, embeddings=embeddings)
+
+    @classmethod
+    def from_file(cls, path: Optional[Path] = None, **options: Any) -> "AssessmentCatalog":
+        """
+        Load a catalog from a JSON file containing a list of assessment records.
+
+        Args:
+            path: Path to the catalog file, defaults to data/catalog.json
+            options: Index options such as dense_dim and embedding_dir
+
+        Returns:
+            AssessmentCatalog instance
+        """
+        with open(path or DEFAULT_CATALOG_PATH, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **options)
+
+    @classmethod
+    def from_snapshot(cls, directory: Path, **options: Any) -> "AssessmentCatalog":
+        """
+        Load a catalog from a columnar snapshot written by api.snapshot.write_snapshot.
+
+        The snapshot columns are memory-mapped; the duration column is used
+        in place as the duration filter array.
+
+        Args:
+            directory: Snapshot directory
+            options: Index options such as dense_dim and embedding_dir
+
+        Returns:
+            AssessmentCatalog instance
+        """
+        records = SnapshotRecords(directory)
+        return cls(records, durations=records.columns["duration"], **options)
+
+    @classmethod
+    def from_index(cls, directory: Union[str, Path]) -> "AssessmentCatalog":
+        """
+        Load a catalog index saved with save_index.
+
+        Nothing is rebuilt: records and every index array are memory-mapped
+        read-only, so processes that load the same directory share one copy of
+        the data in the page cache.
+
+        Args:
+            directory: Index directory
+
+        Returns:
+            AssessmentCatalog instance
+        """
+        directory = Path(directory)
+        with open(directory / INDEX_MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported catalog index version {manifest.get('version')} in {directory}")
+
+        def array(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        catalog = cls.__new__(cls)
+        records = SnapshotRecords(directory / "records")
+        catalog._init_records(records)
+        catalog.durations = records.columns["duration"]
+        catalog._duration_order = array("duration_order")
+        catalog._sorted_durations = array("sorted_durations")
+        type_bits = array("type_bits")
+        catalog._set_type_bits({name: type_bits[i] for i, name in enumerate(manifest["test_types"])})
+        flag_bits = array("flag_bits")
+        catalog._flag_bits = {(field, value): flag_bits[i] for i, (field, value) in enumerate(manifest["flags"])}
+        catalog._empty_bits = catalog._bitset([])
+
+        catalog.vocabulary = {term: i for i, term in enumerate(manifest["vocabulary"])}
+        n_docs, n_terms = manifest["tfidf_shape"]
+        catalog.tfidf = CsrMatrix(array("tfidf.indptr"), array("tfidf.indices"), array("tfidf.data"), (n_docs, n_terms))
+        catalog.idf = array("idf")
+        catalog.bm25 = BM25Index.from_postings(
+            CsrMatrix(array("bm25.indptr"), array("bm25.indices"), array("bm25.data"), (n_terms, n_docs)),
+            array("bm25.idf")
+        )
+        catalog.dense = DenseIndex(catalog.tfidf, components=array("dense.components"),
+                                   embeddings=array("dense.embeddings"), version=manifest["dense_version"])
+        catalog.ann = None
+        return catalog
+
+    @classmethod
+    def from_env(cls) -> "AssessmentCatalog":
+        """
+        Load the catalog configured by CATALOG_INDEX_PATH, CATALOG_SNAPSHOT or CATALOG_PATH.
+
+        A saved index is memory-mapped as is. Otherwise the index is built,
+        with embeddings from EMBEDDING_STORE_PATH when it is set.
+        """
+        index_path = os.getenv("CATALOG_INDEX_PATH")
+        if index_path:
+            return cls.from_index(index_path)
+        snapshot = os.getenv("CATALOG_SNAPSHOT")
+        # Embeddings precomputed with python -m api.embeddings, so the SVD does not run at startup
+        options = {"embedding_dir": os.getenv("EMBEDDING_STORE_PATH") or None}
+        if snapshot:
+            # Memory-mapped columnar snapshot written by api.ingest
+            return cls.from_snapshot(snapshot, **options)
+        return cls.from_file(os.getenv("CATALOG_PATH") or None, **options)
+
+    def save_index(self, directory: Union[str, Path]) -> Path:
+        """
+        Save the records and every index array for from_index.
+
+        Records become a columnar snapshot in records/, each array an .npy
+        file, and the manifest (vocabulary, test type and flag names) is
+        written last, so a partial save is never loaded.
+
+        Args:
+            directory: Index directory, created if missing
+
+        Returns:
+            Path of the index directory
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        write_snapshot(self.records, directory / "records")
+        type_names = sorted(self._type_bits)
+        flag_keys = sorted(self._flag_bits)
+        arrays = {
+            "duration_order": self._duration_order,
+            "sorted_durations": self._sorted_durations,
+            "type_bits": np.stack([self._type_bits[name] for name in type_names] + [self._empty_bits])[:-1],
+            "flag_bits": np.stack([self._flag_bits[key] for key in flag_keys] + [self._empty_bits])[:-1],
+            "idf": self.idf,
+            "tfidf.indptr": self.tfidf.indptr,
+            "tfidf.indices": self.tfidf.indices,
+            "tfidf.data": self.tfidf.data,
+            "bm25.indptr": self.bm25.postings.indptr,
+            "bm25.indices": self.bm25.postings.indices,
+            "bm25.data": self.bm25.postings.data,
+            "bm25.idf": self.bm25.idf,
+            "dense.components": self.dense.components,
+            "dense.embeddings": self.dense.embeddings
+        }
+        for name, values in arrays.items():
+            save_array(directory / f"{name}.npy", np.asarray(values))
+
+        manifest = {"version": INDEX_VERSION, "count": len(self), "tfidf_shape": list(self.tfidf.shape),
+                    "dense_version": self.dense.version, "test_types": type_names,
+                    "flags": [list(key) for key in flag_keys],
+                    "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get)}
+        tmp_path = directory / f"{INDEX_MANIFEST_NAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, directory / INDEX_MANIFEST_NAME)
+        return directory
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def _document_tokens(record: Dict[str, Any]) -> List[str]:
+        # The name is repeated so that title matches outweigh description matches
+        name_tokens = tokenize(record["assessment_name"])
+        return (
+            name_tokens * 2
+            + tokenize(record.get("description", ""))
+            + tokenize(record.get("test_type", ""))
+        )
+
+    def _bitset(self, rows: Iterable[int]) -> np.ndarray:
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[list(rows)] = True
+        return np.packbits(mask)
+
+    @property
+    def test_types(self) -> List[str]:
+        """Test type names present in the catalog."""
+        return sorted(self._type_bits)
+
+    def resolve_test_type(self, name: str) -> str:
+        """
+        Map a test type name or its one-letter key, in any case, to the catalog's name.
+
+        Raises:
+            ValueError: If the catalog has no such test type
+        """
+        resolved = self._type_names.get(name.strip().lower())
+        if resolved is None:
+            raise ValueError(f"Unknown test type {name!r}, expected one of {self.test_types}")
+        return resolved
+
+    def duration_rows(self, min_duration: Optional[int] = None, max_duration: Optional[int] = None) -> np.ndarray:
+        """
+        Indices of the records whose duration is within the bounds, found by binary search.
+
+        Records with an unknown duration are only returned when there is no bound at all.
+        """
+        if min_duration is None and max_duration is None:
+            return self._duration_order
+        # Unknown durations (negative) sort before every known one
+        known = np.searchsorted(self._sorted_durations, 0, side="left")
+        lo = known if min_duration is None else max(known, np.searchsorted(self._sorted_durations, min_duration, side="left"))
+        hi = len(self.records) if max_duration is None else np.searchsorted(self._sorted_durations, max_duration, side="right")
+        return self._duration_order[lo:hi]
+
+    def candidate_rows(self, min_duration: Optional[int] = None, max_duration: Optional[int] = None,
+                       test_types: Optional[List[str]] = None, remote_testing: Optional[bool] = None,
+                       adaptive_irt: Optional[bool] = None) -> Optional[np.ndarray]:
+        """
+        Sorted indices of the records that satisfy every given constraint.
+
+        With a duration bound the cost follows the number of records in the
+        duration range, not the catalog size: the range comes from the sorted
+        durations and only those rows' test type and flag bits are read.
+
+        Args:
+            min_duration: Minimum assessment duration in minutes
+            max_duration: Maximum assessment duration in minutes
+            test_types: Accept records with any of these test types (names or one-letter keys)
+            remote_testing: Required remote testing support
+            adaptive_irt: Required adaptive/IRT support
+
+        Returns:
+            Record indices in ascending order, or None when no constraint is given
+
+        Raises:
+            ValueError: If a test type is unknown
+        """
+        type_bits = [self._type_bits[name] for name in {self.resolve_test_type(name) for name in test_types or []}]
+        flag_bits = [self._flag_bits.get((field, value), self._empty_bits)
+                     for field, value in (("remote_testing", remote_testing), ("adaptive_irt", adaptive_irt))
+                     if value is not None]
+        if min_duration is None and max_duration is None:
+            if not type_bits and not flag_bits:
+                return None
+            # No range to narrow the rows: combine the packed bitsets and unpack them once
+            bits = np.bitwise_and.reduce(([np.bitwise_or.reduce(type_bits)] if type_bits else []) + flag_bits)
+            return np.flatnonzero(np.unpackbits(bits, count=len(self.records)))
+
+        rows = np.sort(self.duration_rows(min_duration, max_duration))
+        if type_bits:
+            rows = rows[np.logical_or.reduce([_bits_at(bits, rows) for bits in type_bits])]
+        for bits in flag_bits:
+            rows = rows[_bits_at(bits, rows)]
+        return rows
+
+    def candidate_mask(self, min_duration: Optional[int] = None, max_duration: Optional[int] = None,
+                       test_types: Optional[List[str]] = None, remote_testing: Optional[bool] = None,
+                       adaptive_irt: Optional[bool] = None) -> Optional[np.ndarray]:
+        """
+        Boolean mask of the records that satisfy every given constraint (see candidate_rows).
+
+        Returns:
+            Mask of length len(catalog), or None when no constraint is given
+
+        Raises:
+            ValueError: If a test type is unknown
+        """
+        rows = self.candidate_rows(min_duration, max_duration, test_types, remote_testing, adaptive_irt)
+        if rows is None:
+            return None
+        mask = np.zeros(len(self.records), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def attach_ann(self, index: Optional[VectorIndex]) -> None:
+        """
+        Serve the dense ranking from a nearest-neighbour index instead of a full scan.
+
+        Args:
+            index: Index over dense.embeddings with ids equal to record indices, or None for exact scoring
+        """
+        if index is not None and len(index) != len(self.records):
+            raise ValueError(f"ANN index has {len(index)} vectors for {len(self.records)} assessments")
+        self.ann = index
+
+    def query_terms(self, query: str) -> List[int]:
+        """
+        Token ids of the query words that occur in the catalog.
+        """
+        return [self.vocabulary[tok] for tok in tokenize(query) if tok in self.vocabulary]
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Project a query onto the catalog vocabulary.
+
+        Args:
+            query: Job description or natural language query
+
+        Returns:
+            L2-normalised float32 TF-IDF vector of length len(vocabulary)
+        """
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        np.add.at(vector, self.query_terms(query), 1.0)
+        vector = np.log1p(vector) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def search(self, query: str, k: int = 10,
+               min_duration: Optional[int] = None,
+               max_duration: Optional[int] = None,
+               candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Score a query against every assessment and return the best matches.
+
+        Args:
+            query: Job description or natural language query
+            k: Maximum number of results
+            min_duration: Minimum assessment duration in minutes
+            max_duration: Maximum assessment duration in minutes
+            candidates: Optional sorted record indices to search, see candidate_rows
+
+        Returns:
+            List of (record index, fused score) pairs, best first
+        """
+        return self.search_batch([query], k, [min_duration], [max_duration], [candidates])[0]
+
+    def search_batch(self, queries: List[str], k: int = 10,
+                     min_durations: Optional[List[Optional[int]]] = None,
+                     max_durations: Optional[List[Optional[int]]] = None,
+                     candidates: Optional[List[Optional[np.ndarray]]] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Rank assessments for many queries by fused BM25 and dense similarity.
+
+        Dense scores for the whole batch are one matrix-matrix product.
+        Constraints are applied before scoring: only assessments allowed for at
+        least one query in the batch are scored, and each query's rankings only
+        contain assessments it allows.
+
+        Args:
+            queries: Job descriptions or natural language queries
+            k: Maximum number of results per query
+            min_durations: Per-query minimum duration, None entries mean no bound
+            max_durations: Per-query maximum duration, None entries mean no bound
+            candidates: Per-query sorted record indices (see candidate_rows), None entries mean no filter
+
+        Returns:
+            One list of (record index, reciprocal-rank fusion score) pairs per query, best first
+        """
+        if not queries:
+            return []
+        if min(k, len(self.records)) <= 0:
+            return [[] for _ in queries]
+
+        row_ids: List[Optional[np.ndarray]] = []
+        for row in range(len(queries)):
+            rows = self.candidate_rows(
+                min_durations[row] if min_durations else None,
+                max_durations[row] if max_durations else None
+            )
+            extra = candidates[row] if candidates else None
+            if extra is not None:
+                rows = extra if rows is None else np.intersect1d(rows, extra, assume_unique=True)
+            row_ids.append(rows)
+
+        # Only assessments allowed for some query are scored; allowed is relative to these columns
+        allowed: Optional[np.ndarray] = None
+        if any(rows is None for rows in row_ids):
+            columns = np.arange(len(self.records))
+        else:
+            columns = np.unique(np.concatenate(row_ids))
+        if columns.size == 0:
+            return [[] for _ in queries]
+        if any(rows is not None for rows in row_ids):
+            allowed = np.zeros((len(queries), columns.size), dtype=bool)
+            for row, rows in enumerate(row_ids):
+                if rows is None:
+                    allowed[row] = True
+                else:
+                    allowed[row, np.searchsorted(columns, rows)] = True
+        vectors = np.stack([self.encode_query(query) for query in queries])
+        # A query without catalog terms has a zero vector; its dense ranking would be arbitrary
+        has_dense = (np.linalg.norm(vectors, axis=1) > 0) & bool(self.dense.dim)
+        embedded = self.dense.encode(vectors)
+        depth = max(k, FUSION_DEPTH)
+        ann_ids: Dict[int, np.ndarray] = {}
+        if self.ann is not None:
+            dense_rows = np.flatnonzero(has_dense)
+            if dense_rows.size:
+                ann_allowed = None
+                if allowed is not None:
+                    # The ANN index filters by record index
+                    ann_allowed = np.zeros((dense_rows.size, len(self.records)), dtype=bool)
+                    ann_allowed[:, columns] = allowed[dense_rows]
+                found, _ = self.ann.search(embedded[dense_rows], depth, ann_allowed)
+                ann_ids = dict(zip(dense_rows.tolist(), found))
+        else:
+            embeddings = self.dense.embeddings if allowed is None else self.dense.embeddings[columns]
+            dense_scores = embedded @ embeddings.T
+
+        results = []
+        for row, query in enumerate(queries):
+            lexical = self.bm25.scores(self.query_terms(query))[columns]
+            if allowed is not None:
+                lexical = np.where(allowed[row], lexical, -np.inf)
+            # Assessments sharing no term with the query are left out of the lexical ranking
+            lexical[lexical == 0] = -np.inf
+            rankings = [top_ranked(lexical, depth)]
+            # Without a dense ranking, a query that matches no term has no results
+            if has_dense[row] and self.ann is not None:
+                # ANN results are record indices of allowed assessments; map them to column positions
+                ids = ann_ids[row]
+                rankings.append(np.searchsorted(columns, ids[ids >= 0]))
+            elif has_dense[row]:
+                semantic = dense_scores[row]
+                if allowed is not None:
+                    semantic = np.where(allowed[row], semantic, -np.inf)
+                rankings.append(top_ranked(semantic, depth))
+            fused = reciprocal_rank_fusion(rankings, columns.size, RRF_K)
+            top = top_ranked(np.where(fused > 0, fused, -np.inf), k)
+            results.append([(int(columns[i]), float(fused[i])) for i in top])
+        return results
+
+    def assessment(self, index: int) -> Dict[str, Any]:
+        """
+        Return the public assessment fields of a catalog record.
+        """
+        record = self.records[index]
+        return {field: record[field] for field in ASSESSMENT_FIELDS}
+
+    def assessment_summary(self, index: int) -> str:
+        """
+        Return a one-line description of a catalog record for LLM prompts.
+        """
+        summary = self._summaries.get(index)
+        if summary is None:
+            summary = self._summaries[index] = self._summary(self.records[index])
+        return summary
+
+    @staticmethod
+    def _summary(record: Dict[str, Any]) -> str:
+        duration = "duration unknown" if record.get("duration") is None else f"{record['duration']} min"
+        summary = f"{record['assessment_name']} ({record['test_type']}, {duration})"
+        description = record.get("description")
+        return f"{summary}: {description}" if description else summary
+
+    def find_by_name(self, name: str) -> Optional[int]:
+        """
+        Look up a record index by its exact (case-insensitive) assessment name.
+        """
+        if self._by_name is None:
+            self._by_name = {rec["assessment_name"].lower(): i for i, rec in enumerate(self.records)}
+        return self._by_name.get(name.strip().lower())
+
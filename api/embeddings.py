@@ -0,0 +1,228 @@
+"""
+Persistent embedding store keyed by content hash and model version.
+
+    python -m api.embeddings --store data/embeddings [--catalog data/catalog.json | --snapshot DIR]
+
+Each model version has its own directory with an append-only float32 vector
+file (memory-mapped for reads) and a parallel file of 32-byte SHA-256 keys of
+the normalised text, so the key of row i is bytes [32 i, 32 i + 32). Model
+artifacts such as the LSA components are kept next to them as .npy files.
+Several processes can share a store: appends take an exclusive file lock and
+readers pick up rows written by others on their next miss.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from api.snapshot import save_array
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialised within the process
+    fcntl = None
+
+KEY_BYTES = 32
+DEFAULT_BATCH_SIZE = 256
+KEYS_NAME = "keys.bin"
+VECTORS_NAME = "vectors.f32"
+META_NAME = "meta.json"
+
+_VERSION_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise text so that formatting differences share an embedding and a response cache key.
+    """
+    return " ".join(text.lower().split())
+
+
+class EmbeddingStore:
+    """
+    Embeddings of one model version, keyed by SHA-256 of model version and normalised text.
+
+    Args:
+        directory: Store root; each model version gets a subdirectory
+        model_version: Identifies the embedding model; vectors of other versions are never returned
+    """
+
+    def __init__(self, directory: Union[str, Path], model_version: str):
+        self.model_version = model_version
+        self.directory = Path(directory) / _VERSION_RE.sub("_", model_version)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._keys_path = self.directory / KEYS_NAME
+        self._vectors_path = self.directory / VECTORS_NAME
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._count = 0
+        self._vectors: Optional[np.ndarray] = None
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_version}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with open(self.directory / "lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _complete_rows(self) -> int:
+        meta_path = self.directory / META_NAME
+        if self.dim is None and meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        if self.dim is None or not self._keys_path.exists() or not self._vectors_path.exists():
+            return 0
+        return min(self._keys_path.stat().st_size // KEY_BYTES,
+                   self._vectors_path.stat().st_size // (4 * self.dim))
+
+    def _refresh(self) -> None:
+        """Index rows appended since the last refresh, including rows written by other processes."""
+        count = self._complete_rows()
+        if count <= self._count:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._count * KEY_BYTES)
+            new_keys = f.read((count - self._count) * KEY_BYTES)
+        for i in range(count - self._count):
+            self._rows.setdefault(new_keys[i * KEY_BYTES:(i + 1) * KEY_BYTES], self._count + i)
+        self._count = count
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up stored embeddings.
+
+        Returns:
+            (n_texts, dim) matrix with zero rows for misses, and the positions of the misses
+        """
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            rows = [self._rows.get(key, -1) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row < 0]
+        result = np.zeros((len(texts), self.dim or 0), dtype=np.float32)
+        found = [i for i, row in enumerate(rows) if row >= 0]
+        if found:
+            result[found] = self._vectors[[rows[i] for i in found]]
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(missing)
+        return result, missing
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Append embeddings for texts that are not stored yet.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.directory / META_NAME, "w", encoding="utf-8") as f:
+                    json.dump({"model_version": self.model_version, "dim": self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store's {self.dim}")
+            new: Dict[bytes, int] = {}
+            for position, text in enumerate(texts):
+                key = self.key(text)
+                if key not in self._rows:
+                    new.setdefault(key, position)
+            if not new:
+                return
+            # Drop a partial row left by an interrupted append, so keys and vectors stay aligned
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(self._count * 4 * self.dim)
+                f.write(vectors[list(new.values())].tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.truncate(self._count * KEY_BYTES)
+                f.write(b"".join(new))
+            self._refresh()
+
+    def embed(self, texts: Sequence[str], embed_batch: Callable[[List[str]], np.ndarray],
+              batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """
+        Embeddings for texts, computing and storing only the missing ones, in batches.
+
+        Args:
+            texts: Texts to embed
+            embed_batch: Embeds a list of texts into a (len(texts), dim) matrix
+            batch_size: Texts per embed_batch call
+
+        Returns:
+            (n_texts, dim) float32 matrix
+        """
+        result, missing = self.get_many(texts)
+        if not missing:
+            return result
+        computed = []
+        for start in range(0, len(missing), batch_size):
+            batch = [texts[i] for i in missing[start:start + batch_size]]
+            vectors = np.asarray(embed_batch(batch), dtype=np.float32)
+            self.put_many(batch, vectors)
+            computed.append(vectors)
+        computed_matrix = np.concatenate(computed)
+        if result.shape[1] == 0:
+            # The store was empty, so every text was computed
+            result = np.zeros((len(texts), computed_matrix.shape[1]), dtype=np.float32)
+        result[missing] = computed_matrix
+        return result
+
+    def load_array(self, name: str) -> Optional[np.ndarray]:
+        """
+        A model artifact saved with save_array, memory-mapped, or None if absent.
+        """
+        path = self.directory / f"{name}.npy"
+        return np.load(path, mmap_mode="r") if path.exists() else None
+
+    def save_array(self, name: str, array: np.ndarray) -> None:
+        """
+        Save a model artifact (e.g. LSA components) for this model version.
+        """
+        save_array(self.directory / f"{name}.npy", array)
+
+
+def main():
+    from api.catalog import AssessmentCatalog
+
+    parser = argparse.ArgumentParser(description="Precompute catalog embeddings so API workers start warm")
+    parser.add_argument("--store", type=Path, default=Path("data/embeddings"), help="Embedding store directory")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--catalog", type=Path, help="Catalog JSON file, defaults to data/catalog.json")
+    source.add_argument("--snapshot", type=Path, help="Catalog snapshot directory written by api.ingest")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    started = time.perf_counter()
+    if args.snapshot:
+        catalog = AssessmentCatalog.from_snapshot(args.snapshot, embedding_dir=args.store)
+    else:
+        catalog = AssessmentCatalog.from_file(args.catalog, embedding_dir=args.store)
+    print(json.dumps({"model_version": catalog.dense.version, "assessments": len(catalog),
+                      "dim": catalog.dense.dim, "seconds": round(time.perf_counter() - started, 3)}))
+
+
+if __name__ == "__main__":
+    main()
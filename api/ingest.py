@@ -0,0 +1,234 @@
+"""
+Build the assessment catalog from saved SHL product catalog pages.
+
+    python -m api.ingest saved_pages/ --snapshot data/catalog_snapshot --json data/catalog.json
+
+Listing pages (the product catalog tables) give each assessment's name, URL,
+remote testing and adaptive/IRT flags and test type keys; product pages give
+the description and completion time. Pages are matched by product URL.
+
+Re-running over the same directory only parses pages whose content changed:
+the parsed items of every page are kept in a manifest next to the snapshot
+together with the page's SHA-256.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from api.catalog import TEST_TYPES
+from api.snapshot import write_snapshot
+
+BASE_URL = "https://www.shl.com"
+INGEST_MANIFEST_NAME = "ingest_manifest.json"
+PRODUCT_PATH = "/product-catalog/view/"
+
+_DURATION_RE = re.compile(r"completion time in minutes\s*=\s*(?:max\s*)?(\d+)", re.IGNORECASE)
+
+
+def _text(node: Any) -> str:
+    return " ".join(node.get_text(" ").split()) if node is not None else ""
+
+
+def _has_yes_marker(cell: Any) -> bool:
+    return cell is not None and cell.select_one(".-yes, .catalogue__circle.-yes") is not None
+
+
+def _test_type(keys: List[str]) -> str:
+    return ", ".join(TEST_TYPES[key] for key in keys if key in TEST_TYPES)
+
+
+def product_url(href: str, base_url: str = BASE_URL) -> str:
+    """
+    Absolute product URL with a trailing slash, used to match listing rows with product pages.
+    """
+    url = urljoin(base_url + "/", href.strip()).split("?")[0].split("#")[0]
+    return url if url.endswith("/") else url + "/"
+
+
+def parse_listing_page(html: str, base_url: str = BASE_URL) -> List[Dict[str, Any]]:
+    """
+    Parse the assessment rows of a catalog listing page.
+
+    Args:
+        html: Page HTML
+        base_url: Base for relative product links
+
+    Returns:
+        Partial records with assessment_name, url, remote_testing, adaptive_irt and test_type
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    items = []
+    for row in soup.find_all("tr"):
+        cells = row.find_all("td")
+        link = row.find("a", href=lambda href: href and PRODUCT_PATH in href)
+        if not cells or link is None:
+            continue
+        keys = [_text(key) for key in row.select(".product-catalogue__key")]
+        items.append({
+            "assessment_name": _text(link),
+            "url": product_url(link["href"], base_url),
+            "remote_testing": _has_yes_marker(cells[1]) if len(cells) > 1 else False,
+            "adaptive_irt": _has_yes_marker(cells[2]) if len(cells) > 2 else False,
+            "test_type": _test_type(keys)
+        })
+    return items
+
+
+def _section(soup: BeautifulSoup, heading: str) -> Optional[Any]:
+    for title in soup.find_all(["h2", "h3", "h4"]):
+        if _text(title).rstrip(":").lower() == heading:
+            return title.parent
+    return None
+
+
+def parse_product_page(html: str, base_url: str = BASE_URL) -> Optional[Dict[str, Any]]:
+    """
+    Parse a product page into a partial record.
+
+    Args:
+        html: Page HTML
+        base_url: Base for a relative canonical link
+
+    Returns:
+        Partial record with url, assessment_name, description and duration (when
+        stated), or None if the page is not a product page
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    canonical = soup.find("link", rel="canonical", href=lambda href: href and PRODUCT_PATH in href)
+    if canonical is None:
+        return None
+
+    item: Dict[str, Any] = {"url": product_url(canonical["href"], base_url), "assessment_name": _text(soup.find("h1"))}
+    description = _section(soup, "description")
+    if description is not None:
+        item["description"] = _text(description.find("p"))
+    length = _section(soup, "assessment length")
+    match = _DURATION_RE.search(_text(length) if length is not None else _text(soup))
+    if match:
+        item["duration"] = int(match.group(1))
+    keys = [_text(key) for key in soup.select(".product-catalogue__key")]
+    if keys:
+        item["test_type"] = _test_type(keys)
+    return item
+
+
+def parse_page(html: str, base_url: str = BASE_URL) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Classify a saved page and parse it.
+
+    Returns:
+        ("product", [item]), ("listing", items) or ("other", [])
+    """
+    product = parse_product_page(html, base_url)
+    if product is not None:
+        return "product", [product]
+    listing = parse_listing_page(html, base_url)
+    return ("listing", listing) if listing else ("other", [])
+
+
+def merge_records(pages: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Join listing rows and product pages by URL into complete catalog records.
+
+    Listing rows define the catalog and its order; a product page fills in the
+    description and duration. Products that only have a product page are
+    appended. A duration of None means no page states the completion time.
+    """
+    products: Dict[str, Dict[str, Any]] = {}
+    listed: Dict[str, Dict[str, Any]] = {}
+    for name in sorted(pages):
+        page = pages[name]
+        for item in page["items"]:
+            target = products if page["kind"] == "product" else listed
+            target.setdefault(item["url"], item)
+
+    records = []
+    for url in list(listed) + [url for url in products if url not in listed]:
+        row = listed.get(url, {})
+        product = products.get(url, {})
+        records.append({
+            "assessment_name": row.get("assessment_name") or product.get("assessment_name", ""),
+            "url": url,
+            "remote_testing": bool(row.get("remote_testing", False)),
+            "adaptive_irt": bool(row.get("adaptive_irt", False)),
+            "duration": product.get("duration"),
+            "test_type": row.get("test_type") or product.get("test_type", ""),
+            "description": product.get("description", "")
+        })
+    return records
+
+
+def ingest(pages_dir: Path, snapshot_dir: Path, json_path: Optional[Path] = None,
+           base_url: str = BASE_URL) -> Dict[str, Any]:
+    """
+    Parse saved pages into catalog records and write the snapshot.
+
+    Pages whose SHA-256 matches the manifest of the previous run are not parsed
+    again, and when no page was added, changed or removed the snapshot is left
+    as it is.
+
+    Args:
+        pages_dir: Directory of saved HTML pages (searched recursively)
+        snapshot_dir: Output snapshot directory, also holds the ingest manifest
+        json_path: Optionally also write the records as catalog JSON
+        base_url: Base for relative links
+
+    Returns:
+        Counts of parsed, reused and removed pages and of records
+    """
+    manifest_path = snapshot_dir / INGEST_MANIFEST_NAME
+    previous: Dict[str, Dict[str, Any]] = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("pages", {})
+
+    pages: Dict[str, Dict[str, Any]] = {}
+    parsed = 0
+    for path in sorted(pages_dir.rglob("*.htm*")):
+        name = path.relative_to(pages_dir).as_posix()
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        if previous.get(name, {}).get("sha256") == digest:
+            pages[name] = previous[name]
+            continue
+        kind, items = parse_page(content.decode("utf-8", errors="replace"), base_url)
+        if kind == "other":
+            logging.warning(f"No assessments found in {path}")
+        pages[name] = {"sha256": digest, "kind": kind, "items": items}
+        parsed += 1
+
+    removed = len(set(previous) - set(pages))
+    records = merge_records(pages)
+    if parsed or removed or not manifest_path.exists():
+        write_snapshot(records, snapshot_dir)
+        if json_path is not None:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"pages": pages}, f)
+
+    return {"pages_parsed": parsed, "pages_reused": len(pages) - parsed, "pages_removed": removed,
+            "records": len(records)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the assessment catalog from saved SHL catalog pages")
+    parser.add_argument("pages", type=Path, help="Directory of saved listing and product pages")
+    parser.add_argument("--snapshot", type=Path, default=Path("data/catalog_snapshot"), help="Snapshot directory")
+    parser.add_argument("--json", type=Path, help="Also write the records to this catalog JSON file")
+    parser.add_argument("--base-url", default=BASE_URL, help="Base URL for relative links")
+    args = parser.parse_args()
+
+    summary = ingest(args.pages, args.snapshot, args.json, args.base_url)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
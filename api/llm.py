@@ -0,0 +1,383 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+from api.scheduler import OutboundScheduler
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+DEFAULT_MODEL = "models/gemini-1.5-flash"
+DEFAULT_DISCOVERY_TTL = 3600.0
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TIMEOUT = 30.0
+# Rough characters-per-token ratio, used when the SDK reports no usage metadata
+CHARS_PER_TOKEN = 4
+
+
+def sdk() -> ModuleType:
+    """
+    The google.generativeai module, imported on first use.
+
+    The SDK takes most of a second to import, so importing this module (and
+    with it api.main) does not load it; only the first Gemini call does.
+    """
+    return importlib.import_module("google.generativeai")
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps api.llm.genai working for code that patches the SDK
+    if name == "genai":
+        return sdk()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def json_generation_config() -> Optional[Dict[str, Any]]:
+    """
+    Generation config that switches Gemini to JSON output, if the installed SDK supports it.
+
+    Returns:
+        Keyword arguments for GenerationConfig, or None when JSON mode is unavailable
+    """
+    if "response_mime_type" in inspect.signature(sdk().GenerationConfig).parameters:
+        return {"response_mime_type": "application/json"}
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class GeminiClient:
+    """
+    Process-wide Gemini client shared by every request.
+
+    The SDK keeps one transport (a multiplexed gRPC channel, or a pooled HTTP
+    session for ``transport="rest"``) per configured process, and each
+    GenerativeModel holds a reference to it. Creating the model once and caching
+    model discovery avoids a list_models round trip and a new model object on
+    every request. The SDK itself is imported and configured on first use (see
+    connect), so creating a client costs nothing at startup.
+
+    The SDK call is blocking, so async callers go through generate_content_async,
+    which runs it on a bounded thread pool with a per-call timeout. Calls are
+    admitted by an OutboundScheduler (concurrency limit, rate limit, bounded
+    wait queue and circuit breaker); requests waiting for a slot yield to the
+    event loop instead of blocking the worker, and calls that cannot be
+    admitted in time fail fast with Overloaded. A call that times out keeps
+    its slot until its worker thread returns from the SDK, so the thread pool
+    (max_concurrency threads) always has a free thread for an admitted call.
+    """
+
+    def __init__(self, api_key: Optional[str], preferred_model: str = DEFAULT_MODEL,
+                 discovery_ttl: float = DEFAULT_DISCOVERY_TTL, transport: Optional[str] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT,
+                 api_endpoint: Optional[str] = None, scheduler: Optional[OutboundScheduler] = None):
+        # api_endpoint points the SDK at another server, e.g. the local stand-in used by the benchmarks
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        # The SDK is imported and configured with these by connect(), on first use
+        self._configuration = {"api_key": api_key, "transport": transport, "client_options": client_options}
+        self._sdk: Optional[ModuleType] = None
+        self._json_config: Optional[Dict[str, Any]] = None
+        self.preferred_model = preferred_model
+        self.discovery_ttl = discovery_ttl
+        self.transport = transport or "grpc"
+        self._lock = threading.Lock()
+        self._available: Optional[List[str]] = None
+        self._discovered_at = 0.0
+        self._model_name = preferred_model
+        self._models: Dict[str, "genai.GenerativeModel"] = {}
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self.scheduler = scheduler or OutboundScheduler(max_concurrency)
+        self._usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "prompt_bytes": 0, "completion_bytes": 0}
+        self._discovery_seconds: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "GeminiClient":
+        """
+        Build a client from GEMINI_API_KEY, GEMINI_MODEL, GEMINI_TRANSPORT,
+        GEMINI_DISCOVERY_TTL, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT and
+        GEMINI_API_ENDPOINT, with the scheduler settings of OutboundScheduler.from_env.
+        """
+        max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        return cls(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            preferred_model=os.getenv("GEMINI_MODEL", DEFAULT_MODEL),
+            discovery_ttl=float(os.getenv("GEMINI_DISCOVERY_TTL", DEFAULT_DISCOVERY_TTL)),
+            transport=os.getenv("GEMINI_TRANSPORT") or None,
+            max_concurrency=max_concurrency,
+            timeout=float(os.getenv("GEMINI_TIMEOUT", DEFAULT_TIMEOUT)),
+            api_endpoint=os.getenv("GEMINI_API_ENDPOINT") or None,
+            scheduler=OutboundScheduler.from_env(max_concurrency)
+        )
+
+    def connect(self) -> ModuleType:
+        """
+        Import and configure the SDK if that has not happened yet.
+
+        Safe to call from several threads; the API calls it from a background
+        thread at startup so the first request does not pay for the import.
+
+        Returns:
+            The configured google.generativeai module
+        """
+        if self._sdk is None:
+            with self._lock:
+                if self._sdk is None:
+                    started = time.monotonic()
+                    genai = sdk()
+                    genai.configure(**self._configuration)
+                    self._json_config = json_generation_config()
+                    self._sdk = genai
+                    logging.info(f"Gemini SDK imported and configured in {time.monotonic() - started:.2f}s")
+        return self._sdk
+
+    @property
+    def connected(self) -> bool:
+        """Whether the SDK has been imported and configured."""
+        return self._sdk is not None
+
+    @property
+    def json_config(self) -> Optional[Dict[str, Any]]:
+        """Generation config for JSON mode, or None when the installed SDK lacks it."""
+        self.connect()
+        return self._json_config
+
+    @property
+    def model_name(self) -> str:
+        """Name of the model currently used for generation."""
+        return self._model_name
+
+    def _discovery_expired(self) -> bool:
+        return self._available is None or time.monotonic() - self._discovered_at > self.discovery_ttl
+
+    def available_models(self, force: bool = False) -> List[str]:
+        """
+        List models that support generateContent, cached for discovery_ttl seconds.
+
+        Args:
+            force: Ignore the cache and query the API
+
+        Returns:
+            List of model names
+        """
+        if not force and not self._discovery_expired():
+            return self._available
+        genai = self.connect()
+        with self._lock:
+            if force or self._discovery_expired():
+                started = time.monotonic()
+                self._available = [
+                    model.name for model in genai.list_models()
+                    if 'generateContent' in model.supported_generation_methods
+                ]
+                self._discovered_at = time.monotonic()
+                self._discovery_seconds = self._discovered_at - started
+                self._model_name = self._choose_model(self._available)
+                logging.info(f"Gemini model discovery found {len(self._available)} models, using {self._model_name}")
+        return self._available
+
+    def _choose_model(self, available: List[str]) -> str:
+        if not available or self.preferred_model in available:
+            return self.preferred_model
+        flash_models = [name for name in available if "flash" in name]
+        return (flash_models or available)[0]
+
+    def refresh(self) -> str:
+        """
+        Refresh model discovery if the cache expired, keeping the current model on failure.
+
+        Returns:
+            Name of the model to use
+        """
+        try:
+            self.available_models()
+        except Exception as e:
+            logging.warning(f"Gemini model discovery failed, keeping {self._model_name}: {e}")
+            # Back off until the next TTL window instead of retrying on every request
+            self._available = self._available or []
+            self._discovered_at = time.monotonic()
+        return self._model_name
+
+    def model(self) -> "genai.GenerativeModel":
+        """
+        Return the shared GenerativeModel for the selected model name.
+        """
+        name = self.refresh()
+        model = self._models.get(name)
+        if model is None:
+            model = self._models.setdefault(name, self.connect().GenerativeModel(name))
+        return model
+
+    def generate_content(self, prompt: str, json_output: bool = False, **kwargs: Any):
+        """
+        Generate content with the shared model.
+
+        Args:
+            prompt: Prompt text
+            json_output: Ask for JSON output when the SDK supports JSON mode
+            **kwargs: Passed through to GenerativeModel.generate_content
+        """
+        if json_output and self.json_config is not None:
+            kwargs.setdefault("generation_config", self.json_config)
+        return self.model().generate_content(prompt, **kwargs)
+
+    async def generate_content_async(self, prompt: str, timeout: Optional[float] = None, **kwargs: Any):
+        """
+        Generate content without blocking the event loop.
+
+        Args:
+            prompt: Prompt text
+            timeout: Seconds to wait for the model once a slot is acquired, defaults to self.timeout
+            **kwargs: Passed through to GenerativeModel.generate_content
+
+        Returns:
+            The SDK response
+
+        Raises:
+            Overloaded: If the call is not admitted by the scheduler
+            asyncio.TimeoutError: If the call does not finish within the timeout
+        """
+        async with self.scheduler.slot() as admission:
+            future = self._executor.submit(functools.partial(self._generate_text, prompt, **kwargs))
+            # A timed out SDK call keeps its thread busy; the slot stays taken until it returns
+            admission.hold(future)
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout if timeout is not None else self.timeout)
+
+    async def stream_content_async(self, prompt: str, timeout: Optional[float] = None,
+                                   **kwargs: Any) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks without blocking the event loop.
+
+        The SDK stream is consumed on the thread pool and its chunks are handed to
+        the event loop through a queue. The timeout applies to the wait for each
+        chunk, so long generations are fine as long as they keep producing text.
+
+        Args:
+            prompt: Prompt text
+            timeout: Seconds to wait for the next chunk, defaults to self.timeout
+            **kwargs: Passed through to GenerativeModel.generate_content
+
+        Yields:
+            Text of each streamed chunk
+
+        Raises:
+            Overloaded: If the call is not admitted by the scheduler
+            asyncio.TimeoutError: If no chunk arrives within the timeout
+        """
+        wait = timeout if timeout is not None else self.timeout
+        async with self.scheduler.slot() as admission:
+            loop = asyncio.get_running_loop()
+            queue: "asyncio.Queue[Any]" = asyncio.Queue()
+            finished = object()
+            stop = threading.Event()
+
+            def publish(item: Any) -> None:
+                try:
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+                except RuntimeError:
+                    # The event loop is gone, nobody is listening any more
+                    stop.set()
+
+            def produce() -> None:
+                try:
+                    for chunk in self.generate_content(prompt, stream=True, **kwargs):
+                        if stop.is_set():
+                            return
+                        publish(chunk.text)
+                    publish(finished)
+                except Exception as e:
+                    publish(e)
+
+            # The producer may stay blocked in the SDK after the consumer gives up; hold the slot until it stops
+            admission.hold(self._executor.submit(produce))
+            try:
+                while True:
+                    item = await asyncio.wait_for(queue.get(), wait)
+                    if item is finished:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+
+    def _generate_text(self, prompt: str, **kwargs: Any):
+        response = self.generate_content(prompt, **kwargs)
+        # Resolve the lazily built text on the worker thread rather than on the event loop
+        response.text
+        return response
+
+    def record_usage(self, prompt: str, response: Any = None, text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Record the token and byte usage of one generation.
+
+        Uses the response's usage metadata when the SDK provides it, and a
+        character-based estimate otherwise.
+
+        Args:
+            prompt: Prompt text that was sent
+            response: SDK response, if available
+            text: Generated text, defaults to response.text
+
+        Returns:
+            prompt_tokens, completion_tokens and whether the counts are estimated
+        """
+        metadata = getattr(response, "usage_metadata", None)
+        completion = text if text is not None else getattr(response, "text", "")
+        if metadata is not None and getattr(metadata, "prompt_token_count", 0):
+            usage = {
+                "prompt_tokens": int(metadata.prompt_token_count),
+                "completion_tokens": int(getattr(metadata, "candidates_token_count", 0)),
+                "estimated": False
+            }
+        else:
+            usage = {
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": estimate_tokens(completion),
+                "estimated": True
+            }
+        self._usage["calls"] += 1
+        self._usage["prompt_tokens"] += usage["prompt_tokens"]
+        self._usage["completion_tokens"] += usage["completion_tokens"]
+        self._usage["prompt_bytes"] += len(prompt.encode("utf-8"))
+        self._usage["completion_bytes"] += len(completion.encode("utf-8"))
+        return usage
+
+    def close(self) -> None:
+        """
+        Stop the worker threads. Calls still running are abandoned.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Summary of the client state for health checks.
+        """
+        age = None if self._available is None else round(time.monotonic() - self._discovered_at, 1)
+        return {
+            "model": self._model_name,
+            "transport": self.transport,
+            "in_flight": self.scheduler.running,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "scheduler": self.scheduler.stats(),
+            # Health checks must not trigger the SDK import, so JSON mode is unknown until then
+            "connected": self.connected,
+            "json_mode": self._json_config is not None if self.connected else None,
+            "token_usage": dict(self._usage),
+            "discovered_models": None if self._available is None else len(self._available),
+            "discovery_age_seconds": age,
+            "discovery_seconds": None if self._discovery_seconds is None else round(self._discovery_seconds, 4)
+        }
@@ -0,0 +1,121 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from typing import Optional
+
+DEFAULT_PAYLOAD_MAX_CHARS = 500
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any fields passed through ``extra``."""
+
+    _RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> logging.handlers.QueueListener:
+    """
+    Route all log records through a queue to a background writer thread.
+
+    Request handlers only put records on an in-memory queue; formatting and
+    writing to stderr happen on the listener thread, so a slow terminal or
+    disk does not stall the event loop. Safe to call more than once.
+
+    Args:
+        level: Root log level, defaults to LOG_LEVEL or INFO
+        log_format: "text" or "json", defaults to LOG_FORMAT or text
+
+    Returns:
+        The running queue listener
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
+    writer = logging.StreamHandler()
+    writer.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def truncate(text: str, max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS) -> str:
+    """
+    Shorten text for a log line, noting how much was cut.
+    """
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+
+
+class PayloadLogger:
+    """
+    Logs large payloads such as raw model output without paying for it on every request.
+
+    Full payloads are logged at DEBUG, or at INFO for a random sample of
+    calls. Error paths log a truncated payload.
+
+    Args:
+        logger: Logger to write to
+        sample_rate: Fraction of calls whose full payload is logged at INFO
+        max_chars: Payload length kept by error()
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = 0.0,
+                 max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS):
+        self.logger = logger
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+
+    @classmethod
+    def from_env(cls, logger: logging.Logger) -> "PayloadLogger":
+        """
+        Build a payload logger from LOG_PAYLOAD_SAMPLE_RATE and LOG_PAYLOAD_MAX_CHARS.
+        """
+        return cls(
+            logger,
+            sample_rate=float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0")),
+            max_chars=int(os.getenv("LOG_PAYLOAD_MAX_CHARS", DEFAULT_PAYLOAD_MAX_CHARS))
+        )
+
+    def log(self, label: str, text: str) -> None:
+        """
+        Log the full payload if DEBUG is enabled or this call is sampled; otherwise do nothing.
+        """
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"{label}: {text}", extra={"payload_chars": len(text)})
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            self.logger.info(f"{label} (sampled): {text}", extra={"payload_chars": len(text)})
+
+    def error(self, message: str, text: str) -> None:
+        """
+        Log an error with a truncated copy of the payload.
+        """
+        self.logger.error(f"{message}: {truncate(text, self.max_chars)}", extra={"payload_chars": len(text)})
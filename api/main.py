@@ -1,100 +1,670 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-import google.generativeai as genai
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Match
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 import os
 import json
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from api.ann import DEFAULT_NPROBE, load_or_build_index
+from api.cache import ResponseCache, cache_key
+from api.catalog import FLAG_FIELDS, AssessmentCatalog
+from api.llm import GeminiClient
+from api.log import PayloadLogger, configure_logging
+from api.models import (
+    Assessment,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
+    CandidateRanking,
+    RecommendationRequest,
+    RecommendationResponse
+)
+from api.parsing import JsonArrayStreamParser, extract_array, extract_json_object, validate_items
+from api.prompts import PromptTemplate, duration_constraint, schema_outline
+from api.scheduler import CLOSED, HALF_OPEN, OPEN, Overloaded
+from api.singleflight import SingleFlight
+from api.telemetry import Telemetry, TelemetryMiddleware, gauge_lines
+
+# Raw model output is only logged at DEBUG, for a sample of calls, or truncated on errors
+payload_log = PayloadLogger.from_env(logging.getLogger("api.llm_output"))
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+MAX_RECOMMENDATIONS = 10
+# Number of retrieved candidates handed to the LLM when reranking is enabled
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+LLM_RERANK = os.getenv("LLM_RERANK", "false").lower() in ("1", "true", "yes")
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+# Queries retrieved per matrix product, and queries packed into one Gemini prompt
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+LLM_BATCH_QUERIES = int(os.getenv("LLM_BATCH_QUERIES", "5"))
+# Nearest-neighbour backend for the dense retrieval ranking (exact, ivf, faiss, hnswlib); unset scans all embeddings
+ANN_BACKEND = os.getenv("ANN_BACKEND", "")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", str(DEFAULT_NPROBE)))
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+# When a Gemini call is not admitted: "fallback" serves retrieval results, "reject" answers 429/503 with Retry-After
+OVERLOAD_POLICY = os.getenv("OVERLOAD_POLICY", "fallback").lower()
+
+telemetry = Telemetry(server_timing=SERVER_TIMING)
+
+
+def warm_up_llm(llm: GeminiClient) -> None:
+    """Import and configure the Gemini SDK and discover models before the first rerank needs them."""
+    try:
+        llm.connect()
+        llm.refresh()
+    except Exception as e:
+        logging.warning(f"Gemini client warm-up failed, it is retried on first use: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Configured by the server process rather than on import, so importing the app (tests,
+    # benchmarks, embedding jobs) keeps the caller's handlers. Records are written by a
+    # background thread, off the event loop
+    configure_logging()
+    # Build the catalog index once per process instead of once per request; workers started by
+    # api.serve memory-map the index their parent saved instead of building their own
+    app.state.catalog = AssessmentCatalog.from_env()
+    logging.info(f"Loaded {len(app.state.catalog)} assessments into the catalog index")
+    if ANN_BACKEND:
+        options = {"nprobe": ANN_NPROBE} if ANN_BACKEND in ("ivf", "faiss") else {}
+        app.state.catalog.attach_ann(load_or_build_index(
+            ANN_BACKEND, app.state.catalog.dense.embeddings, os.getenv("ANN_INDEX_PATH") or None, **options
+        ))
+    # One Gemini client per process; it owns the transport and the cached model discovery.
+    # Creating it is cheap: the SDK is only imported when reranking is enabled, and then on a
+    # background thread, so the worker serves requests (health checks included) right away
+    app.state.llm = GeminiClient.from_env()
+    if LLM_RERANK:
+        asyncio.get_running_loop().run_in_executor(None, warm_up_llm, app.state.llm)
+    app.state.cache = ResponseCache.from_env()
+    app.state.single_flight = SingleFlight()
+    yield
+    app.state.llm.close()
+    app.state.cache.close()
+
 
 app = FastAPI(
     title="SHL Assessment Recommender API",
     description="API for recommending SHL assessments based on job descriptions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-class RecommendationRequest(BaseModel):
-    query: str
-    max_duration: Optional[int] = None
-    min_duration: Optional[int] = None
-
-class Assessment(BaseModel):
-    assessment_name: str
-    url: str
-    remote_testing: bool
-    adaptive_irt: bool  # Changed to match the JSON key
-    duration: int      # Changed to match the JSON key
-    test_type: str   
-
-class RecommendationResponse(BaseModel):
-    recommendations: List[Assessment]
-    query_analysis: dict
+
+def route_path(scope: Dict[str, Any]) -> str:
+    """Route template of a request, so metrics are labelled per endpoint rather than per URL."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+app.add_middleware(TelemetryMiddleware, telemetry=telemetry, route_path=route_path)
+
+# Candidate positions chosen by the model, and the model's query analysis
+LLMResult = Tuple[List[int], Optional[dict]]
+
+
+RERANK_PROMPT = PromptTemplate(
+    f"""
+Rank the numbered SHL assessment candidates by relevance to the query.
+"ranking" lists up to {MAX_RECOMMENDATIONS} candidate numbers, most relevant first; use only listed numbers.
+""",
+    schema_outline(CandidateRanking)
+)
+
+BATCH_RERANK_PROMPT = PromptTemplate(
+    f"""
+For each numbered query, rank that query's numbered SHL assessment candidates by relevance.
+"ranking" lists up to {MAX_RECOMMENDATIONS} candidate numbers, most relevant first; use only that query's numbers.
+""",
+    {"results": [{"query_index": "integer", **schema_outline(CandidateRanking)}]}
+)
+
+
+def candidate_section(catalog: AssessmentCatalog, candidates: List[int]) -> str:
+    return "Candidates:\n" + "\n".join(
+        f"{position}. {catalog.assessment_summary(idx)}" for position, idx in enumerate(candidates, 1)
+    )
+
+
+def rerank_prompt(request: RecommendationRequest, catalog: AssessmentCatalog, candidates: List[int]) -> str:
+    return RERANK_PROMPT.render(
+        f"Query: {request.query}",
+        duration_constraint(request.min_duration, request.max_duration),
+        candidate_section(catalog, candidates)
+    )
+
+
+def to_llm_result(ranking: Any, analysis: Any) -> LLMResult:
+    """
+    Validate a model ranking item by item, dropping entries that are not candidate numbers.
+    """
+    positions = validate_items(ranking if isinstance(ranking, list) else [], int)
+    return positions, analysis if isinstance(analysis, dict) else None
+
+
+def parse_llm_result(text: str) -> Optional[LLMResult]:
+    """
+    Recover the candidate ranking and the query analysis from model output.
+
+    Stray prose, fences and common JSON defects are tolerated, and ranking
+    entries that are not integers are dropped instead of failing the response.
+    Returns None when nothing could be recovered.
+    """
+    with telemetry.stage("parse"):
+        ranking, document = extract_array(text, "ranking")
+    with telemetry.stage("validate"):
+        positions, analysis = to_llm_result(ranking, (document or {}).get("query_analysis"))
+    if not positions and analysis is None:
+        payload_log.error("No ranking could be recovered from model response", text)
+        telemetry.errors.inc(kind="llm_unparsable")
+        return None
+    return positions, analysis
+
+
+async def rerank_with_llm(request: RecommendationRequest, catalog: AssessmentCatalog, candidates: List[int],
+                          llm: GeminiClient) -> Optional[LLMResult]:
+    """
+    Ask Gemini to pick and order the most relevant assessments among retrieved candidates.
+
+    Only candidate numbers are exchanged, which keeps the generation short and
+    guarantees every result exists in the catalog. Returns the ranking and query
+    analysis, or None if the model response could not be parsed.
+    """
+    # Get response from Gemini
+    with telemetry.stage("prompt"):
+        prompt = rerank_prompt(request, catalog, candidates)
+    with telemetry.stage("llm"):
+        response = await llm.generate_content_async(prompt, json_output=True)
+    payload_log.log("Gemini API Response Text", response.text)
+    usage = llm.record_usage(prompt, response)
+    logging.debug(f"Gemini token usage: {usage}")
+    return parse_llm_result(response.text)
+
+
+def request_filters(catalog: AssessmentCatalog, request: RecommendationRequest) -> Optional[Dict[str, Any]]:
+    """
+    The request's test type and flag filters in canonical form, None if it has none.
+
+    Raises:
+        HTTPException: 422 if a test type is not in the catalog
+    """
+    filters: Dict[str, Any] = {}
+    if request.test_types:
+        try:
+            filters["test_types"] = sorted({catalog.resolve_test_type(name) for name in request.test_types})
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    for field in FLAG_FIELDS:
+        if getattr(request, field) is not None:
+            filters[field] = getattr(request, field)
+    return filters or None
+
+
+def retrieve(catalog: AssessmentCatalog, requests: List[RecommendationRequest],
+             filters: List[Optional[Dict[str, Any]]]) -> List[List[Tuple[int, float]]]:
+    """
+    Score every request against the catalog in one vectorized pass.
+
+    Constraints are resolved to candidate rows first, so only matching assessments are scored.
+
+    Args:
+        catalog: Assessment catalog
+        requests: Requests to score
+        filters: The request_filters of each request
+    """
+    limit = RERANK_CANDIDATES if LLM_RERANK else MAX_RECOMMENDATIONS
+    with telemetry.stage("retrieve"):
+        candidates = [
+            catalog.candidate_rows(request.min_duration, request.max_duration, **(request_filter or {}))
+            for request, request_filter in zip(requests, filters)
+        ]
+        return catalog.search_batch(
+            [request.query for request in requests],
+            k=max(limit, MAX_RECOMMENDATIONS),
+            candidates=candidates
+        )
+
+
+def retrieval_analysis(request: RecommendationRequest, filters: Optional[Dict[str, Any]],
+                       catalog: AssessmentCatalog, hits: List[Tuple[int, float]]) -> dict:
+    return {
+        "method": "retrieval",
+        "constraints": {
+            "min_duration": request.min_duration,
+            "max_duration": request.max_duration,
+            **(filters or {})
+        },
+        "scores": {catalog.records[idx]["assessment_name"]: round(score, 4) for idx, score in hits[:MAX_RECOMMENDATIONS]}
+    }
+
+
+def apply_llm_selection(catalog: AssessmentCatalog, candidates: List[int], result: Optional[LLMResult]) -> Optional[Tuple[List[int], dict]]:
+    """
+    Map the assessments chosen by the LLM back onto the retrieved candidates.
+
+    Returns the reranked candidate indices and the query analysis, or None if the
+    model did not select any known candidate.
+    """
+    if result is None:
+        return None
+    positions, llm_analysis = result
+    # Keep only valid candidate numbers, in the order the model chose
+    reranked = []
+    for position in positions:
+        if 1 <= position <= len(candidates) and candidates[position - 1] not in reranked:
+            reranked.append(candidates[position - 1])
+    if not reranked:
+        return None
+    return reranked, {**(llm_analysis or {}), "method": "llm_rerank"}
+
+
+def to_response(catalog: AssessmentCatalog, candidates: List[int], query_analysis: dict) -> RecommendationResponse:
+    with telemetry.stage("render"):
+        return RecommendationResponse(
+            recommendations=[Assessment(**catalog.assessment(idx)) for idx in candidates[:MAX_RECOMMENDATIONS]],
+            query_analysis=query_analysis
+        )
+
+
+def overloaded_error(error: Overloaded) -> HTTPException:
+    return HTTPException(status_code=error.status_code, detail=str(error),
+                         headers={"Retry-After": error.retry_after_header})
+
+
+def admit_request() -> None:
+    """
+    Shed a request up front when OVERLOAD_POLICY is "reject" and Gemini calls are not being admitted.
+
+    Raises:
+        HTTPException: 429 if the Gemini wait queue is full, 503 while its circuit is open
+    """
+    if LLM_RERANK and OVERLOAD_POLICY == "reject":
+        try:
+            app.state.llm.scheduler.check()
+        except Overloaded as e:
+            raise overloaded_error(e)
+
+
+async def call_llm_safely(call: Awaitable[Any], shed: bool = False) -> Any:
+    """
+    Await an LLM call, returning None instead of raising when it fails.
+
+    The retrieval results are still valid, so callers degrade instead of failing the request.
+
+    Args:
+        call: The LLM call
+        shed: Re-raise Overloaded when OVERLOAD_POLICY is "reject", so the request is answered with 429/503
+    """
+    try:
+        return await call
+    except Overloaded as e:
+        if shed and OVERLOAD_POLICY == "reject":
+            raise
+        logging.warning(f"LLM rerank not admitted, serving retrieval results: {e}")
+        telemetry.errors.inc(kind="llm_shed")
+    except asyncio.TimeoutError:
+        logging.error(f"LLM rerank timed out after {app.state.llm.timeout}s, serving retrieval results")
+        telemetry.errors.inc(kind="llm_timeout")
+    except Exception as llm_e:
+        logging.error(f"LLM rerank failed, serving retrieval results: {llm_e}")
+        telemetry.errors.inc(kind="llm_error")
+    return None
+
+
+async def build_recommendations(request: RecommendationRequest,
+                                filters: Optional[Dict[str, Any]]) -> Tuple[RecommendationResponse, bool]:
+    """
+    Run retrieval and the optional LLM rerank for a request.
+
+    Returns the response and whether it may be cached. Responses that fell back
+    to retrieval because the LLM failed are not cached, so the next identical
+    request gets another chance at a reranked answer.
+
+    Raises:
+        Overloaded: If the rerank is not admitted and OVERLOAD_POLICY is "reject"
+    """
+    catalog: AssessmentCatalog = app.state.catalog
+    hits = retrieve(catalog, [request], [filters])[0]
+    candidates = [idx for idx, _ in hits]
+
+    if LLM_RERANK and candidates:
+        result = await call_llm_safely(rerank_with_llm(request, catalog, candidates, app.state.llm), shed=True)
+        with telemetry.stage("select"):
+            selection = apply_llm_selection(catalog, candidates, result)
+        if selection is None:
+            return to_response(catalog, candidates, retrieval_analysis(request, filters, catalog, hits)), False
+        return to_response(catalog, *selection), True
+
+    return to_response(catalog, candidates, retrieval_analysis(request, filters, catalog, hits)), True
+
+
+async def rerank_batch_with_llm(requests: List[RecommendationRequest], catalog: AssessmentCatalog,
+                                candidate_lists: List[List[int]], llm: GeminiClient) -> List[Optional[LLMResult]]:
+    """
+    Rerank several requests with a single Gemini call.
+
+    Returns one parsed result per request, None where the model gave no usable answer.
+    """
+    sections = [
+        "\n".join(filter(None, (
+            f"Query {i}: {request.query}",
+            duration_constraint(request.min_duration, request.max_duration),
+            candidate_section(catalog, candidates)
+        )))
+        for i, (request, candidates) in enumerate(zip(requests, candidate_lists))
+    ]
+    prompt = BATCH_RERANK_PROMPT.render(*sections)
+
+    with telemetry.stage("llm"):
+        response = await llm.generate_content_async(prompt, json_output=True)
+    usage = llm.record_usage(prompt, response)
+    payload_log.log(f"Gemini API Response Text for {len(requests)} packed queries", response.text)
+    logging.debug(f"Gemini token usage for {len(requests)} packed queries: {usage}")
+    with telemetry.stage("parse"):
+        parsed = extract_json_object(response.text)
+    results: List[Optional[LLMResult]] = [None] * len(requests)
+    items = parsed.get("results") if parsed is not None else None
+    for item in items if isinstance(items, list) else []:
+        index = item.get("query_index") if isinstance(item, dict) else None
+        if isinstance(index, int) and 0 <= index < len(requests):
+            results[index] = to_llm_result(item.get("ranking"), item.get("query_analysis"))
+    return results
+
+
+async def iter_batch_recommendations(requests: List[RecommendationRequest],
+                                     filters: List[Optional[Dict[str, Any]]]) -> AsyncIterator[Tuple[int, RecommendationResponse]]:
+    """
+    Yield (position, response) pairs for a batch as soon as each one is ready.
+
+    filters holds the request_filters of each request.
+
+    Cache hits are yielded first. Identical requests in the batch are computed
+    once. Misses are retrieved chunk by chunk with one matrix product per
+    chunk, and when reranking is enabled, LLM_BATCH_QUERIES requests share each
+    Gemini prompt, with the prompts of a chunk running concurrently.
+    """
+    catalog: AssessmentCatalog = app.state.catalog
+    cache: ResponseCache = app.state.cache
+
+    positions: Dict[str, List[int]] = {}
+    # Position in the batch of the first request of each distinct key still to compute
+    pending: List[int] = []
+    for position, (request, request_filter) in enumerate(zip(requests, filters)):
+        key = cache_key(request.query, request.min_duration, request.max_duration, request_filter)
+        if key in positions:
+            positions[key].append(position)
+            continue
+        with telemetry.stage("cache_lookup"):
+            cached = cache.get(request.query, request.min_duration, request.max_duration, request_filter)
+        if cached is not None:
+            yield position, RecommendationResponse(**cached)
+            continue
+        positions[key] = [position]
+        pending.append(position)
+
+    def finish(position: int, response: RecommendationResponse, cacheable: bool):
+        request, request_filter = requests[position], filters[position]
+        if cacheable:
+            cache.put(request.query, request.min_duration, request.max_duration, response.model_dump(), request_filter)
+        key = cache_key(request.query, request.min_duration, request.max_duration, request_filter)
+        return [(position, response) for position in positions[key]]
+
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        chunk_positions = pending[start:start + BATCH_CHUNK_SIZE]
+        chunk = [requests[position] for position in chunk_positions]
+        chunk_filters = [filters[position] for position in chunk_positions]
+        chunk_hits = retrieve(catalog, chunk, chunk_filters)
+        fallbacks = [
+            to_response(catalog, [idx for idx, _ in hits], retrieval_analysis(request, request_filter, catalog, hits))
+            for request, request_filter, hits in zip(chunk, chunk_filters, chunk_hits)
+        ]
+
+        if not LLM_RERANK:
+            for position, response in zip(chunk_positions, fallbacks):
+                for item in finish(position, response, True):
+                    yield item
+            continue
+
+        async def rerank_pack(offset: int) -> List[Tuple[int, RecommendationResponse, bool]]:
+            pack = chunk[offset:offset + LLM_BATCH_QUERIES]
+            candidate_lists = [[idx for idx, _ in hits] for hits in chunk_hits[offset:offset + LLM_BATCH_QUERIES]]
+            results = await call_llm_safely(rerank_batch_with_llm(pack, catalog, candidate_lists, app.state.llm))
+            packed = []
+            for i, candidates in enumerate(candidate_lists):
+                selection = apply_llm_selection(catalog, candidates, results[i] if results else None)
+                if selection is None:
+                    packed.append((offset + i, fallbacks[offset + i], False))
+                else:
+                    packed.append((offset + i, to_response(catalog, *selection), True))
+            return packed
+
+        tasks = [rerank_pack(offset) for offset in range(0, len(chunk), LLM_BATCH_QUERIES)]
+        for finished in asyncio.as_completed(tasks):
+            for index, response, cacheable in await finished:
+                for item in finish(chunk_positions[index], response, cacheable):
+                    yield item
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_recommendation_events(request: RecommendationRequest,
+                                       filters: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Produce server-sent events for a request.
+
+    Each recommended assessment is sent as an "assessment" event as soon as it
+    is known, followed by an "analysis" event with the query analysis and a
+    final "done" event. With reranking enabled, assessments are parsed out of
+    the streamed Gemini output one object at a time, so the first result is
+    sent long before the generation finishes.
+    """
+    catalog: AssessmentCatalog = app.state.catalog
+    cache: ResponseCache = app.state.cache
+
+    with telemetry.stage("cache_lookup"):
+        cached = cache.get(request.query, request.min_duration, request.max_duration, filters)
+    if cached is not None:
+        for assessment in cached["recommendations"]:
+            yield sse_event("assessment", assessment)
+        yield sse_event("analysis", cached["query_analysis"])
+        yield sse_event("done", {})
+        return
+
+    hits = retrieve(catalog, [request], [filters])[0]
+    candidates = [idx for idx, _ in hits]
+    emitted: List[int] = []
+    query_analysis = retrieval_analysis(request, filters, catalog, hits)
+    reranked = False
+
+    if LLM_RERANK and candidates:
+        parser = JsonArrayStreamParser("ranking")
+        try:
+            with telemetry.stage("prompt"):
+                prompt = rerank_prompt(request, catalog, candidates)
+            # Includes the time the client takes to read the events sent meanwhile
+            with telemetry.stage("llm_stream"):
+                async for chunk in app.state.llm.stream_content_async(prompt, json_output=True):
+                    for position in validate_items(parser.feed(chunk), int):
+                        idx = candidates[position - 1] if 1 <= position <= len(candidates) else None
+                        if idx is not None and idx not in emitted and len(emitted) < MAX_RECOMMENDATIONS:
+                            emitted.append(idx)
+                            yield sse_event("assessment", Assessment(**catalog.assessment(idx)).model_dump())
+            reranked = bool(emitted)
+            usage = app.state.llm.record_usage(prompt, text=parser.text)
+            payload_log.log("Gemini API Response Text", parser.text)
+            logging.debug(f"Gemini token usage: {usage}")
+        except Overloaded as e:
+            logging.warning(f"LLM stream not admitted, completing with retrieval results: {e}")
+            telemetry.errors.inc(kind="llm_shed")
+        except asyncio.TimeoutError:
+            logging.error(f"LLM stream timed out after {app.state.llm.timeout}s, completing with retrieval results")
+            telemetry.errors.inc(kind="llm_timeout")
+        except Exception as llm_e:
+            logging.error(f"LLM stream failed, completing with retrieval results: {llm_e}")
+            telemetry.errors.inc(kind="llm_error")
+        if reranked:
+            selection = apply_llm_selection(catalog, candidates, parse_llm_result(parser.text))
+            query_analysis = selection[1] if selection is not None else {"method": "llm_rerank"}
+
+    if not reranked:
+        # Without reranking, or after a failed rerank, fill up in retrieval order
+        for idx in candidates:
+            if len(emitted) >= MAX_RECOMMENDATIONS:
+                break
+            if idx not in emitted:
+                emitted.append(idx)
+                yield sse_event("assessment", Assessment(**catalog.assessment(idx)).model_dump())
+
+    yield sse_event("analysis", query_analysis)
+    # A rerank that failed part-way is not cached, as in build_recommendations
+    if reranked or not LLM_RERANK:
+        response = to_response(catalog, emitted, query_analysis)
+        with telemetry.stage("cache_store"):
+            cache.put(request.query, request.min_duration, request.max_duration, response.model_dump(), filters)
+    yield sse_event("done", {})
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the SHL Assessment Recommender API"}
 @app.post("/api/recommend", response_model=RecommendationResponse)
 async def get_recommendations(request: RecommendationRequest):
-    e=None
     try:
-        model_list = genai.list_models()
-        available_models = [model.name for model in model_list if 'generateContent' in model.supported_generation_methods]
-        # Initialize Gemini model
-        model = genai.GenerativeModel('models/gemini-1.5-flash')
-        
-        # Construct the prompt
-        prompt = f"""
-        Given the following job description or query, recommend the most relevant SHL assessments.
-
-        Query: {request.query}
-
-        Additional constraints:
-        - Maximum duration: {request.max_duration} minutes
-        - Minimum duration: {request.min_duration} minutes
-
-        Please analyze the query and recommend up to 10 most relevant SHL assessments.
-        For each assessment, provide:
-        1. assessment_name (string)
-        2. url (string)
-        3. remote_testing (boolean)
-        4. adaptive_irt (boolean)
-        5. duration (integer)
-        6. test_type (string)
-
-        Format the response as a **single, plain JSON object** with the following structure and **nothing else, including no comments**:
-        {{
-        "query_analysis": {{ ... }},
-        "recommendations": [ {{ ... }}, {{ ... }}, ... ]
-        }}
-        Ensure the JSON is valid and directly parsable. Do not include any markdown formatting, comments, or extra text outside of this JSON structure.
-        """
-        
-        # Get response from Gemini
-        response = model.generate_content(prompt)
-        logging.info(f"Gemini API Response Text: {response.text}")  # Log the raw response
-        cleaned_response_text = response.text.replace("```json", "").replace("```", "").strip()
-        # Parse the response
+        cache: ResponseCache = app.state.cache
+        filters = request_filters(app.state.catalog, request)
+        with telemetry.stage("cache_lookup"):
+            cached = cache.get(request.query, request.min_duration, request.max_duration, filters)
+        if cached is not None:
+            return RecommendationResponse(**cached)
+
+        async def compute() -> RecommendationResponse:
+            response, cacheable = await build_recommendations(request, filters)
+            if cacheable:
+                with telemetry.stage("cache_store"):
+                    cache.put(request.query, request.min_duration, request.max_duration, response.model_dump(), filters)
+            return response
+
+        # Identical requests that arrive while this one is being computed share its result
+        key = cache_key(request.query, request.min_duration, request.max_duration, filters)
+        return await app.state.single_flight.do(key, compute)
+
+    except HTTPException:
+        raise
+    except Overloaded as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+        telemetry.errors.inc(kind="request_failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/recommend/stream")
+async def stream_recommendations(request: RecommendationRequest):
+    # Reject unknown filters, and shed load, before the stream starts
+    filters = request_filters(app.state.catalog, request)
+    admit_request()
+
+    async def events():
         try:
-            result = json.loads(cleaned_response_text)
-            return RecommendationResponse(**result)
-        except json.JSONDecodeError as json_e:
-            e=json_e
-            logging.error(f"JSONDecodeError after cleaning: {e}")
-            logging.error(f"Failed to parse cleaned response: {cleaned_response_text}")
-            raise HTTPException(status_code=500, detail="Failed to parse model response")
-            
+            async for event in stream_recommendation_events(request, filters):
+                yield event
+        except Exception as e:
+            logging.error(f"Recommendation stream failed: {e}", exc_info=True)
+            telemetry.errors.inc(kind="stream_failed")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/recommend/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(batch: BatchRecommendationRequest):
+    if len(batch.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds the limit of {MAX_BATCH_SIZE} requests")
+    filters = [request_filters(app.state.catalog, request) for request in batch.requests]
+    admit_request()
+
+    if batch.stream:
+        async def ndjson_lines():
+            try:
+                async for position, response in iter_batch_recommendations(batch.requests, filters):
+                    yield json.dumps({"index": position, **response.model_dump()}) + "\n"
+            except Exception as e:
+                logging.error(f"Batch stream failed: {e}", exc_info=True)
+                telemetry.errors.inc(kind="stream_failed")
+                yield json.dumps({"error": str(e)}) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    try:
+        results: List[Optional[RecommendationResponse]] = [None] * len(batch.requests)
+        async for position, response in iter_batch_recommendations(batch.requests, filters):
+            results[position] = response
+        return BatchRecommendationResponse(results=results)
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+        telemetry.errors.inc(kind="request_failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "llm_rerank": LLM_RERANK,
+        "llm": app.state.llm.status(),
+        "cache": app.state.cache.stats(),
+        "coalescing": app.state.single_flight.stats()
+    }
+
+def state_metrics() -> List[str]:
+    """
+    Metrics read from the LLM client, the response cache and request coalescing at scrape time.
+    """
+    llm_status = app.state.llm.status()
+    usage = llm_status["token_usage"]
+    scheduler = llm_status["scheduler"]
+    cache_stats = app.state.cache.stats()
+    coalescing = app.state.single_flight.stats()
+    return (
+        gauge_lines("shl_llm_calls_total", "Gemini generations.", [({}, usage["calls"])], "counter")
+        + gauge_lines("shl_llm_tokens_total", "Gemini tokens, estimated when the SDK reports none.", [
+            ({"kind": "prompt"}, usage["prompt_tokens"]),
+            ({"kind": "completion"}, usage["completion_tokens"])
+        ], "counter")
+        + gauge_lines("shl_llm_bytes_total", "UTF-8 bytes of Gemini prompts and replies.", [
+            ({"direction": "sent"}, usage["prompt_bytes"]),
+            ({"direction": "received"}, usage["completion_bytes"])
+        ], "counter")
+        + gauge_lines("shl_llm_in_flight", "Gemini calls currently running.", [({}, llm_status["in_flight"])])
+        + gauge_lines("shl_llm_queued", "Gemini calls waiting for admission.", [({}, scheduler["queued"])])
+        + gauge_lines("shl_llm_rejected_total", "Gemini calls not admitted, by reason.", [
+            ({"reason": reason}, count) for reason, count in scheduler["rejected"].items()
+        ], "counter")
+        + gauge_lines("shl_llm_circuit_state", "Gemini circuit breaker state, 1 for the current one.", [
+            ({"state": state}, int(scheduler["circuit"] == state)) for state in (CLOSED, OPEN, HALF_OPEN)
+        ])
+        + gauge_lines("shl_llm_circuit_opened_total", "Times the Gemini circuit breaker opened.",
+                      [({}, scheduler["circuit_opened"])], "counter")
+        + gauge_lines("shl_llm_discovery_seconds", "Duration of the last Gemini model discovery.",
+                      [({}, llm_status["discovery_seconds"])] if llm_status["discovery_seconds"] is not None else [])
+        + gauge_lines("shl_cache_hits_total", "Response cache hits by tier.", [
+            ({"tier": tier}, hits) for tier, hits in cache_stats["hits"].items()
+        ], "counter")
+        + gauge_lines("shl_cache_misses_total", "Response cache misses.", [({}, cache_stats["misses"])], "counter")
+        + gauge_lines("shl_cache_entries", "Responses held in the memory cache.", [({}, cache_stats["entries"])])
+        + gauge_lines("shl_coalesced_requests_total", "Requests that shared an identical in-flight computation.",
+                      [({}, coalescing["coalesced"])], "counter")
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(telemetry.render(state_metrics()), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,43 @@
+"""
+Request and response models of the recommendation API.
+
+Kept apart from api.main so that clients, benchmarks and tools can use the
+schemas with only pydantic imported, without FastAPI or the Gemini SDK.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class RecommendationRequest(BaseModel):
+    query: str
+    max_duration: Optional[int] = None
+    min_duration: Optional[int] = None
+    # Test type names or one-letter keys; any of them may match
+    test_types: Optional[List[str]] = None
+    remote_testing: Optional[bool] = None
+    adaptive_irt: Optional[bool] = None
+
+class Assessment(BaseModel):
+    assessment_name: str
+    url: str
+    remote_testing: bool
+    adaptive_irt: bool  # Changed to match the JSON key
+    duration: Optional[int] = None  # Minutes; None when the catalog does not state it
+    test_type: str   
+
+class RecommendationResponse(BaseModel):
+    recommendations: List[Assessment]
+    query_analysis: dict
+
+class CandidateRanking(BaseModel):
+    # 1-based positions in the candidate list sent to the model, best first
+    ranking: List[int]
+    query_analysis: dict
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest]
+    stream: bool = False
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
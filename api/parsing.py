@@ -0,0 +1,323 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+T = TypeVar("T")
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_MAX_START_ATTEMPTS = 8
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the defects LLMs commonly put into JSON.
+
+    Handles // and /* */ comments, trailing commas, single-quoted strings,
+    Python literals (True/False/None), raw newlines and tabs inside strings, and
+    truncated documents (an unterminated string and unclosed containers are
+    closed).
+
+    Args:
+        text: JSON-like text
+
+    Returns:
+        Text that is more likely to be valid JSON
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    quote = '"'
+    escape = False
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(ch)
+            elif ch == "\\":
+                escape = True
+                out.append(ch)
+            elif ch == quote:
+                in_string = False
+                out.append('"')
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+        elif ch in "\"'":
+            in_string = True
+            quote = ch
+            out.append('"')
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        elif ch == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j < n and text[j] not in "}]":
+                out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            out.append(ch)
+        else:
+            match = _WORD_RE.match(text, i)
+            if match:
+                word = match.group()
+                out.append(_LITERALS.get(word, word))
+                i = match.end()
+                continue
+            out.append(ch)
+        i += 1
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    if stack:
+        # Truncated output: drop a dangling separator or key before closing
+        repaired = "".join(out).rstrip()
+        repaired = re.sub(r'(,\s*"[^"]*"\s*:?|,|:)\s*$', "", repaired)
+        return repaired + "".join(reversed(stack))
+    return "".join(out)
+
+
+def _balanced_end(text: str, start: int) -> int:
+    """Index just past the container opened at start, or -1 if it never closes."""
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def loads_tolerant(fragment: str) -> Any:
+    """
+    json.loads that retries once on the repaired text.
+
+    Raises:
+        json.JSONDecodeError: If the repaired text is still not valid JSON
+    """
+    try:
+        return json.loads(fragment)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(fragment))
+
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the first JSON object in model output that can be parsed, repairing it if needed.
+
+    Surrounding prose and markdown fences are ignored. If an object never
+    closes (truncated output) it is closed by repair_json.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        The parsed object, or None if no object could be recovered
+    """
+    start = text.find("{")
+    attempts = 0
+    while start >= 0 and attempts < _MAX_START_ATTEMPTS:
+        attempts += 1
+        end = _balanced_end(text, start)
+        fragment = text[start:end] if end > 0 else text[start:]
+        try:
+            value = loads_tolerant(fragment)
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            return value
+        start = text.find("{", start + 1)
+    return None
+
+
+def validate_items(items: Iterable[Any], item_type: Type[T]) -> List[T]:
+    """
+    Validate items one by one against a type, dropping the invalid ones.
+
+    Args:
+        items: Candidate values
+        item_type: Pydantic model class or any type Pydantic can validate (e.g. int)
+
+    Returns:
+        The valid items converted to item_type
+    """
+    adapter = TypeAdapter(item_type)
+    valid: List[T] = []
+    dropped = 0
+    for item in items:
+        try:
+            valid.append(adapter.validate_python(item))
+        except ValidationError:
+            dropped += 1
+    if dropped:
+        logging.warning(f"Dropped {dropped} model items that failed {getattr(item_type, '__name__', item_type)} validation")
+    return valid
+
+
+def extract_array(text: str, array_key: str) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+    """
+    Recover the items of one array of the model's JSON reply.
+
+    The whole document is parsed when possible. Otherwise every complete item
+    of the array is recovered with the streaming parser, so one defect does
+    not lose the whole answer.
+
+    Args:
+        text: Raw model output
+        array_key: Key of the array in the top-level object
+
+    Returns:
+        The raw array items, and the parsed document (None if it could not be parsed)
+    """
+    document = extract_json_object(text)
+    if document is not None and isinstance(document.get(array_key), list):
+        return document[array_key], document
+    return JsonArrayStreamParser(array_key).feed(text), None
+
+
+class JsonArrayStreamParser:
+    """
+    Incrementally extract the items of one array of a JSON document that
+    arrives in chunks, e.g. the "recommendations" array of a model reply.
+
+    The parser keeps a small state machine (string/escape state and a stack of
+    open containers) across feed calls, so every character is scanned once and
+    each item is returned as soon as it is complete: objects and arrays at their
+    closing bracket, strings at their closing quote, numbers and literals at the
+    next separator. Text outside the top-level object (prose, markdown fences)
+    is skipped, and each item is repaired with repair_json if it is not valid
+    as-is. As in repair_json, strings may be single-quoted. The array is found
+    by its key: a string followed by a colon.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._quote = '"'
+        self._string_start = 0
+        # Last closed string, until the next token shows whether it is a key
+        self._last_string: Optional[str] = None
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._scalar = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Consume a chunk of model output.
+
+        Args:
+            chunk: Next piece of the streamed text
+
+        Returns:
+            Array items completed by this chunk
+        """
+        self._text += chunk
+        completed: List[Any] = []
+        text = self._text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            at_item_level = self._array_depth is not None and len(self._stack) == self._array_depth
+            if not self._stack and ch != "{":
+                # Prose or fences around the document
+                pass
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:self._pos]
+                    if at_item_level and self._item_start is not None:
+                        self._emit(text[self._item_start:self._pos + 1], completed)
+            else:
+                if self._scalar and (ch in ",]}" or ch.isspace()):
+                    self._emit(text[self._item_start:self._pos], completed)
+                    self._scalar = False
+                if ch == ":":
+                    self._last_key = self._last_string
+                if not ch.isspace():
+                    self._last_string = None
+                if ch in "\"'":
+                    if at_item_level and self._item_start is None:
+                        self._item_start = self._pos
+                    self._in_string = True
+                    self._quote = ch
+                    self._string_start = self._pos
+                elif ch in "{[":
+                    if at_item_level and self._item_start is None:
+                        self._item_start = self._pos
+                    if (ch == "[" and self._array_depth is None and len(self._stack) == 1
+                            and self._last_key == self.array_key):
+                        self._array_depth = len(self._stack) + 1
+                    self._stack.append(ch)
+                elif ch in "}]":
+                    if self._stack:
+                        self._stack.pop()
+                    if self._array_depth is not None:
+                        if self._item_start is not None and len(self._stack) == self._array_depth:
+                            self._emit(text[self._item_start:self._pos + 1], completed)
+                        elif ch == "]" and len(self._stack) == self._array_depth - 1:
+                            self._array_depth = None
+                elif at_item_level and self._item_start is None and ch != "," and not ch.isspace():
+                    self._item_start = self._pos
+                    self._scalar = True
+            self._pos += 1
+        return completed
+
+    def _emit(self, fragment: str, completed: List[Any]) -> None:
+        self._item_start = None
+        try:
+            completed.append(loads_tolerant(fragment))
+        except json.JSONDecodeError:
+            pass
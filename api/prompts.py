@@ -0,0 +1,75 @@
+import json
+import typing
+from typing import Any, List, Optional, Type, Union
+
+from pydantic import BaseModel
+
+_TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object"}
+
+
+def schema_outline(model: Type[BaseModel]) -> dict:
+    """
+    Build a compact, example-shaped outline of a Pydantic model.
+
+    For example Assessment becomes {"assessment_name": "string", "duration": "integer", ...}.
+    The outline costs far fewer tokens than the full JSON schema.
+
+    Args:
+        model: Pydantic model class
+
+    Returns:
+        Nested dict/list outline of the model fields
+    """
+    return {name: _outline(field.annotation) for name, field in model.model_fields.items()}
+
+
+def _outline(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        return [_outline(typing.get_args(annotation)[0])]
+    if origin is Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _outline(args[0])
+    if origin is dict:
+        return "object"
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return schema_outline(annotation)
+    return _TYPE_NAMES.get(annotation, "any")
+
+
+def duration_constraint(min_duration: Optional[int], max_duration: Optional[int]) -> Optional[str]:
+    """
+    Describe duration bounds in as few words as possible, or None when there are none.
+    """
+    if min_duration is not None and max_duration is not None:
+        return f"Duration: {min_duration}-{max_duration} minutes"
+    if max_duration is not None:
+        return f"Duration: at most {max_duration} minutes"
+    if min_duration is not None:
+        return f"Duration: at least {min_duration} minutes"
+    return None
+
+
+class PromptTemplate:
+    """
+    Prompt whose fixed part (task and output schema) is compiled once.
+
+    Rendering only joins the per-request sections, and sections that are None
+    or empty are left out, so missing constraints cost no tokens.
+    """
+
+    def __init__(self, task: str, output_outline: Any):
+        schema = json.dumps(output_outline, separators=(",", ":"))
+        self.header = f"{task.strip()}\nReply with JSON only, shaped as: {schema}\n"
+
+    def render(self, *sections: Optional[str]) -> str:
+        """
+        Render the prompt with the given per-request sections.
+
+        Args:
+            *sections: Request-specific text blocks, None entries are skipped
+
+        Returns:
+            Prompt text
+        """
+        return self.header + "\n".join(section for section in sections if section)
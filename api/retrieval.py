@@ -0,0 +1,325 @@
+"""
+Sparse lexical and dense retrieval over tokenised documents, and rank fusion.
+
+Everything is plain NumPy: sparse matrices are kept in CSR form
+(indptr/indices/data arrays) so memory and scoring cost grow with the number
+of non-zero entries, not with documents x vocabulary.
+"""
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Constant of reciprocal-rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+DEFAULT_DENSE_DIM = 128
+# Randomized SVD power iterations, more iterations give more accurate components
+POWER_ITERATIONS = 2
+
+
+class CsrMatrix:
+    """
+    Minimal compressed sparse row matrix.
+
+    Row i holds indices[indptr[i]:indptr[i + 1]] with the matching data values.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Dict[int, float]], n_cols: int) -> "CsrMatrix":
+        """
+        Build a matrix from one {column: value} dict per row.
+        """
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.float32)
+        for i, row in enumerate(rows):
+            cols = sorted(row)
+            indices[indptr[i]:indptr[i + 1]] = cols
+            data[indptr[i]:indptr[i + 1]] = [row[col] for col in cols]
+        return cls(indptr, indices, data, (len(rows), n_cols))
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def row_ids(self) -> np.ndarray:
+        """Row index of every stored entry."""
+        return np.repeat(np.arange(self.shape[0], dtype=np.int32), np.diff(self.indptr))
+
+    def transpose(self) -> "CsrMatrix":
+        """
+        The transposed matrix, also in CSR form (i.e. this matrix in CSC form).
+        """
+        order = np.argsort(self.indices, kind="stable")
+        indptr = np.zeros(self.shape[1] + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(self.indices, minlength=self.shape[1]))
+        return CsrMatrix(indptr, self.row_ids()[order], self.data[order], (self.shape[1], self.shape[0]))
+
+    def dot(self, dense: np.ndarray, chunk_size: int = 1 << 22) -> np.ndarray:
+        """
+        Multiply by a dense (n_cols, m) matrix.
+
+        Rows are processed in chunks of about chunk_size gathered values, so the
+        temporary (entries x m) product stays bounded for large matrices.
+        """
+        # Column-major copy, so the reduction below runs over contiguous memory
+        dense_t = np.ascontiguousarray(np.asarray(dense, dtype=np.float32).T)
+        out = np.zeros((self.shape[0], dense.shape[1]), dtype=np.float32)
+        step = max(1, chunk_size // max(1, dense.shape[1]))
+        start_row = 0
+        while start_row < self.shape[0]:
+            # Advance by whole rows until the chunk holds about step entries
+            end_row = max(start_row + 1, int(np.searchsorted(self.indptr, self.indptr[start_row] + step, side="right")) - 1)
+            end_row = min(end_row, self.shape[0])
+            lo, hi = self.indptr[start_row], self.indptr[end_row]
+            if hi > lo:
+                products = np.take(dense_t, self.indices[lo:hi], axis=1) * self.data[lo:hi]
+                starts = self.indptr[start_row:end_row] - lo
+                non_empty = np.flatnonzero(starts < self.indptr[start_row + 1:end_row + 1] - lo)
+                # reduceat needs valid start positions; empty rows are left at zero
+                out[start_row + non_empty] = np.add.reduceat(products, starts[non_empty], axis=1).T
+            start_row = end_row
+        return out
+
+    def take_rows(self, rows: Sequence[int]) -> "CsrMatrix":
+        """
+        The submatrix of the given rows, in that order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(lengths)
+        offsets = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return CsrMatrix(indptr, self.indices[offsets], self.data[offsets], (len(rows), self.shape[1]))
+
+    def row_norms(self) -> np.ndarray:
+        return np.sqrt(np.bincount(self.row_ids(), weights=self.data.astype(np.float64) ** 2,
+                                   minlength=self.shape[0])).astype(np.float32)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index.
+
+    Postings are stored term-major in CSR form with the BM25 weight of each
+    (term, document) pair precomputed, so scoring a query only touches the
+    postings of its terms: one gather and one bincount.
+
+    Args:
+        documents: Token ids of each document
+        n_terms: Vocabulary size
+        k1: Term frequency saturation
+        b: Document length normalisation
+    """
+
+    def __init__(self, documents: Sequence[Sequence[int]], n_terms: int, k1: float = BM25_K1, b: float = BM25_B):
+        self.n_docs = len(documents)
+        lengths = np.array([len(doc) for doc in documents], dtype=np.float32)
+        avg_length = float(lengths.mean()) if self.n_docs and lengths.mean() > 0 else 1.0
+
+        term_counts: List[Dict[int, float]] = []
+        for doc in documents:
+            counts: Dict[int, float] = {}
+            for term in doc:
+                counts[term] = counts.get(term, 0.0) + 1.0
+            term_counts.append(counts)
+        postings = CsrMatrix.from_rows(term_counts, n_terms).transpose()
+
+        doc_freq = np.diff(postings.indptr).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        tf = postings.data
+        norm = k1 * (1.0 - b + b * lengths[postings.indices] / avg_length)
+        postings.data = (np.repeat(self.idf, np.diff(postings.indptr)) * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+        self.postings = postings
+
+    @classmethod
+    def from_postings(cls, postings: CsrMatrix, idf: np.ndarray) -> "BM25Index":
+        """
+        Index from weighted postings and idf saved from another BM25Index, e.g. memory-mapped.
+        """
+        index = cls.__new__(cls)
+        index.n_docs = postings.shape[1]
+        index.idf = idf
+        index.postings = postings
+        return index
+
+    def scores(self, terms: Sequence[int]) -> np.ndarray:
+        """
+        BM25 score of every document for a query given as token ids.
+        """
+        if not len(terms):
+            return np.zeros(self.n_docs, dtype=np.float32)
+        unique, counts = np.unique(np.asarray(terms, dtype=np.int64), return_counts=True)
+        starts = self.postings.indptr[unique]
+        lengths = self.postings.indptr[unique + 1] - starts
+        # Positions of all postings of the query terms, without a Python loop over terms
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        weights = self.postings.data[offsets] * np.repeat(counts, lengths)
+        return np.bincount(self.postings.indices[offsets], weights=weights, minlength=self.n_docs).astype(np.float32)
+
+
+def lsa_components(tfidf: CsrMatrix, dim: int, seed: int = 0) -> np.ndarray:
+    """
+    Leading right singular vectors of a sparse matrix by randomized SVD.
+
+    The randomized range finder only needs sparse-dense products, so the
+    dense documents x terms matrix is never formed.
+
+    Returns:
+        (n_terms, dim) float32 term components, dim capped by the matrix shape
+    """
+    n_docs, n_terms = tfidf.shape
+    dim = max(0, min(dim, n_docs, n_terms))
+    if dim == 0:
+        return np.zeros((n_terms, 0), dtype=np.float32)
+
+    transposed = tfidf.transpose()
+    rng = np.random.default_rng(seed)
+    oversampled = min(dim + 10, n_docs, n_terms)
+    basis = tfidf.dot(rng.standard_normal((n_terms, oversampled)).astype(np.float32))
+    for _ in range(POWER_ITERATIONS):
+        # Each iteration sharpens the spectrum so the leading components stand out
+        basis, _ = np.linalg.qr(basis)
+        basis, _ = np.linalg.qr(transposed.dot(basis))
+        basis = tfidf.dot(basis)
+    basis, _ = np.linalg.qr(basis)
+    # Project onto the basis: small (oversampled x n_terms) matrix whose right singular
+    # vectors are the term components, found from its (oversampled x oversampled) Gram matrix
+    small = transposed.dot(basis).T.astype(np.float64)
+    eigenvalues, eigenvectors = np.linalg.eigh(small @ small.T)
+    order = np.argsort(-eigenvalues)[:dim]
+    singular = np.sqrt(np.clip(eigenvalues[order], 0.0, None))
+    singular[singular == 0] = 1.0
+    vt = (eigenvectors[:, order].T @ small) / singular[:, None]
+    return np.ascontiguousarray(vt.T, dtype=np.float32)
+
+
+def lsa_embeddings(tfidf: CsrMatrix, components: np.ndarray) -> np.ndarray:
+    """
+    Normalised embeddings of TF-IDF rows in the latent space of components.
+    """
+    if components.shape[1] == 0:
+        return np.zeros((tfidf.shape[0], 0), dtype=np.float32)
+    return l2_normalize_rows(tfidf.dot(components))
+
+
+class DenseIndex:
+    """
+    Dense document embeddings from latent semantic analysis of a TF-IDF matrix.
+
+    A truncated SVD of the sparse TF-IDF matrix gives term vectors in a
+    low-dimensional space, so queries and documents that use related words
+    end up close even when they share few exact terms.
+
+    Args:
+        tfidf: Documents x terms TF-IDF matrix
+        dim: Number of latent dimensions, capped by the matrix rank
+        seed: Seed of the random projection, for reproducible embeddings
+        components: Precomputed components of this model version, skips the SVD
+        embeddings: Precomputed document embeddings of this model version
+        version: Model version of the precomputed arrays, skips hashing tfidf
+    """
+
+    def __init__(self, tfidf: CsrMatrix, dim: int = DEFAULT_DENSE_DIM, seed: int = 0,
+                 components: Optional[np.ndarray] = None, embeddings: Optional[np.ndarray] = None,
+                 version: Optional[str] = None):
+        self.version = version or self.model_version(tfidf, dim, seed)
+        self.components = lsa_components(tfidf, dim, seed) if components is None else components
+        self.embeddings = lsa_embeddings(tfidf, self.components) if embeddings is None else embeddings
+
+    @staticmethod
+    def model_version(tfidf: CsrMatrix, dim: int = DEFAULT_DENSE_DIM, seed: int = 0) -> str:
+        """
+        Identifier of the model an SVD of tfidf would produce: changes with the corpus and the settings.
+        """
+        digest = hashlib.sha256(f"{dim}:{seed}:{POWER_ITERATIONS}:{tfidf.shape}".encode("utf-8"))
+        for array in (tfidf.indptr, tfidf.indices, tfidf.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return f"lsa-{digest.hexdigest()[:16]}"
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    def encode(self, tfidf_vectors: np.ndarray) -> np.ndarray:
+        """
+        Embed query TF-IDF vectors, shape (n_queries, n_terms), into the latent space.
+        """
+        # Queries use few terms, so only those rows of the components are multiplied
+        terms = np.flatnonzero(tfidf_vectors.any(axis=0))
+        return l2_normalize_rows(tfidf_vectors[:, terms] @ self.components[terms])
+
+
+def top_ranked(scores: np.ndarray, depth: int) -> np.ndarray:
+    """
+    Indices of the depth highest finite scores, best first (ties keep index order).
+    """
+    finite = np.flatnonzero(np.isfinite(scores))
+    depth = min(depth, finite.size)
+    if depth == 0:
+        return finite
+    top = finite[np.argpartition(-scores[finite], depth - 1)[:depth]]
+    return top[np.lexsort((top, -scores[top]))]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], size: int, k: int = RRF_K) -> np.ndarray:
+    """
+    Fuse ranked lists of document indices by reciprocal rank.
+
+    A document at 0-based rank r in a list contributes 1 / (k + r + 1).
+    Fusing ranks rather than scores needs no calibration between retrievers
+    whose scores live on different scales (BM25 vs cosine).
+
+    Args:
+        rankings: Document indices of each retriever, best first
+        size: Number of documents
+        k: Fusion constant, larger values flatten the rank discount
+
+    Returns:
+        Fused score of every document, 0 for documents in no list
+    """
+    fused = np.zeros(size, dtype=np.float64)
+    for ranking in rankings:
+        fused[ranking] += 1.0 / (k + 1.0 + np.arange(len(ranking)))
+    return fused
+
+
+def l2_normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def sparse_tfidf(documents: Sequence[Sequence[int]], n_terms: int,
+                 idf: Optional[np.ndarray] = None) -> Tuple[CsrMatrix, np.ndarray]:
+    """
+    Log-scaled, L2-normalised TF-IDF rows for documents given as token ids.
+
+    Returns:
+        The CSR matrix and the idf vector (computed from the documents unless given)
+    """
+    rows: List[Dict[int, float]] = []
+    for doc in documents:
+        counts: Dict[int, float] = {}
+        for term in doc:
+            counts[term] = counts.get(term, 0.0) + 1.0
+        rows.append(counts)
+    matrix = CsrMatrix.from_rows(rows, n_terms)
+    if idf is None:
+        doc_freq = np.bincount(matrix.indices, minlength=n_terms)
+        idf = (np.log((1.0 + len(documents)) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+    matrix.data = np.log1p(matrix.data) * idf[matrix.indices]
+    norms = matrix.row_norms()
+    norms[norms == 0] = 1.0
+    matrix.data = (matrix.data / np.repeat(norms, np.diff(matrix.indptr))).astype(np.float32)
+    return matrix, idf
@@ -0,0 +1,375 @@
+"""
+Admission control for outbound calls to a rate-limited upstream (Gemini).
+
+Calls go through OutboundScheduler.slot(), which combines:
+
+- a token bucket sized to the upstream quota (requests per minute and burst),
+- a bounded wait queue: at most max_queue calls wait, each for at most
+  queue_timeout seconds for a token and a concurrency slot,
+- a circuit breaker that stops calling after repeated failures, or for as
+  long as a quota error's Retry-After asks, then lets one probe call through.
+
+A call that cannot be admitted fails fast with Overloaded, which carries the
+HTTP status and Retry-After to shed the request with, instead of piling up
+behind a saturated upstream.
+"""
+import asyncio
+import concurrent.futures
+import email.utils
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_QUEUE_TIMEOUT = 5.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 30.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Overloaded(Exception):
+    """
+    A call was not admitted to the upstream.
+
+    Args:
+        reason: queue_full, rate_limited, queue_timeout or circuit_open
+        retry_after: Seconds after which a retry may be admitted
+        status_code: 429 when our own limits are saturated, 503 when the upstream is unavailable
+    """
+
+    def __init__(self, reason: str, retry_after: float, status_code: int = 429):
+        super().__init__(f"Upstream call not admitted ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = max(0.0, retry_after)
+        self.status_code = status_code
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds, at least 1."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """
+    Whether an SDK error is a quota or rate limit rejection (HTTP 429, gRPC RESOURCE_EXHAUSTED).
+    """
+    code = getattr(error, "code", None)
+    return code == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Delay the upstream asked for, from a Retry-After header (REST) or a RetryInfo detail (gRPC).
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate tokens per second up to burst tokens.
+
+    A token can be reserved ahead of time, which lets the bucket go negative:
+    the caller then sleeps until the token exists. Reservations are refused
+    once the wait would exceed the caller's deadline, so a burst above the
+    quota turns into rejections instead of an ever longer queue.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take one token.
+
+        Returns:
+            Seconds to wait before the token may be used, or None (and nothing
+            is taken) when that is longer than max_wait
+        """
+        wait = self.delay()
+        if wait > max_wait:
+            return None
+        self._tokens -= 1.0
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing upstream.
+
+    After failure_threshold consecutive failures, or a quota error, the
+    circuit opens for cooldown seconds (or the upstream's Retry-After, if
+    longer). Then one probe call is let through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures = 0
+        self._open_until = 0.0
+        self._opened = False
+        self._probing = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        if not self._opened:
+            return CLOSED
+        return OPEN if self._clock() < self._open_until or self._probing else HALF_OPEN
+
+    def check(self) -> None:
+        """
+        Raise Overloaded while the circuit is open.
+        """
+        if self.state == OPEN:
+            raise Overloaded("circuit_open", max(self._open_until - self._clock(), 1.0), status_code=503)
+
+    def acquire(self) -> bool:
+        """
+        Admit a call: raises while open, and claims the single probe when half-open.
+
+        Returns:
+            Whether the call is the probe, to be passed back to record_success, record_failure or release
+        """
+        self.check()
+        if self.state == HALF_OPEN:
+            self._probing = True
+            return True
+        return False
+
+    def release(self, probe: bool) -> None:
+        """Give back the probe when the call was abandoned before it could tell anything."""
+        if probe:
+            self._probing = False
+
+    def record_success(self, probe: bool = False) -> None:
+        self._failures = 0
+        # A call admitted before the circuit opened does not close it; only the probe does
+        if probe or not self._opened:
+            self._opened = False
+            self._probing = False
+
+    def record_failure(self, error: Optional[BaseException] = None, probe: bool = False) -> None:
+        self._failures += 1
+        quota = error is not None and is_quota_error(error)
+        if quota or probe or self._failures >= self.failure_threshold:
+            retry_after = retry_after_seconds(error) if quota else None
+            self._open_until = max(self._open_until, self._clock() + max(self.cooldown, retry_after or 0.0))
+            if not self._opened or probe:
+                self.opened_count += 1
+            self._opened = True
+            if probe:
+                self._probing = False
+
+
+class Admission:
+    """
+    An admitted call, yielded by OutboundScheduler.slot().
+
+    A call whose work runs on a thread can outlive the coroutine that awaited
+    it (a timed out SDK call keeps its worker thread busy). hold() keeps the
+    concurrency slot until that work has finished, so the scheduler never
+    admits more calls than are really running upstream.
+    """
+
+    def __init__(self):
+        self.held: Optional[concurrent.futures.Future] = None
+
+    def hold(self, future: concurrent.futures.Future) -> None:
+        """Keep the slot until future is done, even after the call returns or times out."""
+        self.held = future
+
+
+class OutboundScheduler:
+    """
+    Admission control for outbound calls: rate limit, bounded wait queue and circuit breaker.
+
+    Args:
+        max_concurrency: Calls running at once
+        rate_per_minute: Token bucket refill rate, 0 for no rate limit
+        burst: Token bucket size, defaults to one second of calls (at least 1)
+        max_queue: Calls allowed to wait for admission; more are rejected at once
+        queue_timeout: Longest a call waits for admission before it is rejected
+        breaker: Circuit breaker, a default one if None
+        clock: Monotonic clock, for tests
+    """
+
+    def __init__(self, max_concurrency: int, rate_per_minute: float = 0.0, burst: Optional[float] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+                 breaker: Optional[CircuitBreaker] = None, clock: Callable[[], float] = time.monotonic):
+        rate = rate_per_minute / 60.0
+        self.bucket = TokenBucket(rate, burst or rate, clock) if rate > 0 else None
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self._clock = clock
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queued = 0
+        self._running = 0
+        self.rejected: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, max_concurrency: int) -> "OutboundScheduler":
+        """
+        Build a scheduler from GEMINI_RPM, GEMINI_BURST, GEMINI_QUEUE_SIZE,
+        GEMINI_QUEUE_TIMEOUT, GEMINI_BREAKER_THRESHOLD and GEMINI_BREAKER_COOLDOWN.
+        """
+        return cls(
+            max_concurrency,
+            rate_per_minute=float(os.getenv("GEMINI_RPM", "0")),
+            burst=float(os.getenv("GEMINI_BURST", "0")) or None,
+            max_queue=int(os.getenv("GEMINI_QUEUE_SIZE", DEFAULT_MAX_QUEUE)),
+            queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)),
+                cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN", DEFAULT_COOLDOWN))
+            )
+        )
+
+    def _reject(self, error: Overloaded) -> Overloaded:
+        self.rejected[error.reason] = self.rejected.get(error.reason, 0) + 1
+        return error
+
+    def check(self) -> None:
+        """
+        Raise Overloaded if a call made now would be rejected without waiting.
+
+        Lets an endpoint shed a request before it starts a response it cannot finish.
+        """
+        try:
+            self.breaker.check()
+        except Overloaded as e:
+            raise self._reject(e)
+        if self._queued >= self.max_queue:
+            raise self._reject(Overloaded("queue_full", self.queue_timeout))
+
+    @property
+    def running(self) -> int:
+        """Admitted calls whose slot is still held."""
+        return self._running
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._semaphore.release()
+
+    def _release_when_done(self, future: concurrent.futures.Future) -> None:
+        loop = asyncio.get_running_loop()
+
+        def done(_: concurrent.futures.Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                # The event loop is closed, nobody is waiting for the slot any more
+                pass
+
+        future.add_done_callback(done)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Admission]:
+        """
+        Wait for admission, then run the body as one upstream call.
+
+        Exceptions raised by the body count as upstream failures for the
+        circuit breaker; quota errors open it for their Retry-After. The
+        concurrency slot is released when the body exits, or once the future
+        passed to Admission.hold() is done, whichever is later.
+
+        Raises:
+            Overloaded: If the call is not admitted
+        """
+        self.check()
+        deadline = self._clock() + self.queue_timeout
+        self._queued += 1
+        try:
+            if self.bucket is not None:
+                wait = self.bucket.reserve(self.queue_timeout)
+                if wait is None:
+                    raise self._reject(Overloaded("rate_limited", self.bucket.delay()))
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            if not self._semaphore.locked():
+                # Free slot: acquired without yielding, so the call never shows up as queued
+                await self._semaphore.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), max(0.0, deadline - self._clock()))
+                except asyncio.TimeoutError:
+                    raise self._reject(Overloaded("queue_timeout", self.queue_timeout))
+        finally:
+            self._queued -= 1
+
+        self._running += 1
+        admission = Admission()
+        try:
+            try:
+                probe = self.breaker.acquire()
+            except Overloaded as e:
+                raise self._reject(e)
+            try:
+                yield admission
+            except Exception as e:
+                self.breaker.record_failure(e, probe)
+                raise
+            except BaseException:
+                # Cancelled or abandoned by the caller; says nothing about the upstream
+                self.breaker.release(probe)
+                raise
+            self.breaker.record_success(probe)
+        finally:
+            if admission.held is not None and not admission.held.done():
+                self._release_when_done(admission.held)
+            else:
+                self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue, rate limit and circuit state for health checks.
+        """
+        return {
+            "queued": self._queued,
+            "running": self._running,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "rate_per_minute": None if self.bucket is None else round(self.bucket.rate * 60, 3),
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened_count,
+            "rejected": dict(self.rejected)
+        }
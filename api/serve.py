@@ -0,0 +1,81 @@
+"""
+Multi-worker deployment with one shared copy of the catalog index.
+
+    python -m api.serve --workers 4 [--host 0.0.0.0] [--port 8000] [--index-dir DIR]
+
+Started as `uvicorn api.main:app --workers N`, every worker would build its
+own catalog index and keep its own response cache. Here the parent process
+builds the catalog once (configured as for a single process: CATALOG_SNAPSHOT
+or CATALOG_PATH, EMBEDDING_STORE_PATH, ANN_BACKEND), saves every index array
+to the index directory, and starts the workers with CATALOG_INDEX_PATH
+pointing there. Workers memory-map the arrays read-only, so the operating
+system keeps one copy in the page cache however many workers run. Responses
+are shared through the SQLite cache tier in WAL mode: RESPONSE_CACHE_PATH,
+or a file in the index directory when it is unset.
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+import uvicorn
+
+from api.ann import load_or_build_index
+from api.catalog import AssessmentCatalog
+
+CACHE_NAME = "responses.sqlite3"
+ANN_DIR_NAME = "ann"
+
+
+def prepare(index_dir: Path) -> Dict[str, str]:
+    """
+    Build the catalog and its nearest-neighbour index once and save them for the workers.
+
+    Args:
+        index_dir: Directory the index is saved to, created if missing
+
+    Returns:
+        Environment variables that point workers at the saved index and the shared cache
+    """
+    started = time.perf_counter()
+    catalog = AssessmentCatalog.from_env()
+    catalog.save_index(index_dir)
+    env = {"CATALOG_INDEX_PATH": str(index_dir)}
+    backend = os.getenv("ANN_BACKEND")
+    if backend:
+        # Saved next to the catalog; workers find it by fingerprint and load it instead of building
+        ann_path = os.getenv("ANN_INDEX_PATH") or str(index_dir / ANN_DIR_NAME)
+        load_or_build_index(backend, catalog.dense.embeddings, ann_path)
+        env["ANN_INDEX_PATH"] = ann_path
+    env["RESPONSE_CACHE_PATH"] = os.getenv("RESPONSE_CACHE_PATH") or str(index_dir / CACHE_NAME)
+    logging.info(f"Prepared the index of {len(catalog)} assessments in {index_dir} "
+                 f"in {time.perf_counter() - started:.2f}s")
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several workers sharing one catalog index")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8000, help="Bind port")
+    parser.add_argument("--index-dir", type=Path,
+                        help="Where the shared index is saved, defaults to a temporary directory removed on exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    index_dir = args.index_dir or Path(tempfile.mkdtemp(prefix="shl-catalog-"))
+    try:
+        # Workers are spawned by uvicorn and inherit the environment
+        os.environ.update(prepare(index_dir))
+        uvicorn.run("api.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if args.index_dir is None:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Union
+
+import numpy as np
+
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = "snapshot.json"
+STRING_FIELDS = ("assessment_name", "url", "test_type", "description")
+INT_FIELDS = ("duration",)
+BOOL_FIELDS = ("remote_testing", "adaptive_irt")
+# Stored in an int column for a value that is unknown (None) in the record
+MISSING_INT = -1
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    """
+    Write an .npy file atomically.
+
+    The file is replaced rather than overwritten, so processes that still map
+    the old file keep a valid mapping.
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(records: Sequence[Dict[str, Any]], directory: Union[str, Path]) -> Path:
+    """
+    Write assessment records as a columnar snapshot.
+
+    Numeric and boolean fields become one .npy file each; a None int is stored
+    as MISSING_INT. String fields share
+    one UTF-8 string table (strings.npy) and every string field has an int64
+    offsets column, so string i of a field is table[offsets[i]:offsets[i + 1]].
+    Files are replaced atomically and the manifest is written last.
+
+    Args:
+        records: Assessment records as in data/catalog.json
+        directory: Snapshot directory, created if missing
+
+    Returns:
+        Path of the snapshot directory
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    blobs: List[bytes] = []
+    size = 0
+    for field in STRING_FIELDS:
+        offsets = np.empty(len(records) + 1, dtype=np.int64)
+        offsets[0] = size
+        for i, record in enumerate(records):
+            encoded = str(record.get(field) or "").encode("utf-8")
+            blobs.append(encoded)
+            size += len(encoded)
+            offsets[i + 1] = size
+        save_array(directory / f"{field}.offsets.npy", offsets)
+    save_array(directory / "strings.npy", np.frombuffer(b"".join(blobs), dtype=np.uint8))
+
+    for field in INT_FIELDS:
+        values = [MISSING_INT if rec.get(field) is None else int(rec[field]) for rec in records]
+        save_array(directory / f"{field}.npy", np.array(values, dtype=np.int32))
+    for field in BOOL_FIELDS:
+        save_array(directory / f"{field}.npy", np.array([bool(rec[field]) for rec in records], dtype=np.bool_))
+
+    manifest = {"version": SNAPSHOT_VERSION, "count": len(records),
+                "string_fields": STRING_FIELDS, "int_fields": INT_FIELDS, "bool_fields": BOOL_FIELDS}
+    tmp_path = directory / f"{MANIFEST_NAME}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, directory / MANIFEST_NAME)
+    return directory
+
+
+class SnapshotRecords(Sequence[Dict[str, Any]]):
+    """
+    Read-only sequence of assessment records backed by a memory-mapped snapshot.
+
+    Columns are opened with mmap, so loading costs a few page mappings
+    regardless of catalog size. A record is only decoded when it is accessed,
+    and numeric columns (e.g. durations) can be used as arrays without copying.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        directory = Path(directory)
+        with open(directory / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported catalog snapshot version {manifest.get('version')} in {directory}")
+        self._count = manifest["count"]
+        self._strings = np.load(directory / "strings.npy", mmap_mode="r")
+        self._offsets = {field: np.load(directory / f"{field}.offsets.npy", mmap_mode="r")
+                         for field in manifest["string_fields"]}
+        self._int_fields = set(manifest["int_fields"])
+        self.columns: Dict[str, np.ndarray] = {
+            field: np.load(directory / f"{field}.npy", mmap_mode="r")
+            for field in list(manifest["int_fields"]) + list(manifest["bool_fields"])
+        }
+
+    def __len__(self) -> int:
+        return self._count
+
+    def string(self, field: str, index: int) -> str:
+        """Decode one string cell."""
+        offsets = self._offsets[field]
+        return self._strings[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        record: Dict[str, Any] = {field: self.string(field, index) for field in self._offsets}
+        for field, column in self.columns.items():
+            value = column[index].item()
+            record[field] = None if field in self._int_fields and value == MISSING_INT else value
+        return record
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._count):
+            yield self[index]
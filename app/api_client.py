@@ -0,0 +1,140 @@
+"""
+Client of the recommendation API for the Streamlit app.
+
+Streamlit re-runs the whole script on every interaction, so anything created
+at module level is created again each time. The HTTP session is therefore
+held in st.cache_resource: one pooled session per server process, shared by
+every browser session, keeps connections to the API alive between submits.
+Completed results are kept for RESULTS_CACHE_TTL seconds in a dict, also held
+in st.cache_resource, keyed on (query, min_duration, max_duration), so an
+identical submission (by the same or another user) is rendered without
+calling the API.
+
+API_BASE_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_POOL_SIZE,
+RESULTS_CACHE_TTL and RESULTS_CACHE_SIZE configure the client.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000").rstrip("/")
+# Seconds to establish a connection, and to wait for each chunk of the response
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+RESULTS_CACHE_TTL = float(os.getenv("RESULTS_CACHE_TTL", "600"))
+RESULTS_CACHE_SIZE = int(os.getenv("RESULTS_CACHE_SIZE", "256"))
+
+
+class RecommendationError(Exception):
+    """The API reported an error while streaming recommendations."""
+
+
+ResultKey = Tuple[str, Optional[int], Optional[int]]
+
+
+class ResultCache:
+    """
+    Completed results by (query, min_duration, max_duration), shared by all browser sessions.
+
+    Entries expire ttl seconds after they are stored; beyond size entries the
+    oldest is dropped. Streamlit serves sessions from several threads, so
+    access is locked. Stored results are shared and must not be modified.
+    """
+
+    def __init__(self, ttl: float, size: int):
+        self.ttl = ttl
+        self.size = size
+        self._entries: "OrderedDict[ResultKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ResultKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: ResultKey, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource(show_spinner=False)
+def get_session() -> requests.Session:
+    """
+    Session shared by all browser sessions, with a connection pool to the API.
+
+    Requests that could not connect are retried with a short backoff; requests
+    that reached the server are not, since the API may still be working on them.
+    """
+    session = requests.Session()
+    retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3, allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_POOL_SIZE, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def iter_sse_events(response: requests.Response) -> Iterator[Tuple[str, Any]]:
+    """Yield (event, data) pairs from a server-sent events response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+        elif not line and data_lines:
+            yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+
+
+def stream_recommendations(query: str, min_duration: Optional[int],
+                           max_duration: Optional[int]) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream recommendations from /api/recommend/stream as (event, data) pairs.
+
+    Raises:
+        requests.RequestException: If the API cannot be reached, times out or answers with an error status
+    """
+    payload = {"query": query, "min_duration": min_duration, "max_duration": max_duration}
+    with get_session().post(f"{API_BASE_URL}/api/recommend/stream", json=payload, stream=True,
+                            timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)) as response:
+        response.raise_for_status()
+        yield from iter_sse_events(response)
+
+
+@st.cache_resource(show_spinner=False)
+def get_result_cache() -> ResultCache:
+    """Result cache shared by all browser sessions of this server."""
+    return ResultCache(RESULTS_CACHE_TTL, RESULTS_CACHE_SIZE)
+
+
+def cached_recommendations(query: str, min_duration: Optional[int],
+                           max_duration: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    A result stored by remember_recommendations within the last RESULTS_CACHE_TTL seconds, or None.
+    """
+    return get_result_cache().get((query, min_duration, max_duration))
+
+
+def remember_recommendations(query: str, min_duration: Optional[int], max_duration: Optional[int],
+                             result: Dict[str, Any]) -> None:
+    """
+    Store a complete result ({"recommendations": [...], "query_analysis": ...}) for identical submissions.
+    """
+    get_result_cache().put((query, min_duration, max_duration), result)
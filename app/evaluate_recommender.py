@@ -1,83 +1,227 @@
+import argparse
 import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional
 import requests
-from typing import List, Dict, Any
-from evaluation_metrics import evaluate_recommendation_system
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# The script runs from app/, the metrics live in utils/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.metrics import AP_NORMALIZATIONS, DEFAULT_AP_NORMALIZATION, evaluate_recommendation_system  # noqa: E402
+
 headers = {
     'Cache-Control': 'no-cache',
     'Pragma': 'no-cache'
 }
+API_URL = "http://localhost:8000/api/recommend"  # Replace with your API endpoint
+DEFAULT_MIN_DURATION = 0
+DEFAULT_MAX_DURATION = 60
+
 def load_test_queries(file_path: str) -> List[Dict[str, Any]]:
     with open(file_path, 'r') as f:
         return json.load(f)
 
-def get_recommendations(query: str, min_duration: int = 0, max_duration: int = 60) -> List[Any]:
+def create_session(concurrency: int = 8, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """
+    Create a session whose connection pool is shared by all worker threads.
+
+    Connection errors, 429 and 5xx responses are retried with exponential
+    backoff, honouring Retry-After headers.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
+def fetch_recommendations(session: requests.Session, query: str, min_duration: int = DEFAULT_MIN_DURATION,
+                          max_duration: int = DEFAULT_MAX_DURATION,
+                          api_url: str = API_URL, timeout: float = 60.0) -> List[Any]:
+    """
+    Get recommendations for one query, raising on any failure.
+    """
     payload = {
         "query": query,
         "min_duration": min_duration,
         "max_duration": max_duration
     }
+    response = session.post(api_url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    # Handle both list of dictionaries and list of strings
+    if not isinstance(data.get("recommendations"), list):
+        raise ValueError("Unexpected response format. Expected 'recommendations' to be a list.")
+    return data["recommendations"]
 
+def get_recommendations(query: str, min_duration: int = DEFAULT_MIN_DURATION, max_duration: int = DEFAULT_MAX_DURATION,
+                        session: Optional[requests.Session] = None) -> List[Any]:
     try:
-        response = requests.post(
-            "http://localhost:8000/api/recommend",  # Replace with your API endpoint
-            json=payload
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            # Handle both list of dictionaries and list of strings
-            if isinstance(data.get("recommendations"), list):
-                return data["recommendations"]
-            else:
-                print("Unexpected response format. Expected 'recommendations' to be a list.")
-                return []
-        else:
-            print(f"Error getting recommendations: {response.status_code}")
-            print(f"Response: {response.text}")
-            return []
+        return fetch_recommendations(session or create_session(concurrency=1), query, min_duration, max_duration)
     except Exception as e:
         print(f"Exception when getting recommendations: {str(e)}")
         return []
 
-def main():
-    # Load test queries
-    test_queries = load_test_queries("test_queries.json")  # Create this file
+def assessment_names(recommendations: List[Any]) -> List[str]:
+    # Extract assessment names, handling different response formats
+    if recommendations and isinstance(recommendations[0], dict):
+        return [rec.get('assessment_name', '') for rec in recommendations]
+    return recommendations  # Assuming recommendations are already strings
 
-    # Collect recommendations and relevant assessments
-    all_recommendations = []
-    all_relevant_assessments = []
+def run_parameters(test_query: Dict[str, Any], api_url: str) -> Dict[str, Any]:
+    """
+    Everything a query's result depends on: its text, duration bounds and the endpoint.
+
+    Test queries may set min_duration and max_duration, otherwise the defaults are used.
+    """
+    return {
+        "query": test_query["query"],
+        "api_url": api_url,
+        "min_duration": test_query.get("min_duration", DEFAULT_MIN_DURATION),
+        "max_duration": test_query.get("max_duration", DEFAULT_MAX_DURATION)
+    }
+
+def load_completed_results(results_path: str, test_queries: List[Dict[str, Any]],
+                           api_url: str = API_URL) -> Dict[int, Dict[str, Any]]:
+    """
+    Read per-query results of an earlier run so that it can be resumed.
+
+    Only successful results whose query text, duration bounds and endpoint
+    still match are kept, so a run against another API or with other bounds
+    starts those queries over.
+    """
+    completed = {}
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run interrupted mid-write leaves a partial last line
+                continue
+            index = record.get("index")
+            if not (record.get("ok") and isinstance(index, int) and 0 <= index < len(test_queries)):
+                continue
+            parameters = run_parameters(test_queries[index], api_url)
+            if all(record.get(name) == value for name, value in parameters.items()):
+                completed[index] = record
+    return completed
+
+def run_queries(test_queries: List[Dict[str, Any]], results_path: str, concurrency: int = 8,
+                retries: int = 3, timeout: float = 60.0, api_url: str = API_URL,
+                resume: bool = True) -> Dict[int, Dict[str, Any]]:
+    """
+    Run every query against the API concurrently.
 
-    for test_query in test_queries:
-        query_text = test_query["query"]
-        relevant_assessments = test_query["relevant_assessments"]
+    Each result is appended to results_path (one JSON object per line) as soon
+    as it arrives, so an interrupted run can be resumed and only the missing
+    queries are sent again.
 
-        #print(f"\nProcessing query: {query_text[:50]}...")
+    Returns:
+        Mapping from query index to its result record
+    """
+    completed = load_completed_results(results_path, test_queries, api_url) if resume else {}
+    pending = [i for i in range(len(test_queries)) if i not in completed]
+    if completed:
+        print(f"Resuming: {len(completed)} of {len(test_queries)} queries already done.")
 
-        # Get recommendations from the API
-        recommendations = get_recommendations(query_text)
-        print(f"\nRecommendations: {recommendations}")
-        # Extract assessment names, handling different response formats
-        if recommendations and isinstance(recommendations[0], dict):
-            assessment_names = [rec.get('assessment_name', '') for rec in recommendations]  # Corrected line
-        else:
-            assessment_names = recommendations  # Assuming recommendations are already strings
+    session = create_session(concurrency, retries)
+    started = time.monotonic()
 
-        all_recommendations.append(assessment_names)
-        all_relevant_assessments.append(relevant_assessments)
+    def run_one(index: int) -> Dict[str, Any]:
+        parameters = run_parameters(test_queries[index], api_url)
+        query_started = time.monotonic()
+        try:
+            recommendations = fetch_recommendations(session, timeout=timeout, **parameters)
+            record = {"index": index, **parameters, "ok": True,
+                      "recommendations": assessment_names(recommendations)}
+        except Exception as e:
+            record = {"index": index, **parameters, "ok": False, "error": str(e), "recommendations": []}
+        record["latency_seconds"] = round(time.monotonic() - query_started, 3)
+        return record
+
+    with open(results_path, 'a' if resume else 'w') as results_file, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_one, index) for index in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            results_file.write(json.dumps(record) + "\n")
+            results_file.flush()
+            completed[record["index"]] = record
+            status = "ok" if record["ok"] else f"failed: {record['error']}"
+            elapsed = time.monotonic() - started
+            print(f"[{done}/{len(pending)}] {record['query'][:50]}... {status} "
+                  f"({record['latency_seconds']:.2f}s, {done / elapsed:.1f} queries/s)")
+
+    session.close()
+    return completed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the SHL Assessment Recommender API")
+    parser.add_argument("--queries", default="test_queries.json", help="Test queries JSON file")
+    parser.add_argument("--results", default="evaluation_runs.jsonl", help="Per-query results file (JSON lines)")
+    parser.add_argument("--output", default="evaluation_results.json", help="Metrics output file")
+    parser.add_argument("--api-url", default=API_URL, help="Recommendation endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent requests")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per request with exponential backoff")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--k", type=int, nargs="+", default=[3], help="K values to evaluate")
+    parser.add_argument("--ap-normalization", choices=AP_NORMALIZATIONS, default=DEFAULT_AP_NORMALIZATION,
+                        help="Divide AP@K by min(K, relevant items) or by the number of relevant items")
+    parser.add_argument("--fresh", action="store_true", help="Ignore results of an earlier run")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Load test queries
+    test_queries = load_test_queries(args.queries)  # Create this file
+
+    results = run_queries(
+        test_queries,
+        args.results,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        timeout=args.timeout,
+        api_url=args.api_url,
+        resume=not args.fresh
+    )
+
+    failed = [index for index, record in results.items() if not record["ok"]]
+    if failed:
+        print(f"\n{len(failed)} queries failed; run again to retry them.")
+
+    # Collect recommendations and relevant assessments
+    all_recommendations = [results[i]["recommendations"] for i in range(len(test_queries))]
+    all_relevant_assessments = [test_query["relevant_assessments"] for test_query in test_queries]
 
     # Evaluate the recommendation system
-    k_values = [3]  # As per the assignment requirement
-    results = evaluate_recommendation_system(
+    k_values = args.k  # As per the assignment requirement
+    metrics = evaluate_recommendation_system(
         all_recommendations,
         all_relevant_assessments,
-        k_values
+        k_values,
+        args.ap_normalization
     )
 
     # Print results
     print("\nEvaluation Results:")
     print("==================")
 
-    for metric_name, metric_values in results.items():  # Correct iteration
+    for metric_name, metric_values in metrics.items():  # Correct iteration
         for k, value in metric_values.items():
             print(f"\nK = {k}:")
             if metric_name == 'recall_at_k':
@@ -85,5 +229,8 @@ def main():
             elif metric_name == 'map_at_k':
                 print(f"  MAP@K: {value:.4f}")
 
+    with open(args.output, 'w') as f:
+        json.dump(metrics, f, indent=2)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
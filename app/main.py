@@ -1,7 +1,12 @@
 import streamlit as st
 import requests
-import json
-from typing import Optional
+
+from api_client import (
+    RecommendationError,
+    cached_recommendations,
+    remember_recommendations,
+    stream_recommendations
+)
 
 # Configure the page
 st.set_page_config(
@@ -42,51 +47,77 @@ with st.form("recommendation_form"):
     
     submit_button = st.form_submit_button("Get Recommendations")
 
-# Process the form submission
-if submit_button and query:
-    try:
-        # Prepare the request
-        payload = {
-            "query": query,
-            "min_duration": min_duration,
-            "max_duration": max_duration
-        }
+def render_assessment(idx: int, assessment: dict):
+    with st.expander(f"{idx}. {assessment['assessment_name']}", expanded=True):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            duration = "unknown" if assessment.get("duration") is None else f"{assessment['duration']} minutes"
+            st.markdown(f"**Duration:** {duration}")
+            st.markdown(f"**Test Type:** {assessment['test_type']}")
+        
+        with col2:
+            st.markdown(f"**Remote Testing:** {'✅' if assessment['remote_testing'] else '❌'}")
+            st.markdown(f"**Adaptive/IRT:** {'✅' if assessment['adaptive_irt'] else '❌'}")
         
-        # Show loading spinner
-        with st.spinner("Analyzing your requirements..."):
-            # Make API request
-            response = requests.post(
-                "http://localhost:8000/api/recommend",
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Display recommendations
-                st.subheader("Recommended Assessments")
-                
-                for idx, assessment in enumerate(data["recommendations"], 1):
-                    with st.expander(f"{idx}. {assessment['assessment_name']}", expanded=True):
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown(f"**Duration:** {assessment['duration']} minutes")
-                            st.markdown(f"**Test Type:** {assessment['test_type']}")
-                        
-                        with col2:
-                            st.markdown(f"**Remote Testing:** {'✅' if assessment['remote_testing'] else '❌'}")
-                            st.markdown(f"**Adaptive/IRT:** {'✅' if assessment['adaptive_irt'] else '❌'}")
-                        
-                        st.markdown(f"[View Assessment Details]https://www.shl.com/solutions/products/product-catalog/")
-                
+        st.markdown(f"[View Assessment Details]({assessment['url']})")
+
+def show_recommendations(query: str, min_duration: int, max_duration: int):
+    """Render recommendations, from the shared result cache or streamed from the API as they arrive."""
+    result = cached_recommendations(query, min_duration, max_duration)
+    if result is not None:
+        if result["recommendations"]:
+            st.subheader("Recommended Assessments")
+            for idx, assessment in enumerate(result["recommendations"], 1):
+                render_assessment(idx, assessment)
+        else:
+            st.warning("No assessments matched your requirements.")
+        if result["query_analysis"] is not None:
+            st.subheader("Query Analysis")
+            st.json(result["query_analysis"])
+        return
+
+    # Show loading spinner until the first recommendation arrives
+    status = st.empty()
+    status.info("Analyzing your requirements...")
+    results = st.container()
+    recommendations, analysis, done = [], None, False
+    try:
+        for event, data in stream_recommendations(query, min_duration, max_duration):
+            if event == "assessment":
+                recommendations.append(data)
+                status.empty()
+                with results:
+                    if len(recommendations) == 1:
+                        st.subheader("Recommended Assessments")
+                    render_assessment(len(recommendations), data)
+            elif event == "analysis":
                 # Display query analysis
+                analysis = data
                 st.subheader("Query Analysis")
-                st.json(data["query_analysis"])
-                
-            else:
-                st.error("Failed to get recommendations. Please try again.")
-                
+                st.json(data)
+            elif event == "done":
+                done = True
+            elif event == "error":
+                raise RecommendationError(data)
+    finally:
+        status.empty()
+    if not done:
+        # The stream was cut off without an error event; show what arrived, but do not cache it
+        st.warning("The response ended early, so these results may be incomplete. Please try again.")
+        return
+    if not recommendations:
+        st.warning("No assessments matched your requirements.")
+    # Only complete results are cached, so a failed stream is retried on the next submit
+    remember_recommendations(query, min_duration, max_duration,
+                             {"recommendations": recommendations, "query_analysis": analysis})
+
+# Process the form submission
+if submit_button and query:
+    try:
+        show_recommendations(query, min_duration, max_duration)
+    except (requests.RequestException, RecommendationError):
+        st.error("Failed to get recommendations. Please try again.")
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
 
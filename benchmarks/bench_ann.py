@@ -0,0 +1,151 @@
+"""
+Recall vs latency of the nearest-neighbour backends against exact search.
+
+Builds a synthetic catalog of --items assessments by recombining the bundled
+catalog's records and vocabulary, embeds it with the catalog's LSA model and
+runs job-description queries (app/test_queries.json plus recombinations of
+its sentences) through every backend. Reports recall@k against the exact
+top k, mean and p95 query latency, build time and load time from disk.
+
+    python -m benchmarks.bench_ann --items 100000 --nprobe 1 4 8 16 32
+"""
+import argparse
+import json
+import platform
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from api.ann import BACKENDS, ExactIndex, IVFIndex, build_index, load_index
+from api.catalog import DEFAULT_CATALOG_PATH, AssessmentCatalog, tokenize
+from benchmarks.bench_api import DEFAULT_QUERIES_PATH, load_queries
+
+DEFAULT_OUTPUT = "bench_ann_results.json"
+
+
+def synthetic_records(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Catalog records made by mixing the bundled records' names and description words.
+    """
+    with open(DEFAULT_CATALOG_PATH, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    rng = random.Random(seed)
+    words = sorted({tok for rec in base for tok in tokenize(rec.get("description", "") + " " + rec["assessment_name"])})
+    records = []
+    for i in range(count):
+        first, second = rng.sample(base, 2)
+        record = dict(first)
+        record["assessment_name"] = f"{first['assessment_name']} {second['assessment_name'].split()[0]} {i}"
+        record["description"] = " ".join([first.get("description", "")] + rng.sample(words, min(8, len(words))))
+        records.append(record)
+    return records
+
+
+def workload(queries: List[str], count: int, seed: int = 0) -> List[str]:
+    """
+    The given queries plus new ones made by joining sentences and word spans of them.
+    """
+    rng = random.Random(seed)
+    generated = list(queries)
+    while len(generated) < count:
+        parts = [" ".join(q.split()[rng.randrange(3):]) for q in rng.sample(queries, min(2, len(queries)))]
+        generated.append(" and ".join(parts))
+    return generated[:count]
+
+
+def time_queries(index, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    latencies = []
+    ids = []
+    for query in queries:
+        started = time.perf_counter()
+        row_ids, _ = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        ids.append(row_ids[0])
+    latencies_ms = np.array(latencies) * 1000
+    return {"ids": ids, "mean_ms": round(float(latencies_ms.mean()), 4),
+            "p95_ms": round(float(np.percentile(latencies_ms, 95)), 4)}
+
+
+def recall(found: List[np.ndarray], truth: List[np.ndarray]) -> float:
+    return float(np.mean([len(set(f[f >= 0]) & set(t[t >= 0])) / max(1, int((t >= 0).sum()))
+                          for f, t in zip(found, truth)]))
+
+
+def run(items: int, n_queries: int, k: int, nprobes: List[int], n_lists: int = 0) -> Dict[str, Any]:
+    started = time.perf_counter()
+    catalog = AssessmentCatalog(synthetic_records(items))
+    embeddings = catalog.dense.embeddings
+    print(f"Embedded {items} assessments (dim {embeddings.shape[1]}) in {time.perf_counter() - started:.1f}s")
+    queries = catalog.dense.encode(np.stack([catalog.encode_query(q) for q in
+                                             workload(load_queries(DEFAULT_QUERIES_PATH), n_queries)]))
+
+    exact = build_index(ExactIndex.backend, embeddings)
+    baseline = time_queries(exact, queries, k)
+    results: List[Dict[str, Any]] = [{"backend": "exact", "recall": 1.0, "mean_ms": baseline["mean_ms"],
+                                      "p95_ms": baseline["p95_ms"]}]
+    print(f"exact: mean {baseline['mean_ms']} ms, p95 {baseline['p95_ms']} ms")
+
+    started = time.perf_counter()
+    ivf = build_index(IVFIndex.backend, embeddings, **({"n_lists": n_lists} if n_lists else {}))
+    build_seconds = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as directory:
+        ivf.save(directory)
+        started = time.perf_counter()
+        loaded = load_index(directory)
+        load_seconds = time.perf_counter() - started
+        for nprobe in nprobes:
+            loaded.nprobe = nprobe
+            timing = time_queries(loaded, queries, k)
+            row = {"backend": "ivf", "n_lists": ivf.n_lists, "nprobe": nprobe,
+                   "recall": round(recall(timing["ids"], baseline["ids"]), 4),
+                   "mean_ms": timing["mean_ms"], "p95_ms": timing["p95_ms"],
+                   "build_s": round(build_seconds, 3), "load_s": round(load_seconds, 4)}
+            results.append(row)
+            print(f"ivf n_lists={ivf.n_lists} nprobe={nprobe}: recall@{k} {row['recall']}, "
+                  f"mean {row['mean_ms']} ms, p95 {row['p95_ms']} ms")
+        # Release the memory maps before the directory is removed
+        del loaded
+
+    for backend in ("faiss", "hnswlib"):
+        try:
+            started = time.perf_counter()
+            index = build_index(backend, embeddings)
+        except ImportError:
+            print(f"{backend}: not installed, skipped")
+            continue
+        build_seconds = time.perf_counter() - started
+        timing = time_queries(index, queries, k)
+        row = {"backend": backend, "recall": round(recall(timing["ids"], baseline["ids"]), 4),
+               "mean_ms": timing["mean_ms"], "p95_ms": timing["p95_ms"], "build_s": round(build_seconds, 3)}
+        results.append(row)
+        print(f"{backend}: recall@{k} {row['recall']}, mean {row['mean_ms']} ms, p95 {row['p95_ms']} ms")
+    return {"items": items, "queries": n_queries, "k": k, "dim": int(embeddings.shape[1]), "results": results}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ANN recall and latency against exact search")
+    parser.add_argument("--items", type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=100, help="Neighbours per query (the retrieval fusion depth)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="IVF cells scanned per query")
+    parser.add_argument("--n-lists", type=int, default=0, help="IVF cells, 0 for about sqrt(items)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON report")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = run(args.items, args.queries, args.k, args.nprobe, args.n_lists)
+    report["platform"] = {"python": platform.python_version(), "machine": platform.machine(),
+                          "backends": sorted(BACKENDS)}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {Path(args.output).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Offline latency and throughput benchmark for the recommendation API.
+
+Starts the FastAPI app under uvicorn with LLM reranking pointed at the local
+fake Gemini server (benchmarks/fake_gemini.py), drives an endpoint at fixed
+concurrency levels and saves p50/p95/p99 latency, requests per second and
+error rate per level as JSON.
+
+    python -m benchmarks.bench_api --concurrency 1 8 32 --requests 200 --latency 0.2
+
+Every request uses a distinct query and the semantic cache is disabled, so the
+numbers measure the full request path rather than cache hits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from benchmarks.fake_gemini import FakeGemini
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_QUERIES_PATH = REPO_ROOT / "app" / "test_queries.json"
+DEFAULT_OUTPUT = "bench_results.json"
+
+
+def load_queries(path: Path) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [item["query"] for item in json.load(f)]
+
+
+def start_api(port: int, gemini_endpoint: str, extra_env: Optional[Dict[str, str]] = None,
+              verbose: bool = False) -> subprocess.Popen:
+    """
+    Run the API in a uvicorn subprocess wired to the fake Gemini server.
+    """
+    env = dict(
+        os.environ,
+        GEMINI_API_KEY="benchmark",
+        GEMINI_TRANSPORT="rest",
+        GEMINI_API_ENDPOINT=gemini_endpoint,
+        LLM_RERANK="true",
+        # Similarity above 1.0 turns off near-duplicate lookups; queries are unique anyway
+        RESPONSE_CACHE_SIMILARITY="1.1",
+        RESPONSE_CACHE_PATH=""
+    )
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL
+    )
+
+
+def wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited with code {process.returncode} during startup")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API did not become healthy within {timeout}s")
+
+
+def run_level(session: requests.Session, url: str, queries: List[str], concurrency: int,
+              total_requests: int, offset: int, timeout: float) -> Dict[str, Any]:
+    """
+    Send total_requests requests with at most concurrency in flight.
+
+    Returns:
+        Latency percentiles in milliseconds, throughput, error rate and the
+        number of responses that fell back to retrieval ranking
+    """
+    def send(i: int) -> Dict[str, Any]:
+        # A distinct suffix per request keeps every request a cache miss
+        query = f"{queries[i % len(queries)]} (benchmark request {offset + i})"
+        started = time.perf_counter()
+        try:
+            response = session.post(url, json={"query": query}, timeout=timeout)
+            ok = response.status_code == 200
+            method = response.json().get("query_analysis", {}).get("method") if ok else None
+        except (requests.RequestException, ValueError):
+            ok, method = False, None
+        return {"latency": time.perf_counter() - started, "ok": ok, "method": method}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array([result["latency"] for result in results]) * 1000.0
+    errors = sum(not result["ok"] for result in results)
+    fallbacks = sum(result["ok"] and result["method"] != "llm_rerank" for result in results)
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "duration_seconds": round(elapsed, 3),
+        "requests_per_second": round(total_requests / elapsed, 2),
+        "error_rate": round(errors / total_requests, 4),
+        "llm_fallbacks": fallbacks,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 2),
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(latencies_ms.max()), 2)
+        }
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation API against a fake Gemini server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests before the first level")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake Gemini seconds per generation")
+    parser.add_argument("--endpoint", default="/api/recommend", help="API path to benchmark")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the API under test")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request in seconds")
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES_PATH, help="JSON file of test queries")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to save the JSON report")
+    parser.add_argument("--verbose", action="store_true", help="Show the API server's log output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queries = load_queries(args.queries)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    with FakeGemini(latency=args.latency) as gemini:
+        api = start_api(args.port, gemini.endpoint, verbose=args.verbose)
+        try:
+            wait_until_healthy(base_url, api)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max(args.concurrency))
+            session.mount("http://", adapter)
+            url = base_url + args.endpoint
+
+            run_level(session, url, queries, 1, args.warmup, offset=-args.warmup, timeout=args.timeout)
+            levels = []
+            offset = 0
+            for concurrency in args.concurrency:
+                level = run_level(session, url, queries, concurrency, args.requests, offset, args.timeout)
+                offset += args.requests
+                levels.append(level)
+                latency = level["latency_ms"]
+                print(f"concurrency={concurrency:<4} rps={level['requests_per_second']:<8} "
+                      f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms "
+                      f"errors={level['error_rate']:.2%} fallbacks={level['llm_fallbacks']}")
+            session.close()
+        finally:
+            api.terminate()
+            api.wait(timeout=30)
+        gemini_calls = gemini.calls
+
+    report = {
+        "endpoint": args.endpoint,
+        "fake_llm_latency_seconds": args.latency,
+        "fake_llm_calls": gemini_calls,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "levels": levels
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
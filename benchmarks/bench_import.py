@@ -0,0 +1,118 @@
+"""
+Import-time budget and time to first health response of the API.
+
+Imports api.main in fresh interpreters under `python -X importtime` and sums
+the self time of the project's own modules (api.*), which is what this
+repository controls; FastAPI, pydantic and NumPy are reported separately.
+The run fails when the median project time exceeds --budget-ms or when a
+module that must stay lazy (the Gemini SDK) is imported. It then starts the
+API under uvicorn, with LLM reranking against the local fake Gemini server,
+and measures how long after process start /api/health first answers.
+
+    python -m benchmarks.bench_import --runs 5 --budget-ms 150
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import requests
+
+from benchmarks.bench_api import REPO_ROOT, start_api
+from benchmarks.fake_gemini import FakeGemini
+
+DEFAULT_BUDGET_MS = 150.0
+DEFAULT_OUTPUT = "bench_import_results.json"
+# Modules that api.main must not import; they are loaded on first use
+LAZY_MODULES = ("google.generativeai",)
+PROJECT_PACKAGE = "api"
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """
+    Self and cumulative microseconds per module from `python -X importtime` output.
+    """
+    modules: Dict[str, Dict[str, int]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {"self": int(self_us), "cumulative": int(cumulative_us)}
+    return modules
+
+
+def measure_import(module: str = "api.main") -> Dict[str, Any]:
+    """
+    Import module in a fresh interpreter and summarise where the time went.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    modules = parse_importtime(result.stderr)
+    project_us = sum(times["self"] for name, times in modules.items()
+                     if name == PROJECT_PACKAGE or name.startswith(PROJECT_PACKAGE + "."))
+    frameworks = {name: round(modules[name]["cumulative"] / 1000, 1)
+                  for name in ("fastapi", "pydantic", "numpy") if name in modules}
+    return {"total_ms": round(modules[module]["cumulative"] / 1000, 1), "project_ms": round(project_us / 1000, 1),
+            "frameworks_ms": frameworks, "lazy_imported": [name for name in LAZY_MODULES if name in modules]}
+
+
+def time_to_health(port: int, timeout: float = 60.0) -> float:
+    """
+    Seconds from starting the API process to its first successful /api/health response.
+    """
+    with FakeGemini() as gemini:
+        started = time.perf_counter()
+        process = start_api(port, gemini.endpoint)
+        try:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"API exited with code {process.returncode} during startup")
+                try:
+                    if requests.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                        return time.perf_counter() - started
+                except requests.RequestException:
+                    time.sleep(0.005)
+            raise RuntimeError(f"API did not become healthy within {timeout}s")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def run(runs: int, port: int) -> Dict[str, Any]:
+    imports: List[Dict[str, Any]] = [measure_import() for _ in range(runs)]
+    health_ms = [time_to_health(port) * 1000 for _ in range(runs)]
+    return {
+        "runs": runs,
+        "import_total_ms": float(np.median([item["total_ms"] for item in imports])),
+        "import_project_ms": float(np.median([item["project_ms"] for item in imports])),
+        "frameworks_ms": imports[-1]["frameworks_ms"],
+        "lazy_imported": sorted({name for item in imports for name in item["lazy_imported"]}),
+        "time_to_health_ms": round(float(np.median(health_ms)), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget and startup latency of the API")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Allowed median self time of the api.* modules")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the API under test")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to save the JSON report")
+    args = parser.parse_args()
+
+    report = run(args.runs, args.port)
+    report["budget_ms"] = args.budget_ms
+    print(json.dumps(report, indent=2))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if report["lazy_imported"]:
+        sys.exit(f"api.main imported modules that must load lazily: {', '.join(report['lazy_imported'])}")
+    if report["import_project_ms"] > args.budget_ms:
+        sys.exit(f"api.* modules took {report['import_project_ms']} ms to import, over the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Deterministic local stand-in for the Gemini REST API.
+
+Serves the three calls the SDK makes with transport="rest": model listing,
+generateContent and streamGenerateContent. Every generation sleeps for a
+configurable latency and answers with the same canned JSON, so API
+benchmarks are repeatable without a key or network access.
+
+    python -m benchmarks.fake_gemini --port 8089 --latency 0.2
+
+Point the API at it with GEMINI_TRANSPORT=rest and
+GEMINI_API_ENDPOINT=http://127.0.0.1:8089.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+DEFAULT_MODELS = ("models/gemini-1.5-flash", "models/gemini-1.5-pro")
+DEFAULT_RESPONSE = {
+    "ranking": [1, 2, 3, 4, 5],
+    "query_analysis": {"skills": ["benchmark"], "method": "fake_gemini"}
+}
+
+_GENERATE_RE = re.compile(r"^/v1beta/(models/[^:/]+):(generateContent|streamGenerateContent)$")
+
+
+class FakeGemini:
+    """
+    Fake Gemini server running on a background thread.
+
+    Args:
+        port: Port to listen on, 0 picks a free one
+        latency: Seconds each generation takes
+        response: Object returned (as JSON text) by every generation
+        stream_chunks: Number of chunks a streamed reply is split into
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, response: Optional[Dict[str, Any]] = None,
+                 stream_chunks: int = 4):
+        self.latency = latency
+        self.text = json.dumps(response if response is not None else DEFAULT_RESPONSE)
+        self.stream_chunks = max(1, stream_chunks)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        """Value for GEMINI_API_ENDPOINT."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGemini":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGemini":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    @staticmethod
+    def _candidate(text: str) -> Dict[str, Any]:
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                "finishReason": "STOP", "index": 0}]}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, body: Any) -> None:
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/v1beta/models":
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                    return
+                self._send_json(200, {"models": [
+                    {"name": name, "supportedGenerationMethods": ["generateContent", "countTokens"]}
+                    for name in DEFAULT_MODELS
+                ]})
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                match = _GENERATE_RE.match(self.path.split("?")[0])
+                if match is None:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+                    return
+                with fake._lock:
+                    fake.calls += 1
+                time.sleep(fake.latency)
+                if match.group(2) == "generateContent":
+                    self._send_json(200, fake._candidate(fake.text))
+                    return
+                # REST streaming replies with one JSON array of partial responses
+                size = -(-len(fake.text) // fake.stream_chunks)
+                chunks = [fake.text[i:i + size] for i in range(0, len(fake.text), size)]
+                self._send_json(200, [fake._candidate(chunk) for chunk in chunks])
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini REST API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per generation")
+    parser.add_argument("--response", help="JSON file with the object every generation returns")
+    args = parser.parse_args()
+
+    response = None
+    if args.response:
+        with open(args.response, "r", encoding="utf-8") as f:
+            response = json.load(f)
+    server = FakeGemini(args.port, args.latency, response)
+    print(f"Fake Gemini listening on {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
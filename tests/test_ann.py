@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from api.ann import ExactIndex, IVFIndex, VectorIndex, build_index, create_index, load_index, load_or_build_index
+from api.catalog import AssessmentCatalog
+from api.retrieval import l2_normalize_rows
+
+def _clustered_vectors(n=600, dim=16, clusters=12, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    return l2_normalize_rows(centers[rng.integers(clusters, size=n)] + 0.1 * rng.standard_normal((n, dim)))
+
+def test_ivf_recall_against_exact_search():
+    """Test that IVF finds nearly all exact neighbours and all of them when every cell is probed."""
+    vectors = _clustered_vectors()
+    queries = vectors[:20]
+    exact_ids, _ = build_index("exact", vectors).search(queries, 10)
+    ivf = build_index("ivf", vectors, nprobe=4)
+    ivf_ids, _ = ivf.search(queries, 10)
+
+    overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ivf_ids, exact_ids)])
+    assert overlap >= 0.9
+    ivf.nprobe = ivf.n_lists
+    assert np.array_equal(np.sort(ivf.search(queries, 10)[0], axis=1), np.sort(exact_ids, axis=1))
+
+def test_ivf_respects_allowed_mask_and_pads():
+    """Test that filtered search only returns allowed ids and pads missing results."""
+    vectors = _clustered_vectors()
+    allowed = np.zeros((1, len(vectors)), dtype=bool)
+    allowed[0, [3, 5, 7]] = True
+    index = build_index("ivf", vectors, nprobe=1000)
+    ids, scores = index.search(vectors[:1], 5, allowed)
+
+    assert set(ids[0][:3]) == {3, 5, 7}
+    assert list(ids[0][3:]) == [-1, -1]
+    assert np.all(np.isneginf(scores[0][3:]))
+
+def test_ivf_filtered_search_falls_back_to_exact_scan():
+    """Test that a selective filter still returns k results, the same as exact search."""
+    vectors = _clustered_vectors(n=2000)
+    allowed = np.zeros((3, len(vectors)), dtype=bool)
+    allowed[:, np.random.default_rng(1).choice(len(vectors), 60, replace=False)] = True
+    queries = vectors[:3]
+    exact_ids, _ = build_index("exact", vectors).search(queries, 20, allowed)
+    ivf_ids, _ = build_index("ivf", vectors, nprobe=1).search(queries, 20, allowed)
+
+    assert np.all(ivf_ids >= 0)
+    assert np.array_equal(np.sort(ivf_ids, axis=1), np.sort(exact_ids, axis=1))
+
+def test_save_load_with_mmap_and_incremental_insert(tmp_path):
+    """Test that a saved index loads memory-mapped, answers the same, and accepts inserts afterwards."""
+    vectors = _clustered_vectors()
+    index = build_index("ivf", vectors[:500])
+    index.save(tmp_path)
+
+    loaded = load_index(tmp_path)
+    assert isinstance(loaded, IVFIndex)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert np.array_equal(loaded.search(vectors[:5], 5)[0], index.search(vectors[:5], 5)[0])
+
+    new_ids = loaded.add(vectors[500:])
+    assert list(new_ids) == list(range(500, 600))
+    assert loaded.search(vectors[550:551], 1)[0][0, 0] == 550
+
+def test_load_or_build_reuses_matching_index(tmp_path):
+    """Test that a saved index is reused for the same vectors and rebuilt when they change."""
+    vectors = _clustered_vectors()
+    load_or_build_index("ivf", vectors, tmp_path)
+    reused = load_or_build_index("ivf", vectors, tmp_path, nprobe=3)
+    assert isinstance(reused.vectors, np.memmap) and reused.nprobe == 3
+
+    rebuilt = load_or_build_index("ivf", vectors[:100], tmp_path)
+    assert len(rebuilt) == 100 and not isinstance(rebuilt.vectors, np.memmap)
+    with pytest.raises(ValueError):
+        create_index("annoy", 16)
+
+def test_backend_must_implement_the_index_interface():
+    """Test that the base index and a backend missing an abstract method cannot be instantiated."""
+    class AddOnly(VectorIndex):
+        def add(self, vectors):
+            return self._append(vectors)
+
+    with pytest.raises(TypeError):
+        VectorIndex(16)
+    with pytest.raises(TypeError):
+        AddOnly(16)
+
+def test_catalog_search_with_ann_index():
+    """Test that the catalog gives the same results through an exact ANN index as with a full scan."""
+    catalog = AssessmentCatalog.from_file()
+    expected = catalog.search("java programming streams", k=5, max_duration=20)
+    catalog.attach_ann(build_index(ExactIndex.backend, catalog.dense.embeddings))
+
+    assert catalog.search("java programming streams", k=5, max_duration=20) == expected
+    with pytest.raises(ValueError):
+        catalog.attach_ann(build_index(ExactIndex.backend, catalog.dense.embeddings[:1]))
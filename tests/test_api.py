@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import api.main
+from api.main import (
+    BatchRecommendationRequest,
+    RecommendationRequest,
+    app,
+    get_batch_recommendations,
+    get_recommendations,
+    lifespan,
+    metrics,
+    stream_recommendations
+)
+
+def run_with_app(coro_fn):
+    """Run a coroutine function inside the application lifespan."""
+    async def runner():
+        async with lifespan(app):
+            return await coro_fn()
+    return asyncio.run(runner())
+
+def test_batch_matches_single_requests_in_order():
+    """Test that a batch returns the same results as single requests, in request order."""
+    queries = ["Java developers", "Python data scientists", "Java developers", "sales representatives"]
+    requests = [RecommendationRequest(query=q, max_duration=40) for q in queries]
+
+    async def scenario():
+        batch = await get_batch_recommendations(BatchRecommendationRequest(requests=requests))
+        singles = [await get_recommendations(request) for request in requests]
+        return batch, singles
+
+    batch, singles = run_with_app(scenario)
+
+    assert len(batch.results) == len(queries)
+    for batch_result, single in zip(batch.results, singles):
+        assert batch_result.recommendations == single.recommendations
+        assert all(a.duration <= 40 for a in batch_result.recommendations)
+
+def test_batch_streams_ndjson():
+    """Test that the streaming batch mode emits one JSON line per request."""
+    requests = [RecommendationRequest(query=q) for q in ["Java developers", "personality questionnaire"]]
+
+    async def scenario():
+        response = await get_batch_recommendations(BatchRecommendationRequest(requests=requests, stream=True))
+        return [line async for line in response.body_iterator]
+
+    lines = [json.loads(line) for line in run_with_app(scenario)]
+
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert all(line["recommendations"] for line in lines)
+
+def test_stream_sends_assessment_events_then_done():
+    """Test that the SSE stream sends every assessment before the analysis and done events."""
+    async def scenario():
+        response = await stream_recommendations(RecommendationRequest(query="Java developers", max_duration=20))
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    events = [block.split("\n")[0][len("event: "):] for block in run_with_app(scenario).strip().split("\n\n")]
+
+    assert events[-2:] == ["analysis", "done"]
+    assert set(events[:-2]) == {"assessment"}
+
+def test_filters_restrict_recommendations():
+    """Test that test type and flag filters apply to every result, and unknown test types are rejected."""
+    async def scenario():
+        filtered = await get_recommendations(
+            RecommendationRequest(query="Java developers", test_types=["K"], remote_testing=True)
+        )
+        with pytest.raises(HTTPException) as error:
+            await get_recommendations(RecommendationRequest(query="Java developers", test_types=["Typing"]))
+        return filtered, error.value
+
+    filtered, error = run_with_app(scenario)
+
+    assert filtered.recommendations
+    assert all("Knowledge & Skills" in a.test_type and a.remote_testing for a in filtered.recommendations)
+    assert error.status_code == 422
+
+def test_metrics_endpoint_reports_stages_and_cache():
+    """Test that /metrics exposes stage histograms and cache counters in Prometheus format."""
+    async def scenario():
+        await get_recommendations(RecommendationRequest(query="Java developers"))
+        await get_recommendations(RecommendationRequest(query="Java developers"))
+        response = await metrics()
+        return response.body.decode()
+
+    text = run_with_app(scenario)
+
+    assert "# TYPE shl_stage_duration_seconds histogram" in text
+    assert 'shl_stage_duration_seconds_count{stage="retrieve"}' in text
+    assert 'shl_cache_hits_total{tier="memory"}' in text
+    assert "shl_llm_tokens_total" in text
+
+def test_overloaded_rerank_falls_back_or_is_rejected(monkeypatch):
+    """Test that an open Gemini circuit serves retrieval results, or 503 with Retry-After under the reject policy."""
+    async def scenario():
+        monkeypatch.setattr(api.main, "LLM_RERANK", True)
+        breaker = app.state.llm.scheduler.breaker
+        breaker.failure_threshold = 1
+        breaker.record_failure(TimeoutError())
+        fallback = await get_recommendations(RecommendationRequest(query="Java developers"))
+        monkeypatch.setattr(api.main, "OVERLOAD_POLICY", "reject")
+        with pytest.raises(HTTPException) as error:
+            await get_recommendations(RecommendationRequest(query="Python data scientists"))
+        return fallback, error.value
+
+    fallback, error = run_with_app(scenario)
+
+    assert fallback.recommendations
+    assert error.status_code == 503
+    assert int(error.headers["Retry-After"]) >= 1
+
+def test_query_without_catalog_terms_gets_no_recommendations():
+    """Test that a nonsense query is answered with an empty list rather than arbitrary assessments."""
+    response = run_with_app(lambda: get_recommendations(RecommendationRequest(query="zzzz qqqq")))
+
+    assert response.recommendations == []
@@ -0,0 +1,89 @@
+import sqlite3
+import time
+
+from api.cache import ResponseCache, cache_key
+
+RESPONSE = {"recommendations": [], "query_analysis": {"method": "retrieval"}}
+
+def test_cache_key_normalizes_query_text():
+    """Test that case and whitespace differences share a cache key."""
+    assert cache_key("Java  Developers\n", None, 40) == cache_key("java developers", None, 40)
+    assert cache_key("java developers", None, 40) != cache_key("java developers", None, 60)
+
+def test_lru_eviction_and_counters():
+    """Test that the least recently used entry is evicted and counters are updated."""
+    cache = ResponseCache(max_entries=2, similarity_threshold=2.0)
+    cache.put("java developers", None, None, RESPONSE)
+    cache.put("python developers", None, None, RESPONSE)
+    assert cache.get("java developers") == RESPONSE
+    cache.put("sql analysts", None, None, RESPONSE)
+
+    assert cache.get("python developers") is None
+    assert cache.get("java developers") == RESPONSE
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"]["memory"] == 2
+    assert stats["misses"] == 1
+
+def test_entries_expire_after_ttl():
+    """Test that expired entries are treated as misses."""
+    cache = ResponseCache(ttl=0.05)
+    cache.put("java developers", None, None, RESPONSE)
+    time.sleep(0.1)
+    assert cache.get("java developers") is None
+
+def test_near_duplicate_queries_hit_with_same_constraints():
+    """Test that a near-identical query is served only under the same duration constraints."""
+    cache = ResponseCache(similarity_threshold=0.8)
+    query = "Looking for Java developers who can collaborate effectively with business teams"
+    cache.put(query, None, 40, RESPONSE)
+
+    assert cache.get(query + " please", None, 40) == RESPONSE
+    assert cache.get(query + " please", None, 60) is None
+    assert cache.get("Hiring data scientists with Python", None, 40) is None
+    assert cache.stats()["hits"]["semantic"] == 1
+
+def test_filters_are_part_of_the_cache_key(tmp_path):
+    """Test that responses for filtered requests are only served to requests with the same filters."""
+    cache = ResponseCache(similarity_threshold=0.8, path=str(tmp_path / "responses.sqlite3"))
+    query = "Looking for Java developers who can collaborate effectively with business teams"
+    cache.put(query, None, 40, RESPONSE, {"test_types": ["Knowledge & Skills"]})
+
+    assert cache_key(query, None, 40) != cache_key(query, None, 40, {"test_types": ["Knowledge & Skills"]})
+    assert cache.get(query, None, 40) is None
+    assert cache.get(query + " please", None, 40, {"remote_testing": True}) is None
+    assert cache.get(query + " please", None, 40, {"test_types": ["Knowledge & Skills"]}) == RESPONSE
+    cache.close()
+
+    restarted = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    assert restarted.get(query, None, 40, {"test_types": ["Knowledge & Skills"]}) == RESPONSE
+    restarted.close()
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that entries persisted to SQLite are served by a new cache instance."""
+    path = str(tmp_path / "responses.sqlite3")
+    first = ResponseCache(path=path)
+    first.put("java developers", 10, 40, RESPONSE)
+    first.close()
+
+    second = ResponseCache(path=path)
+    assert second.get("Java developers", 10, 40) == RESPONSE
+    assert second.stats()["hits"]["disk"] == 1
+    assert second.get("java developers", 10, 40) == RESPONSE
+    assert second.stats()["hits"]["memory"] == 1
+    second.close()
+
+def test_disk_tier_is_shared_between_workers(tmp_path):
+    """Test that caches of two workers on one WAL database see each other's entries."""
+    path = str(tmp_path / "responses.sqlite3")
+    first = ResponseCache(path=path)
+    second = ResponseCache(path=path)
+    assert second.get("python developers", None, 30) is None
+
+    first.put("python developers", None, 30, RESPONSE)
+    assert second.get("Python developers", None, 30) == RESPONSE
+    assert second.stats()["hits"]["disk"] == 1
+    first.close()
+    second.close()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
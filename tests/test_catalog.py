@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from api.ann import build_index
+from api.catalog import AssessmentCatalog, split_test_types, tokenize
+
+RECORDS = [
+    {
+        "assessment_name": "Java 8 (New)",
+        "url": "https://example.com/java-8/",
+        "remote_testing": True,
+        "adaptive_irt": False,
+        "duration": 18,
+        "test_type": "Knowledge & Skills",
+        "description": "Java programming with lambdas and streams."
+    },
+    {
+        "assessment_name": "Verify - Numerical Ability",
+        "url": "https://example.com/numerical/",
+        "remote_testing": True,
+        "adaptive_irt": True,
+        "duration": 20,
+        "test_type": "Ability & Aptitude",
+        "description": "Numerical reasoning with charts and tables."
+    },
+    {
+        "assessment_name": "Occupational Personality Questionnaire OPQ32r",
+        "url": "https://example.com/opq/",
+        "remote_testing": True,
+        "adaptive_irt": False,
+        "duration": 25,
+        "test_type": "Personality & Behaviour",
+        "description": "Workplace behaviours such as teamwork and leadership."
+    }
+]
+
+def test_tokenize_keeps_language_symbols():
+    """Test that tokens such as C++ and C# survive tokenization."""
+    assert tokenize("Hiring C++ and C# developers") == ["hiring", "c++", "c#", "developers"]
+
+def test_search_ranks_matching_assessment_first():
+    """Test that the best lexical match is ranked first."""
+    catalog = AssessmentCatalog(RECORDS)
+    hits = catalog.search("Looking for Java developers", k=2)
+
+    assert len(hits) == 2
+    assert catalog.records[hits[0][0]]["assessment_name"] == "Java 8 (New)"
+    assert hits[0][1] > hits[1][1]
+
+def test_search_applies_duration_constraints():
+    """Test that assessments outside the duration bounds are never returned."""
+    catalog = AssessmentCatalog(RECORDS)
+    hits = catalog.search("numerical reasoning teamwork java", k=10, min_duration=19, max_duration=24)
+
+    assert [catalog.records[idx]["assessment_name"] for idx, _ in hits] == ["Verify - Numerical Ability"]
+
+def test_query_without_catalog_terms_has_no_results():
+    """Test that a query sharing no term with the catalog returns nothing, with or without an ANN index."""
+    catalog = AssessmentCatalog.from_file()
+    assert catalog.search("zzzz qqqq") == []
+    assert catalog.search("") == []
+    assert catalog.search_batch(["zzzz qqqq", "java"])[1]
+
+    catalog.attach_ann(build_index("exact", catalog.dense.embeddings))
+    assert catalog.search("zzzz qqqq") == []
+
+def test_candidate_mask_combines_filter_indexes():
+    """Test that duration, test type and flag filters combine into one candidate mask."""
+    catalog = AssessmentCatalog(RECORDS)
+
+    assert catalog.candidate_mask() is None
+    assert list(catalog.duration_rows(18, 20)) == [0, 1]
+    assert catalog.candidate_mask(test_types=["K", "personality & behaviour"]).tolist() == [True, False, True]
+    assert catalog.candidate_mask(max_duration=20, adaptive_irt=False).tolist() == [True, False, False]
+    assert not catalog.candidate_mask(remote_testing=False).any()
+    with pytest.raises(ValueError):
+        catalog.candidate_mask(test_types=["Typing"])
+
+def test_candidate_rows_read_bits_only_for_the_duration_range():
+    """Test that candidate rows agree with a brute-force check for every filter combination."""
+    catalog = AssessmentCatalog.from_file()
+    records = catalog.records
+    for min_duration, max_duration in [(None, None), (None, 20), (15, 40)]:
+        for test_types in [None, ["K"], ["K", "P"]]:
+            for remote in [None, True, False]:
+                rows = catalog.candidate_rows(min_duration, max_duration, test_types, remote)
+                names = {catalog.resolve_test_type(name) for name in test_types or []}
+                expected = [
+                    i for i, rec in enumerate(records)
+                    if (min_duration is None or (rec["duration"] is not None and rec["duration"] >= min_duration))
+                    and (max_duration is None or (rec["duration"] is not None and rec["duration"] <= max_duration))
+                    and (not names or names & set(split_test_types(rec["test_type"])))
+                    and (remote is None or rec["remote_testing"] == remote)
+                ]
+                if rows is None:
+                    assert (min_duration, max_duration, test_types, remote) == (None, None, None, None)
+                else:
+                    assert rows.tolist() == expected
+
+def test_search_batch_applies_per_query_candidates():
+    """Test that each query in a batch is restricted to its own candidates."""
+    catalog = AssessmentCatalog(RECORDS)
+    ability = catalog.candidate_rows(test_types=["A"])
+    hits = catalog.search_batch(["java programming", "java programming"], k=3, candidates=[None, ability])
+
+    assert catalog.records[hits[0][0][0]]["assessment_name"] == "Java 8 (New)"
+    assert [idx for idx, _ in hits[1]] == [1]
+    assert catalog.search("java", candidates=np.zeros(0, dtype=np.int64)) == []
+
+def test_saved_index_is_memory_mapped_and_searches_the_same(tmp_path):
+    """Test that a catalog loaded from a saved index maps its arrays read-only and answers like the original."""
+    catalog = AssessmentCatalog(RECORDS)
+    loaded = AssessmentCatalog.from_index(catalog.save_index(tmp_path))
+
+    assert isinstance(loaded.dense.embeddings, np.memmap) and isinstance(loaded.bm25.postings.data, np.memmap)
+    assert not loaded.tfidf.data.flags.writeable
+    assert loaded.dense.version == catalog.dense.version
+    assert loaded.search("java programming", k=3) == catalog.search("java programming", k=3)
+    mask = loaded.candidate_mask(max_duration=20, test_types=["K"], remote_testing=True)
+    assert mask.tolist() == catalog.candidate_mask(max_duration=20, test_types=["K"], remote_testing=True).tolist()
+    assert loaded.find_by_name("java 8 (new)") == 0
+    assert loaded.assessment_summary(0) == catalog.assessment_summary(0)
+
+def test_bundled_catalog_loads():
+    """Test that the bundled catalog has every public assessment field."""
+    catalog = AssessmentCatalog.from_file()
+    assert len(catalog) > 0
+    assert set(catalog.assessment(0)) == {
+        "assessment_name", "url", "remote_testing", "adaptive_irt", "duration", "test_type"
+    }
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from api.catalog import AssessmentCatalog
+from api.embeddings import KEYS_NAME, EmbeddingStore
+
+def _embed(texts):
+    return np.array([[len(text), text.count("a")] for text in texts], dtype=np.float32)
+
+def test_store_embeds_only_misses_and_persists(tmp_path):
+    """Test that only missing texts are embedded, and stored vectors are served after reopening."""
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return _embed(texts)
+
+    store = EmbeddingStore(tmp_path, "model-1")
+    first = store.embed(["java", "Data  Science"], embed)
+    second = store.embed(["data science", "sales"], embed)
+
+    assert calls == [["java", "Data  Science"], ["sales"]]
+    assert np.array_equal(second[0], first[1])
+
+    reopened = EmbeddingStore(tmp_path, "model-1")
+    vectors, missing = reopened.get_many(["sales", "java", "python"])
+    assert missing == [2]
+    assert np.array_equal(vectors[:2], _embed(["sales", "java"]))
+    assert EmbeddingStore(tmp_path, "model-2").get_many(["java"])[1] == [0]
+
+def test_store_recovers_from_interrupted_append(tmp_path):
+    """Test that a vector row written without its key is discarded on the next append."""
+    store = EmbeddingStore(tmp_path, "model-1")
+    store.put_many(["java"], _embed(["java"]))
+    with open(store.directory / "vectors.f32", "ab") as f:
+        f.write(np.ones(2, dtype=np.float32).tobytes())
+
+    store.put_many(["sales"], _embed(["sales"]))
+
+    reopened = EmbeddingStore(tmp_path, "model-1")
+    assert len(reopened) == 2
+    assert (store.directory / KEYS_NAME).stat().st_size == 64
+    assert np.array_equal(reopened.get_many(["sales"])[0], _embed(["sales"]))
+
+def test_store_counts_lookups_from_concurrent_threads(tmp_path):
+    """Test that hit and miss counters add up when lookups run on a thread pool."""
+    store = EmbeddingStore(tmp_path, "model-1")
+    store.put_many(["java"], _embed(["java"]))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: store.get_many(["java", "sales"]), range(2000)))
+
+    assert (store.hits, store.misses) == (2000, 2000)
+
+def test_catalog_starts_warm_from_store(tmp_path):
+    """Test that a catalog built from stored components and embeddings searches like a freshly built one."""
+    cold = AssessmentCatalog.from_file(embedding_dir=tmp_path)
+    warm = AssessmentCatalog.from_file(embedding_dir=tmp_path)
+    fresh = AssessmentCatalog.from_file()
+
+    assert warm.dense.version == fresh.dense.version
+    assert isinstance(warm.dense.components, np.memmap)
+    assert np.allclose(warm.dense.embeddings, fresh.dense.embeddings, atol=1e-6)
+    assert warm.search("java developers", k=5) == fresh.search("java developers", k=5) == cold.search("java developers", k=5)
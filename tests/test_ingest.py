@@ -0,0 +1,85 @@
+import shutil
+from pathlib import Path
+
+from api.catalog import AssessmentCatalog
+from api.ingest import ingest, parse_listing_page, parse_product_page
+from api.snapshot import SnapshotRecords, write_snapshot
+
+FIXTURES = Path(__file__).parent / "fixtures" / "shl_pages"
+
+def test_parse_listing_page_rows():
+    """Test that listing rows yield absolute URLs, flags and full test type names."""
+    items = parse_listing_page((FIXTURES / "catalog_page_1.html").read_text())
+
+    assert [item["assessment_name"] for item in items] == [
+        "Core Java (Entry Level) (New)", "Verify - Numerical Ability", "Account Manager Solution"
+    ]
+    assert items[0]["url"] == "https://www.shl.com/solutions/products/product-catalog/view/core-java-entry-level-new/"
+    assert (items[0]["remote_testing"], items[0]["adaptive_irt"]) == (True, False)
+    assert items[1]["adaptive_irt"] is True
+    assert items[2]["test_type"] == "Competencies, Personality & Behaviour"
+
+def test_parse_product_page_description_and_duration():
+    """Test that product pages yield the description, completion time and canonical URL."""
+    item = parse_product_page((FIXTURES / "products" / "verify-numerical-ability.html").read_text())
+
+    assert item["url"] == "https://www.shl.com/solutions/products/product-catalog/view/verify-numerical-ability/"
+    assert item["duration"] == 18
+    assert item["description"].startswith("Measures the ability")
+    assert parse_product_page((FIXTURES / "catalog_page_1.html").read_text()) is None
+
+def test_ingest_writes_snapshot_the_catalog_can_search(tmp_path):
+    """Test that ingested pages become a memory-mapped catalog with joined records."""
+    summary = ingest(FIXTURES, tmp_path / "snapshot")
+    catalog = AssessmentCatalog.from_snapshot(tmp_path / "snapshot")
+
+    assert summary["records"] == 3 and len(catalog) == 3
+    java = catalog.assessment(catalog.find_by_name("Core Java (Entry Level) (New)"))
+    assert java["duration"] == 13 and java["test_type"] == "Knowledge & Skills"
+    assert catalog.search("numerical data reasoning", k=1)[0][0] == catalog.find_by_name("Verify - Numerical Ability")
+    # No product page: unknown duration
+    assert catalog.assessment(catalog.find_by_name("Account Manager Solution"))["duration"] is None
+
+def test_product_page_without_duration_is_unknown_and_filtered_out(tmp_path):
+    """Test that a product page with no completion time gives an unknown duration that no bound matches."""
+    pages = tmp_path / "pages"
+    shutil.copytree(FIXTURES, pages)
+    product = pages / "products" / "core-java-entry-level-new.html"
+    product.write_text(product.read_text().replace("minutes = 13", ""))
+
+    assert "duration" not in parse_product_page(product.read_text())
+    ingest(pages, tmp_path / "snapshot")
+    catalog = AssessmentCatalog.from_snapshot(tmp_path / "snapshot")
+    java = catalog.find_by_name("Core Java (Entry Level) (New)")
+
+    assert catalog.assessment(java)["duration"] is None
+    assert java in catalog.duration_rows()
+    assert java not in catalog.duration_rows(max_duration=60)
+    assert java not in catalog.duration_rows(min_duration=0)
+    assert "duration unknown" in catalog.assessment_summary(java)
+
+def test_reingest_only_parses_changed_pages(tmp_path):
+    """Test that a second run reuses unchanged pages and picks up edits and removals."""
+    pages = tmp_path / "pages"
+    shutil.copytree(FIXTURES, pages)
+    ingest(pages, tmp_path / "snapshot")
+
+    assert ingest(pages, tmp_path / "snapshot")["pages_parsed"] == 0
+
+    product = pages / "products" / "core-java-entry-level-new.html"
+    product.write_text(product.read_text().replace("minutes = 13", "minutes = 15"))
+    (pages / "products" / "verify-numerical-ability.html").unlink()
+    summary = ingest(pages, tmp_path / "snapshot")
+
+    assert (summary["pages_parsed"], summary["pages_reused"], summary["pages_removed"]) == (1, 1, 1)
+    records = SnapshotRecords(tmp_path / "snapshot")
+    assert records[0]["duration"] == 15
+    assert records[1]["description"] == ""
+
+def test_snapshot_round_trips_catalog_records(tmp_path):
+    """Test that the columnar snapshot reproduces the seed catalog exactly."""
+    seed = AssessmentCatalog.from_file()
+    write_snapshot(seed.records, tmp_path)
+
+    assert list(SnapshotRecords(tmp_path)) == seed.records
+    assert AssessmentCatalog.from_snapshot(tmp_path).search("java developer", k=5) == seed.search("java developer", k=5)
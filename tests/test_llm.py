@@ -0,0 +1,143 @@
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from api import llm
+from api.llm import GeminiClient
+from benchmarks.fake_gemini import FakeGemini
+
+def _fake_models(names):
+    return [SimpleNamespace(name=name, supported_generation_methods=["generateContent"]) for name in names]
+
+def test_model_discovery_is_cached(monkeypatch):
+    """Test that list_models is called once per TTL window, not once per request."""
+    calls = []
+
+    def list_models():
+        calls.append(1)
+        return _fake_models(["models/gemini-1.5-flash", "models/gemini-pro"])
+
+    monkeypatch.setattr(llm.genai, "list_models", list_models)
+    client = GeminiClient(api_key="test", discovery_ttl=60)
+
+    for _ in range(5):
+        client.model()
+
+    assert len(calls) == 1
+    assert client.model() is client.model()
+    assert client.status()["model"] == "models/gemini-1.5-flash"
+
+def test_falls_back_when_preferred_model_is_missing(monkeypatch):
+    """Test that another flash model is chosen when the preferred one is unavailable."""
+    monkeypatch.setattr(llm.genai, "list_models", lambda: _fake_models(["models/gemini-pro", "models/gemini-2.0-flash"]))
+    client = GeminiClient(api_key="test", preferred_model="models/gemini-1.5-flash")
+
+    assert client.refresh() == "models/gemini-2.0-flash"
+
+def test_discovery_failure_keeps_preferred_model(monkeypatch):
+    """Test that a failing discovery call does not break generation."""
+    def list_models():
+        raise RuntimeError("network down")
+
+    monkeypatch.setattr(llm.genai, "list_models", list_models)
+    client = GeminiClient(api_key="test")
+
+    assert client.refresh() == "models/gemini-1.5-flash"
+
+def test_async_generation_is_bounded_and_times_out(monkeypatch):
+    """Test that concurrent calls respect the concurrency limit and the per-call timeout."""
+    import asyncio
+    import threading
+    import time
+
+    client = GeminiClient(api_key="test", max_concurrency=2, timeout=0.2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_generate(prompt, **kwargs):
+        with lock:
+            active.append(prompt)
+            peak.append(len(active))
+        time.sleep(0.5 if prompt == "slow" else 0.05)
+        with lock:
+            active.remove(prompt)
+        return SimpleNamespace(text=prompt)
+
+    monkeypatch.setattr(client, "generate_content", slow_generate)
+
+    async def run():
+        results = await asyncio.gather(
+            *(client.generate_content_async(f"p{i}") for i in range(6)),
+            client.generate_content_async("slow"),
+            return_exceptions=True
+        )
+        return results
+
+    results = asyncio.run(run())
+    client.close()
+
+    assert [r.text for r in results[:6]] == [f"p{i}" for i in range(6)]
+    assert isinstance(results[6], asyncio.TimeoutError)
+    assert max(peak) <= 2
+
+def test_record_usage_estimates_without_metadata():
+    """Test that token usage is estimated and accumulated when the SDK reports none."""
+    client = GeminiClient(api_key="test")
+    usage = client.record_usage("x" * 40, SimpleNamespace(text="y" * 10))
+
+    assert usage == {"prompt_tokens": 10, "completion_tokens": 3, "estimated": True}
+    client.record_usage("p", text="c")
+    assert client.status()["token_usage"] == {
+        "calls": 2, "prompt_tokens": 11, "completion_tokens": 4, "prompt_bytes": 41, "completion_bytes": 11
+    }
+
+
+def test_rest_client_against_fake_gemini():
+    """Test that the client talks to a local Gemini stand-in through GEMINI_API_ENDPOINT."""
+    with FakeGemini(latency=0.0, response={"ranking": [2, 1], "query_analysis": {}}) as fake:
+        client = GeminiClient("fake-key", transport="rest", api_endpoint=fake.endpoint)
+        try:
+            assert client.refresh() == "models/gemini-1.5-flash"
+            assert client.generate_content("prompt", json_output=True).text == '{"ranking": [2, 1], "query_analysis": {}}'
+            streamed = "".join(chunk.text for chunk in client.model().generate_content("prompt", stream=True))
+            assert streamed == '{"ranking": [2, 1], "query_analysis": {}}'
+            assert fake.calls == 2
+        finally:
+            client.close()
+
+
+def test_gemini_sdk_is_imported_on_first_use():
+    """Test that importing the API and creating a client leave the Gemini SDK unimported."""
+    code = ("import sys; import api.main; from api.llm import GeminiClient; client = GeminiClient('key'); "
+            "print('google.generativeai' in sys.modules, client.status()['connected'])")
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False"]
+
+def test_timed_out_call_holds_its_slot_until_the_thread_returns(monkeypatch):
+    """Test that a call admitted after a timeout waits for the hung thread instead of timing out behind it."""
+    import asyncio
+    import time
+
+    client = GeminiClient(api_key="test", max_concurrency=1, timeout=0.2)
+
+    def generate(prompt, **kwargs):
+        time.sleep(0.4 if prompt == "hung" else 0.01)
+        return SimpleNamespace(text=prompt)
+
+    monkeypatch.setattr(client, "generate_content", generate)
+
+    async def run():
+        hung = asyncio.create_task(client.generate_content_async("hung"))
+        await asyncio.sleep(0.01)
+        results = await asyncio.gather(hung, client.generate_content_async("next"), return_exceptions=True)
+        return results, client.status()["in_flight"]
+
+    (hung, following), in_flight = asyncio.run(run())
+    client.close()
+
+    assert isinstance(hung, asyncio.TimeoutError)
+    assert following.text == "next"
+    assert in_flight == 0
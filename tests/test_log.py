@@ -0,0 +1,61 @@
+import json
+import logging
+import subprocess
+import sys
+from pathlib import Path
+
+from api.log import JsonFormatter, PayloadLogger, truncate
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+def make_logger(level):
+    logger = logging.getLogger(f"test_log.{level}")
+    logger.propagate = False
+    logger.handlers = [ListHandler()]
+    logger.setLevel(level)
+    return logger, logger.handlers[0].records
+
+def test_payload_is_skipped_at_info_without_sampling():
+    """Test that full payloads are not logged at INFO unless sampled."""
+    logger, records = make_logger(logging.INFO)
+    PayloadLogger(logger, sample_rate=0.0).log("Response", "x" * 5000)
+    assert records == []
+
+    PayloadLogger(logger, sample_rate=1.0).log("Response", "x" * 5000)
+    assert len(records) == 1 and records[0].levelno == logging.INFO
+    assert records[0].payload_chars == 5000
+
+def test_payload_is_logged_in_full_at_debug():
+    """Test that DEBUG logging keeps the whole payload."""
+    logger, records = make_logger(logging.DEBUG)
+    PayloadLogger(logger).log("Response", "y" * 5000)
+    assert records[0].getMessage() == "Response: " + "y" * 5000
+
+def test_error_payload_is_truncated():
+    """Test that error logs carry a truncated payload and its full length."""
+    logger, records = make_logger(logging.INFO)
+    PayloadLogger(logger, max_chars=10).error("Unparsable reply", "z" * 100)
+
+    assert records[0].getMessage() == "Unparsable reply: " + "z" * 10 + "... [90 more chars]"
+    assert truncate("short", 10) == "short"
+
+def test_json_formatter_includes_extra_fields():
+    """Test that structured fields passed as extra appear in the JSON line."""
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO", "name": "api", "payload_chars": 42})
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello"
+    assert entry["payload_chars"] == 42
+
+def test_importing_the_app_keeps_root_handlers():
+    """Test that importing api.main leaves logging alone until the app starts."""
+    code = ("import logging; handler = logging.StreamHandler(); logging.getLogger().handlers = [handler]; "
+            "import api.main; print(logging.getLogger().handlers == [handler])")
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "True"
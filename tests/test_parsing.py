@@ -0,0 +1,84 @@
+import json
+
+from pydantic import BaseModel
+
+from api.parsing import JsonArrayStreamParser, extract_array, extract_json_object, validate_items
+
+DOCUMENT = json.dumps({
+    "recommendations": [
+        {"assessment_name": "Java 8 (New)", "tags": ["a", "}"]},
+        {"assessment_name": "Say \"hi\" {x}"}
+    ],
+    "query_analysis": {"recommendations": [{"assessment_name": "ignored"}]}
+})
+
+def test_stream_parser_yields_objects_as_they_complete():
+    """Test that each recommendation is returned as soon as its closing brace arrives."""
+    parser = JsonArrayStreamParser("recommendations")
+    seen = []
+    for i in range(0, len(DOCUMENT), 7):
+        seen.extend(item["assessment_name"] for item in parser.feed(DOCUMENT[i:i + 7]))
+        if i + 7 < DOCUMENT.index('"query_analysis"'):
+            assert len(seen) <= 2
+
+    assert seen == ["Java 8 (New)", 'Say "hi" {x}']
+    assert parser.text == DOCUMENT
+
+def test_stream_parser_ignores_markdown_fences():
+    """Test that a fenced JSON document is parsed the same way."""
+    parser = JsonArrayStreamParser("recommendations")
+    items = parser.feed("```json\n" + DOCUMENT + "\n```")
+    assert len(items) == 2
+
+def test_extract_json_object_skips_prose_and_repairs_defects():
+    """Test that stray prose, comments, trailing commas and Python literals are tolerated."""
+    text = (
+        'Sure! Here is the "JSON" you asked for:\n```json\n'
+        "{'recommendations': [{'assessment_name': 'Java 8 (New)', 'remote_testing': True,},],"
+        ' // the analysis\n "query_analysis": {"skills": ["java"], "level": None}}\n```\nHope this helps!'
+    )
+    assert extract_json_object(text) == {
+        "recommendations": [{"assessment_name": "Java 8 (New)", "remote_testing": True}],
+        "query_analysis": {"skills": ["java"], "level": None}
+    }
+
+def test_extract_json_object_closes_truncated_output():
+    """Test that a generation cut off mid-object is closed instead of discarded."""
+    text = '{"recommendations": [{"assessment_name": "A"}, {"assessment_name": "B", "durat'
+    assert extract_json_object(text) == {"recommendations": [{"assessment_name": "A"}, {"assessment_name": "B"}]}
+
+def test_extract_array_recovers_items_from_broken_document():
+    """Test that complete items survive a defect elsewhere in the document."""
+    text = '{"recommendations": [{"assessment_name": "A"} {"assessment_name": "B"}], "query_analysis": {}}'
+    items, document = extract_array(text, "recommendations")
+    assert [item["assessment_name"] for item in items] == ["A", "B"]
+    assert document is None
+
+def test_stream_parser_yields_scalar_items():
+    """Test that numbers and strings in the target array are returned once they are terminated."""
+    document = '{"ranking": [3, 12, "7"], "query_analysis": {"ranking": [9]}}'
+    parser = JsonArrayStreamParser("ranking")
+
+    assert parser.feed(document[:document.index("12") + 1]) == [3]
+    assert parser.feed(document[document.index("12") + 1:]) == [12, "7"]
+
+def test_stream_parser_matches_the_array_key_only_in_key_position():
+    """Test that a string value equal to the array key does not select the next array."""
+    parser = JsonArrayStreamParser("ranking")
+    assert parser.feed('{"note": "ranking", [9], "ranking": [3]}') == [3]
+
+def test_stream_parser_reads_single_quoted_strings():
+    """Test that single-quoted keys and items are parsed, and quotes of the other kind stay in the string."""
+    parser = JsonArrayStreamParser("recommendations")
+    items = parser.feed("{'recommendations': [{'assessment_name': 'Say \"hi\"'}, 'Java', \"it's\"]}")
+    assert items == [{"assessment_name": 'Say "hi"'}, "Java", "it's"]
+
+def test_validate_items_drops_invalid_entries():
+    """Test that invalid items are dropped one by one instead of failing the batch."""
+    class Item(BaseModel):
+        name: str
+        duration: int
+
+    valid = validate_items([{"name": "a", "duration": "10"}, {"name": "b"}, "junk", {"name": "c", "duration": 5}], Item)
+    assert [(item.name, item.duration) for item in valid] == [("a", 10), ("c", 5)]
+    assert validate_items([1, "2", "x", None, 3.0], int) == [1, 2, 3]
@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from api.prompts import PromptTemplate, duration_constraint, schema_outline
+
+class Item(BaseModel):
+    name: str
+    minutes: Optional[int] = None
+
+class Reply(BaseModel):
+    items: List[Item]
+    notes: dict
+
+def test_schema_outline_follows_model_fields():
+    """Test that the outline mirrors the model structure and field order."""
+    assert schema_outline(Reply) == {"items": [{"name": "string", "minutes": "integer"}], "notes": "object"}
+
+def test_duration_constraint_omits_missing_bounds():
+    """Test that missing bounds never render as 'None minutes'."""
+    assert duration_constraint(None, None) is None
+    assert duration_constraint(None, 40) == "Duration: at most 40 minutes"
+    assert duration_constraint(10, None) == "Duration: at least 10 minutes"
+    assert duration_constraint(10, 40) == "Duration: 10-40 minutes"
+
+def test_template_skips_empty_sections():
+    """Test that empty sections add nothing to the rendered prompt."""
+    template = PromptTemplate("Pick items.", schema_outline(Reply))
+    prompt = template.render("Query: java", None, "", "Candidates:\nA")
+
+    assert prompt.startswith(template.header)
+    assert prompt.endswith("Query: java\nCandidates:\nA")
+    assert "None" not in prompt
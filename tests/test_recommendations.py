@@ -1,5 +1,14 @@
+import numpy as np
 import pytest
-from utils.metrics import evaluate_recommendations
+from utils.metrics import (
+    average_precision_at_k,
+    calculate_precision_at_k,
+    calculate_recall_at_k,
+    evaluate_rankings,
+    evaluate_recommendations,
+    hit_matrix,
+    ranking_metrics
+)
 
 # Sample test cases
 TEST_QUERIES = [
@@ -22,14 +31,13 @@ TEST_QUERIES = [
         "relevant_items": [
             "python-programming-test",
             "sql-skills-assessment",
-            "javascript-test",
-            "full-stack-assessment"
+            "javascript-test"
         ],
         "recommended_items": [
-            "full-stack-assessment",
             "python-programming-test",
             "sql-skills-assessment",
             "javascript-test",
+            "full-stack-assessment",
             "web-development-test"
         ]
     },
@@ -84,4 +92,53 @@ def test_partial_relevance():
     
     # Only one relevant item in top 3
     assert metrics["recall@3"] == 1/3
-    assert metrics["map@3"] < 1.0 
\ No newline at end of file
+    assert metrics["map@3"] < 1.0 
+
+def test_ranking_metrics_all_k_in_one_pass():
+    """Test that the vectorized engine matches hand-computed values at every K."""
+    metrics = evaluate_rankings(
+        [["a", "x", "b", "y"], ["x", "y", "z"]],
+        [["a", "b"], ["c"]],
+        k_values=[1, 3, 4]
+    )
+
+    assert metrics["recall"] == {1: 0.25, 3: 0.5, 4: 0.5}
+    assert metrics["precision"][3] == pytest.approx((2 / 3) / 2)
+    # AP@3 of the first query: (1/1 + 2/3) / 2 relevant items
+    assert metrics["map"][3] == pytest.approx((1 + 2 / 3) / 2 / 2)
+    assert metrics["mrr"] == {1: 0.5, 3: 0.5, 4: 0.5}
+    ideal = 1 + 1 / np.log2(3)
+    assert metrics["ndcg"][3] == pytest.approx((1 + 1 / np.log2(4)) / ideal / 2)
+
+def test_ranking_metrics_matches_scalar_functions():
+    """Test that per-query recall and precision agree with the scalar helpers."""
+    rng = np.random.default_rng(0)
+    items = [f"item{i}" for i in range(20)]
+    recommended = [list(rng.permutation(items)[:8]) for _ in range(50)]
+    relevant = [list(rng.choice(items, size=rng.integers(0, 5), replace=False)) for _ in range(50)]
+
+    hits, n_relevant = hit_matrix(recommended, relevant, 5)
+    per_query = ranking_metrics(hits, n_relevant, [5])
+
+    for row in range(50):
+        assert per_query["recall"][5][row] == pytest.approx(calculate_recall_at_k(relevant[row], recommended[row], 5))
+        assert per_query["precision"][5][row] == pytest.approx(calculate_precision_at_k(relevant[row], recommended[row], 5))
+
+def test_ranking_metrics_rejects_non_positive_k():
+    """Test that K below 1 is rejected."""
+    with pytest.raises(ValueError):
+        evaluate_rankings([["a"]], [["a"]], k_values=[0])
+
+@pytest.mark.parametrize("ap_normalization", ["min_k", "relevant"])
+def test_average_precision_normalization(ap_normalization):
+    """Test that scalar and vectorized AP agree for each normalization."""
+    recommended = [["a", "x", "b"], [{"assessment_name": "c"}, "y", "z"], ["x", "y", "z"]]
+    relevant = [["a", "b", "c", "d"], ["c"], []]
+
+    expected = [average_precision_at_k(rec, rel, 3, ap_normalization) for rec, rel in zip(recommended, relevant)]
+    metrics = evaluate_rankings(recommended, relevant, [3], ap_normalization)
+
+    divisor = 3 if ap_normalization == "min_k" else 4
+    assert expected[0] == pytest.approx((1 + 2 / 3) / divisor)
+    assert expected[1] == 1.0
+    assert metrics["map"][3] == pytest.approx(np.mean(expected))
@@ -0,0 +1,58 @@
+import math
+
+import numpy as np
+
+from api.retrieval import BM25Index, CsrMatrix, DenseIndex, reciprocal_rank_fusion, sparse_tfidf, top_ranked
+
+DOCUMENTS = [[0, 1, 1, 2], [2, 3], [3, 4, 4, 4, 0], [5]]
+
+def _to_dense(matrix: CsrMatrix) -> np.ndarray:
+    dense = np.zeros(matrix.shape, dtype=np.float32)
+    rows = matrix.row_ids()
+    dense[rows, matrix.indices] = matrix.data
+    return dense
+
+def test_csr_products_match_dense():
+    """Test that CSR transpose and sparse-dense products agree with dense arithmetic, including empty rows."""
+    matrix = CsrMatrix.from_rows([{0: 1.0, 3: 2.0}, {}, {1: -1.0, 2: 0.5, 3: 1.0}], 4)
+    other = np.arange(8, dtype=np.float32).reshape(4, 2)
+
+    assert np.allclose(matrix.dot(other), _to_dense(matrix) @ other)
+    assert np.allclose(matrix.dot(other, chunk_size=2), _to_dense(matrix) @ other)
+    assert np.allclose(_to_dense(matrix.transpose()), _to_dense(matrix).T)
+
+def test_bm25_matches_reference_formula():
+    """Test that inverted-index BM25 scores equal the textbook Okapi BM25 formula."""
+    index = BM25Index(DOCUMENTS, 6)
+    query = [0, 4, 4]
+    avg_length = sum(map(len, DOCUMENTS)) / len(DOCUMENTS)
+
+    def reference(doc):
+        score = 0.0
+        for term in query:
+            df = sum(term in other for other in DOCUMENTS)
+            idf = math.log(1 + (len(DOCUMENTS) - df + 0.5) / (df + 0.5))
+            tf = doc.count(term)
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(doc) / avg_length))
+        return score
+
+    assert np.allclose(index.scores(query), [reference(doc) for doc in DOCUMENTS], atol=1e-5)
+    assert not index.scores([]).any()
+
+def test_dense_index_recovers_leading_singular_vectors():
+    """Test that the randomized LSA components span the top right singular vectors of the TF-IDF matrix."""
+    tfidf, _ = sparse_tfidf(DOCUMENTS, 6)
+    index = DenseIndex(tfidf, dim=2)
+    _, _, vt = np.linalg.svd(_to_dense(tfidf))
+
+    overlap = np.linalg.svd(index.components.T @ vt[:2].T, compute_uv=False)
+    assert np.allclose(overlap, 1.0, atol=1e-3)
+    assert np.allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, atol=1e-5)
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test that documents ranked well by both retrievers win, and unranked documents score zero."""
+    fused = reciprocal_rank_fusion([np.array([2, 0, 1]), np.array([0, 2])], size=4, k=60)
+
+    assert list(top_ranked(np.where(fused > 0, fused, -np.inf), 4)) == [0, 2, 1]
+    assert fused[3] == 0.0
+    assert math.isclose(fused[0], 1 / 62 + 1 / 61)
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from api.scheduler import CircuitBreaker, Overloaded, OutboundScheduler, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class QuotaError(Exception):
+    code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("quota exceeded")
+        self.response = SimpleNamespace(headers={"Retry-After": str(retry_after)})
+
+def test_token_bucket_refuses_waits_beyond_the_deadline():
+    """Test that the bucket hands out its burst, then reserves future tokens only up to the deadline."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, burst=2, clock=clock)
+
+    assert bucket.reserve(max_wait=1.0) == 0.0
+    assert bucket.reserve(max_wait=1.0) == 0.0
+    assert bucket.reserve(max_wait=1.0) == pytest.approx(1.0)
+    assert bucket.reserve(max_wait=1.0) is None
+
+    clock.now = 3.0
+    assert bucket.reserve(max_wait=0.0) == 0.0
+
+def test_circuit_opens_for_quota_retry_after_then_probes():
+    """Test that a quota error opens the circuit for its Retry-After, and one successful probe closes it."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=5, cooldown=10, clock=clock)
+
+    breaker.record_failure(QuotaError(retry_after=60))
+    assert breaker.state == "open"
+    with pytest.raises(Overloaded) as error:
+        breaker.acquire()
+    assert error.value.status_code == 503
+    assert error.value.retry_after_header == "60"
+
+    clock.now = 61.0
+    assert breaker.state == "half_open"
+    probe = breaker.acquire()
+    assert probe
+    with pytest.raises(Overloaded):
+        breaker.acquire()
+    breaker.record_success(probe)
+    assert breaker.state == "closed"
+    assert breaker.opened_count == 1
+
+def test_unparseable_retry_after_still_opens_circuit():
+    """Test that a quota error with a malformed Retry-After opens the circuit for the cooldown."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(cooldown=10, clock=clock)
+
+    breaker.record_failure(QuotaError(retry_after="soon"))
+
+    assert breaker.state == "open"
+    clock.now = 10.0
+    assert breaker.state == "half_open"
+
+def test_scheduler_rejects_when_queue_is_full():
+    """Test that calls beyond the concurrency limit and wait queue are rejected at once with 429."""
+    scheduler = OutboundScheduler(max_concurrency=1, max_queue=1, queue_timeout=5.0)
+    release = asyncio.Event()
+
+    async def call():
+        async with scheduler.slot():
+            await release.wait()
+
+    async def scenario():
+        running = asyncio.create_task(call())
+        waiting = asyncio.create_task(call())
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as error:
+            await call()
+        release.set()
+        await asyncio.gather(running, waiting)
+        return error.value
+
+    error = asyncio.run(scenario())
+
+    assert error.reason == "queue_full"
+    assert error.status_code == 429
+    assert scheduler.stats()["rejected"] == {"queue_full": 1}
+    assert scheduler.stats()["queued"] == 0
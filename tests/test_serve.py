@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from api.catalog import AssessmentCatalog
+from api.serve import prepare
+
+def test_prepare_saves_index_for_workers(tmp_path, monkeypatch):
+    """Test that the parent saves an index that workers load from the environment, with a shared cache file."""
+    for name in ("CATALOG_INDEX_PATH", "CATALOG_SNAPSHOT", "CATALOG_PATH", "EMBEDDING_STORE_PATH",
+                 "ANN_INDEX_PATH", "RESPONSE_CACHE_PATH"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("ANN_BACKEND", "ivf")
+    env = prepare(tmp_path)
+
+    assert env["RESPONSE_CACHE_PATH"] == str(tmp_path / "responses.sqlite3")
+    assert (Path(env["ANN_INDEX_PATH"]) / "ann.json").exists()
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    worker = AssessmentCatalog.from_env()
+    expected = AssessmentCatalog.from_file()
+    assert len(worker) == len(expected)
+    assert worker.search("java developer", k=5) == expected.search("java developer", k=5)
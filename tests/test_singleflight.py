@@ -0,0 +1,45 @@
+import asyncio
+
+from api.singleflight import SingleFlight
+
+def test_concurrent_identical_calls_share_one_computation():
+    """Test that callers with the same key await a single computation."""
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def run():
+        same = await asyncio.gather(*(flight.do("q", compute) for _ in range(10)))
+        other = await flight.do("other", compute)
+        return same, other
+
+    same, other = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert all(result is same[0] for result in same)
+    assert other == {"answer": 42}
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 9}
+
+def test_errors_are_shared_and_not_cached():
+    """Test that a failure reaches every waiter and the next call recomputes."""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(flight.do("q", fail), flight.do("q", fail), return_exceptions=True)
+        return results, await flight.do("q", succeed)
+
+    results, retry = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == "ok"
@@ -0,0 +1,49 @@
+import asyncio
+
+from api.telemetry import Histogram, Telemetry, TelemetryMiddleware, server_timing_header
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that histogram buckets are cumulative and end with +Inf, sum and count."""
+    histogram = Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="llm")
+
+    lines = histogram.render()
+
+    assert 'demo_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{stage="llm"} 5.55' in lines
+    assert 'demo_seconds_count{stage="llm"} 3' in lines
+
+def test_server_timing_header_sums_repeated_stages():
+    """Test that repeated stages are merged and the total comes last."""
+    header = server_timing_header([("retrieve", 0.001), ("llm", 0.2), ("retrieve", 0.002)], 0.25)
+
+    assert header == "retrieve;dur=3.00, llm;dur=200.00, total;dur=250.00"
+
+def test_middleware_adds_server_timing_and_records_requests():
+    """Test that stages timed inside a request reach the Server-Timing header and histograms."""
+    telemetry = Telemetry(server_timing=True)
+
+    async def endpoint(scope, receive, send):
+        with telemetry.stage("retrieve"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = TelemetryMiddleware(endpoint, telemetry, route_path=lambda scope: "/demo")
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": "/demo"}, receive, send))
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"server-timing"].startswith(b"retrieve;dur=")
+    assert telemetry.request_seconds.count(method="GET", path="/demo", status="200") == 1
+    assert telemetry.stage_seconds.count(stage="retrieve") == 1
@@ -1,115 +1,285 @@
-from typing import List, Dict, Any
+"""
+Ranking metrics for the recommender.
+
+This is the single implementation used by the evaluation script and the
+tests. Per-query helpers use set membership, so they are O(K) per query, and
+evaluate_rankings computes every metric for every K in one vectorized pass.
+"""
+from typing import List, Dict, Any, Iterable, Sequence, Tuple
 import numpy as np
 
-def calculate_recall_at_k(relevant_items: List[str], recommended_items: List[str], k: int) -> float:
+METRIC_NAMES = ("recall", "precision", "map", "ndcg", "mrr")
+AP_NORMALIZATIONS = ("min_k", "relevant")
+DEFAULT_AP_NORMALIZATION = "min_k"
+
+def item_id(item: Any) -> str:
+    """
+    Return the ID of a recommended item, which may be a string or an API assessment dictionary.
+    """
+    return item if isinstance(item, str) else item.get('assessment_name', '')
+
+def hit_matrix(all_recommended: Sequence[Sequence[Any]],
+               all_relevant: Sequence[Iterable[str]],
+               depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode ranked recommendations as a boolean hit matrix.
+
+    Args:
+        all_recommended: Ranked recommended items (IDs or assessment dictionaries), one list per query
+        all_relevant: Relevant item IDs, one collection per query
+        depth: Number of ranks to keep per query
+
+    Returns:
+        Tuple of (hits, n_relevant): hits[q, i] is True when the item at rank
+        i + 1 of query q is relevant, n_relevant[q] is the number of distinct
+        relevant items of query q
+    """
+    hits = np.zeros((len(all_recommended), depth), dtype=bool)
+    n_relevant = np.zeros(len(all_recommended), dtype=np.int64)
+    for row, (recommended, relevant) in enumerate(zip(all_recommended, all_relevant)):
+        relevant = set(relevant)
+        n_relevant[row] = len(relevant)
+        flags = [item_id(item) in relevant for item in recommended[:depth]]
+        hits[row, :len(flags)] = flags
+    return hits, n_relevant
+
+def ranking_metrics(hits: np.ndarray, n_relevant: np.ndarray, k_values: Sequence[int],
+                    ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> Dict[str, Dict[int, np.ndarray]]:
+    """
+    Compute per-query Recall, Precision, AP, NDCG and reciprocal rank at every K.
+
+    All K values are served by one set of cumulative sums over the ranks, so
+    the cost is a few array operations regardless of how many K are requested.
+
+    Args:
+        hits: Boolean hit matrix of shape (queries, ranks), see hit_matrix
+        n_relevant: Number of relevant items per query
+        k_values: Cut-offs to evaluate, each at least 1
+        ap_normalization: "min_k" divides AP@K by min(K, relevant items),
+            "relevant" divides it by the number of relevant items
+
+    Returns:
+        Dictionary mapping metric name to {k: per-query float64 array}
     """
-    Calculate Recall@K metric.
-    
+    if any(k < 1 for k in k_values):
+        raise ValueError("k values must be at least 1")
+    if ap_normalization not in AP_NORMALIZATIONS:
+        raise ValueError(f"ap_normalization must be one of {AP_NORMALIZATIONS}")
+    depth = max(k_values, default=0)
+    if hits.shape[1] < depth:
+        hits = np.pad(hits, ((0, 0), (0, depth - hits.shape[1])))
+    hits = hits[:, :depth]
+
+    ranks = np.arange(1, depth + 1, dtype=np.float64)
+    discounts = 1.0 / np.log2(ranks + 1.0)
+    hit_counts = np.cumsum(hits, axis=1)
+    precision_sums = np.cumsum(np.where(hits, hit_counts / ranks, 0.0), axis=1)
+    dcg = np.cumsum(np.where(hits, discounts, 0.0), axis=1)
+    ideal_dcg = np.concatenate(([1.0], np.cumsum(discounts)))
+    first_hit = np.where(hits.any(axis=1), np.argmax(hits, axis=1) + 1, depth + 1)
+    has_relevant = n_relevant > 0
+    relevant_divisor = np.maximum(n_relevant, 1)
+
+    results: Dict[str, Dict[int, np.ndarray]] = {name: {} for name in METRIC_NAMES}
+    for k in k_values:
+        found = hit_counts[:, k - 1]
+        results["recall"][k] = np.where(has_relevant, found / relevant_divisor, 0.0)
+        results["precision"][k] = found / k
+        ap_divisor = np.minimum(relevant_divisor, k) if ap_normalization == "min_k" else relevant_divisor
+        results["map"][k] = np.where(has_relevant, precision_sums[:, k - 1] / ap_divisor, 0.0)
+        ideal = ideal_dcg[np.minimum(n_relevant, k)]
+        results["ndcg"][k] = np.where(has_relevant, dcg[:, k - 1] / ideal, 0.0)
+        results["mrr"][k] = np.where(first_hit <= k, 1.0 / first_hit, 0.0)
+    return results
+
+def evaluate_rankings(all_recommended: Sequence[Sequence[Any]],
+                      all_relevant: Sequence[Iterable[str]],
+                      k_values: Sequence[int] = (1, 3, 5, 10),
+                      ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> Dict[str, Dict[int, float]]:
+    """
+    Mean Recall, Precision, MAP, NDCG and MRR over all queries at every K.
+
     Args:
-        relevant_items: List of relevant item IDs
-        recommended_items: List of recommended item IDs
+        all_recommended: Ranked recommended items (IDs or assessment dictionaries), one list per query
+        all_relevant: Relevant item IDs, one collection per query
+        k_values: Cut-offs to evaluate
+        ap_normalization: See ranking_metrics
+
+    Returns:
+        Dictionary mapping metric name to {k: mean value}, 0.0 when there are no queries
+    """
+    hits, n_relevant = hit_matrix(all_recommended, all_relevant, max(k_values, default=0))
+    per_query = ranking_metrics(hits, n_relevant, k_values, ap_normalization)
+    return {
+        name: {k: float(values.mean()) if values.size else 0.0 for k, values in by_k.items()}
+        for name, by_k in per_query.items()
+    }
+
+def _hits_in_top_k(recommendations: Sequence[Any], relevant: Iterable[str], k: int) -> List[bool]:
+    relevant = set(relevant)
+    return [item_id(item) in relevant for item in recommendations[:k]]
+
+def recall_at_k(recommendations: List[Any], relevant_assessments: List[str], k: int) -> float:
+    """
+    Calculate Recall@K for a single query.
+
+    Args:
+        recommendations: List of recommended assessments (can be strings or dictionaries)
+        relevant_assessments: List of relevant assessment IDs
         k: Number of top recommendations to consider
-        
+
     Returns:
-        float: Recall@K score
+        Recall@K value
     """
-    if not relevant_items:
+    relevant = set(relevant_assessments)
+    if not relevant:
         return 0.0
-        
-    top_k_recommendations = recommended_items[:k]
-    relevant_in_top_k = sum(1 for item in top_k_recommendations if item in relevant_items)
-    
-    return relevant_in_top_k / len(relevant_items)
+    return sum(_hits_in_top_k(recommendations, relevant, k)) / len(relevant)
 
-def calculate_precision_at_k(relevant_items: List[str], recommended_items: List[str], k: int) -> float:
+def precision_at_k(recommendations: List[Any], relevant_assessments: List[str], k: int) -> float:
+    """
+    Calculate Precision@K for a single query.
+
+    Args:
+        recommendations: List of recommended assessments (can be strings or dictionaries)
+        relevant_assessments: List of relevant assessment IDs
+        k: Number of top recommendations to consider
+
+    Returns:
+        Precision@K value
+    """
+    if k <= 0:
+        return 0.0
+    return sum(_hits_in_top_k(recommendations, relevant_assessments, k)) / k
+
+def average_precision_at_k(recommendations: List[Any], relevant_assessments: List[str], k: int,
+                           ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> float:
     """
-    Calculate Precision@K metric.
-    
+    Calculate Average Precision@K for a single query.
+
     Args:
-        relevant_items: List of relevant item IDs
-        recommended_items: List of recommended item IDs
+        recommendations: List of recommended assessments (can be strings or dictionaries)
+        relevant_assessments: List of relevant assessment IDs
         k: Number of top recommendations to consider
-        
+        ap_normalization: "min_k" divides by min(K, relevant items),
+            "relevant" divides by the number of relevant items
+
     Returns:
-        float: Precision@K score
+        Average Precision@K value
     """
-    if not recommended_items[:k]:
+    if ap_normalization not in AP_NORMALIZATIONS:
+        raise ValueError(f"ap_normalization must be one of {AP_NORMALIZATIONS}")
+    relevant = set(relevant_assessments)
+    if not relevant or k <= 0:
         return 0.0
-        
-    top_k_recommendations = recommended_items[:k]
-    relevant_in_top_k = sum(1 for item in top_k_recommendations if item in relevant_items)
-    
-    return relevant_in_top_k / k
 
-def calculate_map_at_k(queries: List[Dict[str, Any]], k: int) -> float:
+    precision_sum = 0.0
+    relevant_count = 0
+    for i, hit in enumerate(_hits_in_top_k(recommendations, relevant, k)):
+        if hit:
+            relevant_count += 1
+            precision_sum += relevant_count / (i + 1)
+
+    divisor = min(k, len(relevant)) if ap_normalization == "min_k" else len(relevant)
+    return precision_sum / divisor
+
+def calculate_recall_at_k(relevant_items: List[str], recommended_items: List[str], k: int) -> float:
+    """
+    Calculate Recall@K metric (argument order of recall_at_k swapped).
+    """
+    return recall_at_k(recommended_items, relevant_items, k)
+
+def calculate_precision_at_k(relevant_items: List[str], recommended_items: List[str], k: int) -> float:
+    """
+    Calculate Precision@K metric (argument order of precision_at_k swapped).
+    """
+    return precision_at_k(recommended_items, relevant_items, k)
+
+def mean_recall_at_k(all_recommendations: List[List[Any]],
+                     all_relevant_assessments: List[List[str]],
+                     k: int) -> float:
+    """
+    Calculate Mean Recall@K across all queries.
+    """
+    return evaluate_rankings(all_recommendations, all_relevant_assessments, [k])["recall"][k]
+
+def mean_average_precision_at_k(all_recommendations: List[List[Any]],
+                                all_relevant_assessments: List[List[str]],
+                                k: int,
+                                ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> float:
+    """
+    Calculate Mean Average Precision@K across all queries.
+
+    Queries without relevant assessments count as 0.
+    """
+    return evaluate_rankings(all_recommendations, all_relevant_assessments, [k], ap_normalization)["map"][k]
+
+def calculate_map_at_k(queries: List[Dict[str, Any]], k: int,
+                       ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> float:
     """
     Calculate Mean Average Precision@K (MAP@K) metric.
-    
+
     Args:
         queries: List of dictionaries containing query results
                 Each dict should have 'relevant_items' and 'recommended_items' keys
         k: Number of top recommendations to consider
-        
+        ap_normalization: See average_precision_at_k
+
     Returns:
         float: MAP@K score
     """
-    if not queries:
-        return 0.0
-        
-    ap_scores = []
-    
-    for query in queries:
-        relevant_items = query['relevant_items']
-        recommended_items = query['recommended_items']
-        
-        if not relevant_items:
-            continue
-            
-        # Calculate precision at each position where we find a relevant item
-        precisions = []
-        relevant_count = 0
-        
-        for i, item in enumerate(recommended_items[:k]):
-            if item in relevant_items:
-                relevant_count += 1
-                precision = relevant_count / (i + 1)
-                precisions.append(precision)
-                
-        # Calculate average precision for this query
-        if precisions:
-            ap = sum(precisions) / len(relevant_items)
-            ap_scores.append(ap)
-            
-    return np.mean(ap_scores) if ap_scores else 0.0
+    return mean_average_precision_at_k(
+        [query['recommended_items'] for query in queries],
+        [query['relevant_items'] for query in queries],
+        k,
+        ap_normalization
+    )
+
+def evaluate_recommendation_system(all_recommendations: List[List[Any]],
+                                   all_relevant_assessments: List[List[str]],
+                                   k_values: List[int] = [5, 10, 20],
+                                   ap_normalization: str = DEFAULT_AP_NORMALIZATION) -> Dict[str, Dict[int, float]]:
+    """
+    Evaluate a recommendation system using multiple metrics at different K values.
+
+    Args:
+        all_recommendations: List of recommendation lists, one for each query
+        all_relevant_assessments: List of relevant assessment lists, one for each query
+        k_values: List of K values to evaluate
+        ap_normalization: See average_precision_at_k
+
+    Returns:
+        Dictionary containing evaluation metrics
+    """
+    metrics = evaluate_rankings(all_recommendations, all_relevant_assessments, k_values, ap_normalization)
+    return {
+        "recall_at_k": metrics["recall"],
+        "map_at_k": metrics["map"]
+    }
 
 def evaluate_recommendations(
     test_queries: List[Dict[str, Any]],
-    k: int = 3
+    k: int = 3,
+    ap_normalization: str = DEFAULT_AP_NORMALIZATION
 ) -> Dict[str, float]:
     """
     Evaluate recommendation system using multiple metrics.
-    
+
     Args:
         test_queries: List of test queries with ground truth
         k: Number of top recommendations to consider
-        
+        ap_normalization: See average_precision_at_k
+
     Returns:
         Dict containing evaluation metrics
     """
-    recall_scores = []
-    map_score = calculate_map_at_k(test_queries, k)
-    
-    for query in test_queries:
-        recall = calculate_recall_at_k(
-            query['relevant_items'],
-            query['recommended_items'],
-            k
-        )
-        recall_scores.append(recall)
-        
-    mean_recall = np.mean(recall_scores)
-    
+    metrics = evaluate_rankings(
+        [query['recommended_items'] for query in test_queries],
+        [query['relevant_items'] for query in test_queries],
+        [k],
+        ap_normalization
+    )
     return {
-        f"recall@{k}": mean_recall,
-        f"map@{k}": map_score
-    } 
\ No newline at end of file
+        f"recall@{k}": metrics["recall"][k],
+        f"map@{k}": metrics["map"][k]
+    }